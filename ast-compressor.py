@@ -1,9 +1,13 @@
-import json
 from tree_sitter import Language, Parser
 from typing import Dict, List, Optional, Union, Any
 import os
 
-class ASTCompressor:
+from java_source import open_java_source, to_parser_input, count_lines
+from java_node_kinds import node_kinds_for
+from ast_visitor import NodeVisitor
+import ast_json
+
+class ASTCompressor(NodeVisitor):
     """用于压缩Java AST的工具类"""
     
     # 重要的节点类型，这些将被保留
@@ -61,17 +65,39 @@ class ASTCompressor:
         # 可以根据需要添加更多
     }
     
-    def __init__(self, max_depth: int = 10, include_position: bool = False):
+    # 需要保留文本内容的节点类型
+    TEXT_NODES = {
+        'identifier', 'string_literal', 'number_literal',
+        'true', 'false', 'null_literal'
+    }
+    
+    # 节点类型到处理方法的分派表，靠前的优先；其余类型按默认方式处理
+    NODE_HANDLERS = (
+        ({'method_declaration'}, '_process_method_declaration'),
+        ({'class_declaration'}, '_process_class_declaration'),
+        (SIMPLIFIED_NODE_TYPES, '_process_simplified_node'),
+        (IMPORTANT_NODE_TYPES, '_process_important_node'),
+    )
+    DEFAULT_HANDLER = '_process_default_node'
+    
+    def __init__(self, max_depth: int = 10, include_position: bool = False, language=None):
         """
         初始化AST压缩器
         
         Args:
             max_depth: 递归处理的最大深度
             include_position: 是否包含位置信息，默认为False
+            language: 解析所用的tree-sitter Language，用于生成节点类型id查找表
         """
         self.max_depth = max_depth
         self.include_position = include_position
         
+        # 按node.kind_id索引的节点类别查找表
+        node_kinds = node_kinds_for(language)
+        self._ignored_kinds = node_kinds.flags(self.IGNORED_NODE_TYPES)
+        self._text_kinds = node_kinds.flags(self.TEXT_NODES)
+        self._node_handlers = self.dispatch_table(node_kinds)
+        
     def compress(self, root_node) -> Dict[str, Any]:
         """
         压缩整个AST
@@ -89,52 +115,46 @@ class ASTCompressor:
         if node is None or depth > self.max_depth:
             return None
         
-        node_type = node.type
+        kind_id = node.kind_id
         
         # 检查是否为忽略的节点类型
-        if node_type in self.IGNORED_NODE_TYPES:
+        if self._ignored_kinds[kind_id]:
             return None
-            
-        # 获取节点文本（用于标识符、字面量等）
-        node_text = node.text.decode('utf-8') if hasattr(node, 'text') else None
+        
+        node_type = node.type
         
         # 创建基本节点信息
         result = {
             "type": node_type,
         }
         
-        # 添加文本内容（对于标识符和字面量很重要）
-        if node_text and (node_type in {'identifier', 'string_literal', 'number_literal', 
-                                        'true', 'false', 'null_literal'}):
-            result["text"] = node_text
+        # 添加文本内容（对于标识符和字面量很重要），只为这些节点解码文本
+        if self._text_kinds[kind_id]:
+            node_text = node.text.decode('utf-8') if hasattr(node, 'text') else None
+            if node_text:
+                result["text"] = node_text
             
         # 添加位置信息（如果需要）
         if self.include_position:
             result["start_point"] = {"row": node.start_point[0], "column": node.start_point[1]}
             result["end_point"] = {"row": node.end_point[0], "column": node.end_point[1]}
         
-        # 基于节点类型进行特殊处理
-        if node_type == 'method_declaration':
-            # 方法声明的特殊处理
-            result = self._process_method_declaration(node, depth, result)
-        elif node_type == 'class_declaration':
-            # 类声明的特殊处理
-            result = self._process_class_declaration(node, depth, result)
-        elif node_type in self.SIMPLIFIED_NODE_TYPES:
-            # 简化处理某些节点类型
-            result = self._process_simplified_node(node, depth, result)
-        elif node_type in self.IMPORTANT_NODE_TYPES:
-            # 处理重要节点类型的子节点
+        # 基于节点类型分派到对应的处理方法
+        return self._node_handlers[kind_id](self, node, depth, result)
+    
+    def _process_important_node(self, node, depth: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        """处理重要节点类型的子节点"""
+        children = self._compress_children(node, depth)
+        if children:
+            result["children"] = children
+        return result
+    
+    def _process_default_node(self, node, depth: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        """默认处理方式：未达到深度上限时递归处理子节点"""
+        if depth < self.max_depth - 1:
             children = self._compress_children(node, depth)
             if children:
                 result["children"] = children
-        else:
-            # 默认处理方式：递归处理子节点
-            if depth < self.max_depth - 1:
-                children = self._compress_children(node, depth)
-                if children:
-                    result["children"] = children
-        
         return result
     
     def _compress_children(self, node, depth: int) -> List[Dict[str, Any]]:
@@ -280,12 +300,12 @@ class ASTCompressor:
         return None
 
 
-def compress_java_ast(java_code: str, max_depth: int = 10) -> Dict[str, Any]:
+def compress_java_ast(java_code: Union[str, bytes], max_depth: int = 10) -> Dict[str, Any]:
     """
     解析并压缩Java代码的AST
     
     Args:
-        java_code: Java源代码字符串
+        java_code: Java源代码字符串，或bytes/mmap等字节缓冲区（不做拷贝直接解析）
         max_depth: 最大递归深度
     
     Returns:
@@ -306,22 +326,23 @@ def compress_java_ast(java_code: str, max_depth: int = 10) -> Dict[str, Any]:
     parser = Parser()
     parser.set_language(JAVA_LANGUAGE)
     
-    tree = parser.parse(bytes(java_code, 'utf8'))
-    compressor = ASTCompressor(max_depth=max_depth)
+    tree = parser.parse(to_parser_input(java_code))
+    compressor = ASTCompressor(max_depth=max_depth, language=JAVA_LANGUAGE)
     
     return compressor.compress(tree.root_node)
 
 
-def save_compressed_ast(compressed_ast: Dict[str, Any], output_file: str) -> None:
+def save_compressed_ast(compressed_ast: Dict[str, Any], output_file: str,
+                        indent: Optional[int] = None) -> None:
     """
     将压缩后的AST保存到文件
     
     Args:
         compressed_ast: 压缩后的AST字典
         output_file: 输出文件路径
+        indent: JSON缩进级别，默认None输出紧凑格式
     """
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(compressed_ast, f, ensure_ascii=False, indent=2)
+    ast_json.dump(compressed_ast, output_file, indent=indent)
 
 def count_nodes(ast_node):
     """计算AST中的节点数量"""
@@ -350,22 +371,24 @@ def count_nodes(ast_node):
 if __name__ == "__main__":
     # 读取指定的Java文件
     java_file_path = "8/src/main/java/com/asiainfo/cvd/daemon/CNVDDirectoryWatcherDaemon.java"
-    try:
-        with open(java_file_path, 'r', encoding='utf-8') as f:
-            java_code = f.read()
-    except Exception as e:
-        print(f"读取文件失败: {e}")
-        exit(1)
     
     # 生成输出文件名
     output_file = "CNVDDirectoryWatcherDaemon_ast_output2.json"
     
     # 注意：确保已正确设置tree-sitter和Java语言支持
-    compressed_ast = compress_java_ast(java_code)
+    # 直接解析mmap缓冲区，节点文本依赖映射，压缩需在with块内完成
+    try:
+        with open_java_source(java_file_path) as java_code:
+            compressed_ast = compress_java_ast(java_code)
+            line_count = count_lines(java_code)
+    except OSError as e:
+        print(f"读取文件失败: {e}")
+        exit(1)
+    
     save_compressed_ast(compressed_ast, output_file)
     
     # 打印压缩前后的大小比较
-    print(f"原始代码行数: {len(java_code.splitlines())}")
+    print(f"原始代码行数: {line_count}")
     print(f"压缩后AST节点数: {count_nodes(compressed_ast)}")
     print(f"AST已保存到: {output_file}")
 
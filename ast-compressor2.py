@@ -1,11 +1,15 @@
-import json
 from tree_sitter import Language, Parser
 from typing import Dict, List, Optional, Union, Any, Set
 import os
-import gzip
 from collections import defaultdict
 
-class ASTCompressor:
+from java_source import open_java_source, to_parser_input, count_lines
+from java_node_kinds import node_kinds_for
+from ast_visitor import NodeVisitor
+import ast_json
+import ast_codec
+
+class ASTCompressor(NodeVisitor):
     """用于压缩Java AST的工具类，增强版"""
     
     # 重要的节点类型，这些将被保留
@@ -41,9 +45,22 @@ class ASTCompressor:
         'false', 'null_literal', 'type_identifier'
     }
     
+    # 不放入子树缓存的节点类型
+    UNCACHED_NODE_TYPES = {'identifier', 'string_literal'}
+    
+    # 节点类型到处理方法的分派表，靠前的优先；其余类型按默认方式处理
+    NODE_HANDLERS = (
+        ({'method_declaration'}, '_process_method_declaration'),
+        ({'class_declaration'}, '_process_class_declaration'),
+        (SIMPLIFIED_NODE_TYPES, '_process_simplified_node'),
+        (IMPORTANT_NODE_TYPES, '_process_important_node'),
+    )
+    DEFAULT_HANDLER = '_process_default_node'
+    
     def __init__(self, max_depth: int = 15, include_position: bool = False, 
                  use_symbol_table: bool = True, deduplicate: bool = True,
-                 prune_empty_nodes: bool = True, compress_output: bool = False):
+                 prune_empty_nodes: bool = True, compress_output: bool = False,
+                 language=None):
         """
         初始化AST压缩器
         
@@ -54,6 +71,7 @@ class ASTCompressor:
             deduplicate: 是否去重结构相同的子树
             prune_empty_nodes: 是否剪枝空节点
             compress_output: 是否对最终输出进行gzip压缩
+            language: 解析所用的tree-sitter Language，用于生成节点类型id查找表
         """
         self.max_depth = max_depth
         self.include_position = include_position
@@ -70,6 +88,13 @@ class ASTCompressor:
         self.subtree_cache = {}
         self.subtree_refs = defaultdict(int)
         
+        # 按node.kind_id索引的节点类别查找表
+        node_kinds = node_kinds_for(language)
+        self._ignored_kinds = node_kinds.flags(self.IGNORED_NODE_TYPES)
+        self._text_kinds = node_kinds.flags(self.TEXT_NODES)
+        self._uncached_kinds = node_kinds.flags(self.UNCACHED_NODE_TYPES)
+        self._node_handlers = self.dispatch_table(node_kinds)
+        
     def compress(self, root_node) -> Dict[str, Any]:
         """压缩整个AST"""
         # 第一遍：构建符号表和子树缓存
@@ -105,19 +130,19 @@ class ASTCompressor:
     def _get_node_hash(self, node) -> int:
         """计算节点的哈希值用于去重"""
         if not hasattr(node, 'text'):
-            return hash(node.type)
+            return hash(node.kind_id)
         
-        return hash((node.type, node.text))
+        return hash((node.kind_id, node.text))
     
     def _compress_node(self, node, depth: int) -> Optional[Dict[str, Any]]:
         """递归压缩单个节点及其子节点"""
         if node is None or depth > self.max_depth:
             return None
         
-        node_type = node.type
+        kind_id = node.kind_id
         
         # 检查是否为忽略的节点类型
-        if node_type in self.IGNORED_NODE_TYPES:
+        if self._ignored_kinds[kind_id]:
             return None
             
         # 使用缓存的子树（去重优化）
@@ -128,16 +153,16 @@ class ASTCompressor:
                 ref_id = f"_ref_{node_hash}"
                 return {"_ref": ref_id}
         
-        # 获取节点文本
-        node_text = None
-        if hasattr(node, 'text'):
-            node_text = node.text.decode('utf-8') if node.text else None
+        node_type = node.type
         
         # 创建基本节点信息
         result = {"type": node_type}
         
-        # 添加文本内容（对于标识符和字面量很重要）
-        if node_text and (node_type in self.TEXT_NODES):
+        # 添加文本内容（对于标识符和字面量很重要），只为这些节点解码文本
+        node_text = None
+        if self._text_kinds[kind_id] and hasattr(node, 'text'):
+            node_text = node.text.decode('utf-8') if node.text else None
+        if node_text:
             if self.use_symbol_table and node_text in self.symbol_table and len(node_text) > 3:
                 # 使用符号表引用
                 result["text_ref"] = self.symbol_table[node_text]
@@ -149,27 +174,11 @@ class ASTCompressor:
             result["pos"] = [node.start_point[0], node.start_point[1], 
                              node.end_point[0], node.end_point[1]]
         
-        # 基于节点类型进行特殊处理
-        if node_type == 'method_declaration':
-            result = self._process_method_declaration(node, depth, result)
-        elif node_type == 'class_declaration':
-            result = self._process_class_declaration(node, depth, result)
-        elif node_type in self.SIMPLIFIED_NODE_TYPES:
-            result = self._process_simplified_node(node, depth, result)
-        elif node_type in self.IMPORTANT_NODE_TYPES:
-            # 处理重要节点类型的子节点
-            children = self._compress_children(node, depth)
-            if children:
-                result["children"] = children
-        else:
-            # 默认处理方式：递归处理子节点
-            if depth < self.max_depth - 1:
-                children = self._compress_children(node, depth)
-                if children:
-                    result["children"] = children
+        # 基于节点类型分派到对应的处理方法
+        result = self._node_handlers[kind_id](self, node, depth, result)
         
         # 存储子树缓存（用于去重）
-        if self.deduplicate and node_type not in {'identifier', 'string_literal'}:
+        if self.deduplicate and not self._uncached_kinds[kind_id]:
             node_hash = self._get_node_hash(node)
             self.subtree_cache[node_hash] = result
             ref_id = f"_ref_{node_hash}"
@@ -182,6 +191,21 @@ class ASTCompressor:
         
         return result
     
+    def _process_important_node(self, node, depth: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        """处理重要节点类型的子节点"""
+        children = self._compress_children(node, depth)
+        if children:
+            result["children"] = children
+        return result
+    
+    def _process_default_node(self, node, depth: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        """默认处理方式：未达到深度上限时递归处理子节点"""
+        if depth < self.max_depth - 1:
+            children = self._compress_children(node, depth)
+            if children:
+                result["children"] = children
+        return result
+    
     def _compress_children(self, node, depth: int) -> List[Dict[str, Any]]:
         """压缩所有子节点"""
         result = []
@@ -396,13 +420,13 @@ class ASTCompressor:
         return None
 
 
-def compress_java_ast(java_code: str, max_depth: int = 15, include_position: bool = False,
+def compress_java_ast(java_code: Union[str, bytes], max_depth: int = 15, include_position: bool = False,
                       use_symbol_table: bool = True, compress_output: bool = False) -> Dict[str, Any]:
     """
     解析并压缩Java代码的AST
     
     Args:
-        java_code: Java源代码字符串
+        java_code: Java源代码字符串，或bytes/mmap等字节缓冲区（不做拷贝直接解析）
         max_depth: 最大递归深度
         include_position: 是否包含位置信息
         use_symbol_table: 是否使用符号表进行字符串去重
@@ -444,21 +468,22 @@ def compress_java_ast(java_code: str, max_depth: int = 15, include_position: boo
     parser = Parser()
     parser.set_language(JAVA_LANGUAGE)
     
-    tree = parser.parse(bytes(java_code, 'utf8'))
+    tree = parser.parse(to_parser_input(java_code))
     compressor = ASTCompressor(
         max_depth=max_depth,
         include_position=include_position,
         use_symbol_table=use_symbol_table,
         deduplicate=True,
         prune_empty_nodes=True,
-        compress_output=compress_output
+        compress_output=compress_output,
+        language=JAVA_LANGUAGE
     )
     
     return compressor.compress(tree.root_node)
 
 
 def save_compressed_ast(compressed_ast: Dict[str, Any], output_file: str, 
-                         use_gzip: bool = False, indent: int = 2) -> None:
+                         use_gzip: bool = False, indent: Optional[int] = None) -> None:
     """
     将压缩后的AST保存到文件
     
@@ -466,15 +491,14 @@ def save_compressed_ast(compressed_ast: Dict[str, Any], output_file: str,
         compressed_ast: 压缩后的AST字典
         output_file: 输出文件路径
         use_gzip: 是否使用gzip压缩
-        indent: JSON缩进级别，None表示不缩进
+        indent: JSON缩进级别，默认None输出紧凑格式
     """
     if use_gzip:
-        with gzip.open(output_file + '.gz', 'wt', encoding='utf-8') as f:
-            json.dump(compressed_ast, f, ensure_ascii=False, indent=indent)
+        # 按块序列化并压缩写入，不生成完整的JSON字节
+        ast_codec.write_compressed_json(compressed_ast, output_file + '.gz', 'gzip', indent=indent)
         print(f"压缩AST已保存到: {output_file}.gz")
     else:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(compressed_ast, f, ensure_ascii=False, indent=indent)
+        ast_json.dump(compressed_ast, output_file, indent=indent)
         print(f"AST已保存到: {output_file}")
 
 def count_nodes(ast_node):
@@ -517,19 +541,13 @@ if __name__ == "__main__":
     parser.add_argument('--depth', '-d', type=int, default=15, help='最大递归深度')
     parser.add_argument('--no-symbols', action='store_true', help='禁用符号表优化')
     parser.add_argument('--gzip', '-g', action='store_true', help='使用gzip压缩输出')
-    parser.add_argument('--no-indent', action='store_true', help='输出不缩进的JSON')
+    parser.add_argument('--indent', type=int, default=None, help='JSON缩进级别，默认输出紧凑格式')
+    # 已弃用：默认即为紧凑输出，保留该选项只为兼容旧脚本，不再起作用
+    parser.add_argument('--no-indent', action='store_true', help=argparse.SUPPRESS)
     parser.add_argument('--positions', '-p', action='store_true', help='包含位置信息')
     
     args = parser.parse_args()
     
-    # 读取指定的Java文件
-    try:
-        with open(args.input, 'r', encoding='utf-8') as f:
-            java_code = f.read()
-    except Exception as e:
-        print(f"读取文件失败: {e}")
-        exit(1)
-    
     # 生成输出文件名
     if args.output:
         output_file = args.output
@@ -538,27 +556,32 @@ if __name__ == "__main__":
         base_name = os.path.splitext(filename)[0]
         output_file = f"{base_name}_ast_compressed.json"
     
-    # 压缩AST
+    # 压缩AST（mmap缓冲区直接交给解析器，节点文本依赖映射，压缩需在with块内完成）
     print(f"正在压缩 {args.input}...")
-    compressed_ast = compress_java_ast(
-        java_code,
-        max_depth=args.depth,
-        include_position=args.positions,
-        use_symbol_table=not args.no_symbols,
-        compress_output=args.gzip
-    )
+    try:
+        with open_java_source(args.input) as java_code:
+            compressed_ast = compress_java_ast(
+                java_code,
+                max_depth=args.depth,
+                include_position=args.positions,
+                use_symbol_table=not args.no_symbols,
+                compress_output=args.gzip
+            )
+            line_count = count_lines(java_code)
+    except OSError as e:
+        print(f"读取文件失败: {e}")
+        exit(1)
     
     # 保存AST
-    indent = None if args.no_indent else 2
     save_compressed_ast(
         compressed_ast,
         output_file,
         use_gzip=args.gzip,
-        indent=indent
+        indent=args.indent
     )
     
     # 打印压缩前后的大小比较
-    print(f"原始代码行数: {len(java_code.splitlines())}")
+    print(f"原始代码行数: {line_count}")
     print(f"压缩后AST节点数: {count_nodes(compressed_ast)}")
     
     # 如果保存了文件，计算压缩率
@@ -1,11 +1,15 @@
-import json
 from tree_sitter import Language, Parser
 from typing import Dict, List, Optional, Union, Any, Set, Tuple
 import os
 import gzip
 from collections import defaultdict, Counter
 
-class EnhancedASTCompressor:
+from java_source import open_java_source, to_parser_input, compute_file_metrics
+from java_node_kinds import node_kinds_for
+from ast_visitor import NodeVisitor
+import ast_json
+
+class EnhancedASTCompressor(NodeVisitor):
     """增强版Java AST压缩工具类，针对LLM代码理解的特殊优化"""
     
     # 重要的节点类型，这些将被保留
@@ -57,11 +61,25 @@ class EnhancedASTCompressor:
         'assignment_expression', 'update_expression', 'method_invocation'
     }
     
+    # 节点类型到处理方法的分派表，靠前的优先；其余类型按默认方式处理
+    NODE_HANDLERS = (
+        ({'method_declaration'}, '_process_method_declaration'),
+        ({'class_declaration'}, '_process_class_declaration'),
+        ({'block'}, '_process_block'),
+        (CONTROL_FLOW_NODES, '_process_control_flow_node'),
+        ({'method_invocation'}, '_process_method_invocation'),
+        ({'assignment_expression'}, '_process_assignment'),
+        (SIMPLIFIED_NODE_TYPES, '_process_simplified_node'),
+        (IMPORTANT_NODE_TYPES, '_process_important_node'),
+    )
+    DEFAULT_HANDLER = '_process_default_node'
+    
     def __init__(self, max_depth: int = 20, include_position: bool = False, 
                  preserve_comments: bool = True, extract_control_flow: bool = True,
                  track_variable_usage: bool = True, analyze_method_calls: bool = True,
                  identify_state_changes: bool = True, semantic_grouping: bool = True,
-                 calculate_complexity: bool = True, max_method_body_depth: int = 8):
+                 calculate_complexity: bool = True, max_method_body_depth: int = 8,
+                 language=None):
         """
         初始化增强版AST压缩器
         
@@ -76,6 +94,7 @@ class EnhancedASTCompressor:
             semantic_grouping: 是否进行方法的语义分组
             calculate_complexity: 是否计算复杂度指标
             max_method_body_depth: 方法体最大递归深度
+            language: 解析所用的tree-sitter Language，用于生成节点类型id查找表
         """
         self.max_depth = max_depth
         self.include_position = include_position
@@ -88,6 +107,15 @@ class EnhancedASTCompressor:
         self.calculate_complexity = calculate_complexity
         self.max_method_body_depth = max_method_body_depth
         
+        # 按node.kind_id索引的节点类别查找表
+        node_kinds = node_kinds_for(language)
+        self._ignored_kinds = node_kinds.flags(self.IGNORED_NODE_TYPES)
+        self._comment_kinds = node_kinds.flags(self.COMMENT_NODE_TYPES)
+        self._text_kinds = node_kinds.flags(self.TEXT_NODES)
+        self._control_flow_kinds = node_kinds.flags(self.CONTROL_FLOW_NODES)
+        self._state_change_kinds = node_kinds.flags(self.STATE_CHANGE_NODES)
+        self._node_handlers = self.dispatch_table(node_kinds)
+        
         # 用于跟踪已收集的注释
         self.comments = []
         
@@ -110,12 +138,12 @@ class EnhancedASTCompressor:
         self.current_class = None
         self.current_method = None
     
-    def compress(self, root_node, source_code: Optional[str] = None) -> Dict[str, Any]:
+    def compress(self, root_node, source_code: Optional[Union[str, bytes]] = None) -> Dict[str, Any]:
         """压缩整个AST，并添加增强的语义分析信息
         
         Args:
             root_node: AST根节点
-            source_code: 原始源代码文本，用于提取注释和上下文
+            source_code: 原始源代码（str或bytes/mmap缓冲区），用于提取注释和上下文
         
         Returns:
             增强压缩后的AST
@@ -179,7 +207,7 @@ class EnhancedASTCompressor:
         self._update_context(node)
         
         # 收集注释节点
-        if self.preserve_comments and node.type in self.COMMENT_NODE_TYPES and hasattr(node, 'text'):
+        if self.preserve_comments and self._comment_kinds[node.kind_id] and hasattr(node, 'text'):
             comment_text = node.text.decode('utf-8').strip()
             if comment_text:
                 # 为注释添加位置信息
@@ -208,7 +236,7 @@ class EnhancedASTCompressor:
             self._collect_method_call(node)
         
         # 收集状态变更点
-        if self.identify_state_changes and node.type in self.STATE_CHANGE_NODES:
+        if self.identify_state_changes and self._state_change_kinds[node.kind_id]:
             self._collect_state_change(node)
         
         # 递归处理子节点
@@ -438,30 +466,16 @@ class EnhancedASTCompressor:
                             args_count += 1
         return args_count
     
-    def _extract_code_context(self, root_node, source_code: str) -> Dict[str, Any]:
+    def _extract_code_context(self, root_node, source_code: Union[str, bytes]) -> Dict[str, Any]:
         """提取代码上下文信息"""
         context = {
             "declared_classes": [],
             "imported_packages": [],
             "package_name": None,
-            "statistics": {
-                "total_lines": source_code.count('\n') + 1,
-                "code_lines": 0,
-                "comment_lines": 0,
-                "blank_lines": 0
-            }
+            # 统计代码行、空行和注释行（单遍扫描，字符串中的注释标记不会被误判）
+            "statistics": compute_file_metrics(source_code).to_dict()
         }
         
-        # 统计代码行、空行和注释行
-        for line in source_code.split('\n'):
-            line = line.strip()
-            if not line:
-                context["statistics"]["blank_lines"] += 1
-            elif line.startswith('//') or line.startswith('/*') or line.startswith('*'):
-                context["statistics"]["comment_lines"] += 1
-            else:
-                context["statistics"]["code_lines"] += 1
-        
         # 提取包名
         package_node = self._find_child_by_type(root_node, 'package_declaration')
         if package_node:
@@ -750,14 +764,16 @@ class EnhancedASTCompressor:
         if node is None or depth > self.max_depth:
             return None
         
-        node_type = node.type
+        kind_id = node.kind_id
         
         # 检查是否为忽略的节点类型
-        if node_type in self.IGNORED_NODE_TYPES:
+        if self._ignored_kinds[kind_id]:
             return None
         
+        node_type = node.type
+        
         # 特殊处理注释节点
-        if self.preserve_comments and node_type in self.COMMENT_NODE_TYPES:
+        if self.preserve_comments and self._comment_kinds[kind_id]:
             comment_text = node.text.decode('utf-8') if hasattr(node, 'text') and node.text else None
             if comment_text:
                 return {
@@ -766,54 +782,34 @@ class EnhancedASTCompressor:
                 }
             return None
         
-        # 获取节点文本
-        node_text = None
-        if hasattr(node, 'text'):
-            node_text = node.text.decode('utf-8') if node.text else None
-        
         # 创建基本节点信息
         result = {"type": node_type}
         
-        # 添加文本内容（对于标识符和字面量很重要）
-        if node_text and (node_type in self.TEXT_NODES):
-            result["text"] = node_text
+        # 添加文本内容（对于标识符和字面量很重要），只为这些节点解码文本
+        if self._text_kinds[kind_id] and hasattr(node, 'text') and node.text:
+            result["text"] = node.text.decode('utf-8')
             
         # 添加位置信息（如果需要）
         if self.include_position:
             result["pos"] = [node.start_point[0], node.start_point[1], 
                              node.end_point[0], node.end_point[1]]
         
-        # 基于节点类型进行特殊处理
-        if node_type == 'method_declaration':
-            result = self._process_method_declaration(node, depth, result)
-        elif node_type == 'class_declaration':
-            result = self._process_class_declaration(node, depth, result)
-        elif node_type == 'block':
-            # 增强版块处理，保留控制流结构
-            result = self._process_block(node, depth, result)
-        elif node_type in self.CONTROL_FLOW_NODES:
-            # 增强版控制流节点处理
-            result = self._process_control_flow_node(node, depth, result)
-        elif node_type == 'method_invocation':
-            # 增强版方法调用处理
-            result = self._process_method_invocation(node, depth, result)
-        elif node_type == 'assignment_expression':
-            # 增强版赋值表达式处理
-            result = self._process_assignment(node, depth, result)
-        elif node_type in self.SIMPLIFIED_NODE_TYPES:
-            result = self._process_simplified_node(node, depth, result)
-        elif node_type in self.IMPORTANT_NODE_TYPES:
-            # 处理重要节点类型的子节点
+        # 基于节点类型分派到对应的处理方法（块、控制流、方法调用、赋值等有增强处理）
+        return self._node_handlers[kind_id](self, node, depth, result)
+    
+    def _process_important_node(self, node, depth: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        """处理重要节点类型的子节点"""
+        children = self._compress_children(node, depth)
+        if children:
+            result["children"] = children
+        return result
+    
+    def _process_default_node(self, node, depth: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        """默认处理方式：未达到深度上限时递归处理子节点"""
+        if depth < self.max_depth - 1:
             children = self._compress_children(node, depth)
             if children:
                 result["children"] = children
-        else:
-            # 默认处理方式：递归处理子节点
-            if depth < self.max_depth - 1:
-                children = self._compress_children(node, depth)
-                if children:
-                    result["children"] = children
-        
         return result
     
     def _compress_children(self, node, depth: int) -> List[Dict[str, Any]]:
@@ -997,7 +993,7 @@ class EnhancedASTCompressor:
             return result
         
         # 提取当前节点的控制流结构
-        if node.type in self.CONTROL_FLOW_NODES:
+        if self._control_flow_kinds[node.kind_id]:
             flow_node = {"type": node.type}
             
             # 对特定控制流节点类型进行特殊处理
@@ -1656,7 +1652,7 @@ class EnhancedASTCompressor:
             result["source_type"] = right.type
             
             # 如果右侧是字面量，提取值
-            if hasattr(right, 'text') and right.type in self.TEXT_NODES:
+            if hasattr(right, 'text') and self._text_kinds[right.kind_id]:
                 result["source_value"] = right.text.decode('utf-8')
             
             # 如果右侧是方法调用，提取更多信息
@@ -1821,7 +1817,7 @@ class EnhancedASTCompressor:
         return dict(counts)
 
 
-def compress_java_ast(java_code: str, lang_path: str = None, 
+def compress_java_ast(java_code: Union[str, bytes], lang_path: str = None, 
                       preserve_comments: bool = True, 
                       extract_control_flow: bool = True,
                       track_variable_usage: bool = True, 
@@ -1832,7 +1828,7 @@ def compress_java_ast(java_code: str, lang_path: str = None,
     解析并增强压缩Java代码的AST
     
     Args:
-        java_code: Java源代码字符串
+        java_code: Java源代码字符串，或bytes/mmap等字节缓冲区（不做拷贝直接解析）
         lang_path: tree-sitter语言库路径
         preserve_comments: 是否保留注释
         extract_control_flow: 是否提取控制流结构
@@ -1872,30 +1868,31 @@ def compress_java_ast(java_code: str, lang_path: str = None,
     parser = Parser()
     parser.set_language(JAVA_LANGUAGE)
     
-    tree = parser.parse(bytes(java_code, 'utf8'))
+    tree = parser.parse(to_parser_input(java_code))
     compressor = EnhancedASTCompressor(
         max_depth=max_depth,
         preserve_comments=preserve_comments,
         extract_control_flow=extract_control_flow,
         track_variable_usage=track_variable_usage,
         analyze_method_calls=analyze_method_calls,
-        identify_state_changes=identify_state_changes
+        identify_state_changes=identify_state_changes,
+        language=JAVA_LANGUAGE
     )
     
     return compressor.compress(tree.root_node, java_code)
 
 
-def save_compressed_ast(compressed_ast: Dict[str, Any], output_file: str, indent: int = 2) -> None:
+def save_compressed_ast(compressed_ast: Dict[str, Any], output_file: str,
+                        indent: Optional[int] = None) -> None:
     """
     将压缩后的AST保存到文件
     
     Args:
         compressed_ast: 压缩后的AST字典
         output_file: 输出文件路径
-        indent: JSON缩进级别，None表示不缩进
+        indent: JSON缩进级别，默认None输出紧凑格式
     """
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(compressed_ast, f, ensure_ascii=False, indent=indent)
+    ast_json.dump(compressed_ast, output_file, indent=indent)
     
     print(f"AST已保存到: {output_file}")
 
@@ -1914,18 +1911,12 @@ if __name__ == "__main__":
     parser.add_argument('--no-method-calls', action='store_true', help='不分析方法调用')
     parser.add_argument('--no-state-changes', action='store_true', help='不识别状态变更点')
     parser.add_argument('--depth', '-d', type=int, default=20, help='最大递归深度')
-    parser.add_argument('--no-indent', action='store_true', help='输出不缩进的JSON')
+    parser.add_argument('--indent', type=int, default=None, help='JSON缩进级别，默认输出紧凑格式')
+    # 已弃用：默认即为紧凑输出，保留该选项只为兼容旧脚本，不再起作用
+    parser.add_argument('--no-indent', action='store_true', help=argparse.SUPPRESS)
     
     args = parser.parse_args()
     
-    # 读取指定的Java文件
-    try:
-        with open(args.input, 'r', encoding='utf-8') as f:
-            java_code = f.read()
-    except Exception as e:
-        print(f"读取文件失败: {e}")
-        exit(1)
-    
     # 生成输出文件名
     if args.output:
         output_file = args.output
@@ -1934,22 +1925,26 @@ if __name__ == "__main__":
         base_name = os.path.splitext(filename)[0]
         output_file = f"{base_name}_enhanced_ast.json"
     
-    # 压缩AST
+    # 压缩AST（mmap缓冲区直接交给解析器，节点文本依赖映射，压缩需在with块内完成）
     print(f"正在分析 {args.input}...")
-    compressed_ast = compress_java_ast(
-        java_code,
-        lang_path=args.lang_path,
-        preserve_comments=not args.no_comments,
-        extract_control_flow=not args.no_control_flow,
-        track_variable_usage=not args.no_variable_tracking,
-        analyze_method_calls=not args.no_method_calls,
-        identify_state_changes=not args.no_state_changes,
-        max_depth=args.depth
-    )
+    try:
+        with open_java_source(args.input) as java_code:
+            compressed_ast = compress_java_ast(
+                java_code,
+                lang_path=args.lang_path,
+                preserve_comments=not args.no_comments,
+                extract_control_flow=not args.no_control_flow,
+                track_variable_usage=not args.no_variable_tracking,
+                analyze_method_calls=not args.no_method_calls,
+                identify_state_changes=not args.no_state_changes,
+                max_depth=args.depth
+            )
+    except OSError as e:
+        print(f"读取文件失败: {e}")
+        exit(1)
     
     # 保存AST
-    indent = None if args.no_indent else 2
-    save_compressed_ast(compressed_ast, output_file, indent=indent)
+    save_compressed_ast(compressed_ast, output_file, indent=args.indent)
     
     # 输出统计信息
     if "summary" in compressed_ast and "classes" in compressed_ast["summary"]:
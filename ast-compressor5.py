@@ -1,10 +1,16 @@
-import json
+import re
 from tree_sitter import Language, Parser
 from typing import Dict, List, Optional, Union, Any, Set
 import os
 from collections import defaultdict, Counter
 
-class LLMFriendlyASTCompressor:
+from java_source import open_java_source, open_java_stream, to_parser_input, node_text, count_newlines
+from java_node_kinds import node_kinds_for
+from ast_visitor import NodeVisitor
+import ast_json
+import ast_codec
+
+class LLMFriendlyASTCompressor(NodeVisitor):
     """
     优化版Java AST压缩工具类，使用键名映射表辅助LLM理解，
     完全忽略位置信息，平衡信息完整性与大小
@@ -49,6 +55,7 @@ class LLMFriendlyASTCompressor:
         # 注释信息
         "key_comments": "kc",
         "text": "txt",
+        "attached_to": "at",
         
         # 其他常见属性
         "package": "pkg",
@@ -86,6 +93,25 @@ class LLMFriendlyASTCompressor:
         'comment', 'line_comment', 'block_comment',
     }
     
+    # 注释可关联的声明节点类型
+    DECLARATION_NODE_TYPES = {
+        'class_declaration', 'interface_declaration', 'enum_declaration',
+        'record_declaration', 'annotation_type_declaration',
+        'method_declaration', 'constructor_declaration', 'field_declaration',
+    }
+    
+    # 判断行注释是否重要的关键词
+    IMPORTANT_COMMENT_PATTERN = re.compile(
+        r'todo|fixme|note|important|bug|warning|hack|功能|注意|关键|实现|处理',
+        re.IGNORECASE
+    )
+    
+    # 注释重要性评分使用的关键词，每个关键词至多计一分
+    COMMENT_SCORE_PATTERN = re.compile(
+        r'功能|注意|关键|实现|处理|todo|fixme|important',
+        re.IGNORECASE
+    )
+    
     # 对文本内容进行保留的节点类型
     TEXT_NODES = {
         'identifier', 'string_literal', 'number_literal', 'character_literal',
@@ -105,13 +131,28 @@ class LLMFriendlyASTCompressor:
         'assignment_expression', 'update_expression'
     }
     
+    # 分析阶段节点类型到收集方法的分派表，靠前的优先；其余类型无需收集
+    NODE_HANDLERS = (
+        ({'class_declaration'}, '_visit_class_declaration'),
+        ({'method_declaration'}, '_visit_method_declaration'),
+        ({'field_declaration'}, '_visit_field_declaration'),
+        (COMMENT_NODE_TYPES, '_visit_comment'),
+        (CONTROL_FLOW_NODES, '_visit_control_flow'),
+        ({'variable_declarator'}, '_visit_variable_declarator'),
+        ({'identifier'}, '_visit_identifier'),
+        (STATE_CHANGE_NODES, '_visit_state_change'),
+        ({'method_invocation'}, '_collect_method_call'),
+        ({'block'}, '_visit_block'),
+    )
+    
     def __init__(self, 
                  preserve_comments: bool = True,
                  track_control_flow: bool = True,
                  track_data_flow: bool = True,
                  include_method_intent: bool = True,
                  aggregation_level: str = "medium",
-                 use_key_mapping: bool = True):
+                 use_key_mapping: bool = True,
+                 language=None):
         """
         初始化优化版AST压缩器
         
@@ -122,6 +163,7 @@ class LLMFriendlyASTCompressor:
             include_method_intent: 是否包含方法意图分析
             aggregation_level: 聚合级别 ("low", "medium", "high")
             use_key_mapping: 是否使用键名映射表减小输出大小
+            language: 解析所用的tree-sitter Language，用于生成节点类型id查找表
         """
         self.preserve_comments = preserve_comments
         self.track_control_flow = track_control_flow
@@ -130,9 +172,19 @@ class LLMFriendlyASTCompressor:
         self.aggregation_level = aggregation_level
         self.use_key_mapping = use_key_mapping
         
+        # 按node.kind_id索引的节点类别查找表
+        node_kinds = node_kinds_for(language)
+        self._control_flow_kinds = node_kinds.flags(self.CONTROL_FLOW_NODES)
+        self._comment_kinds = node_kinds.flags(self.COMMENT_NODE_TYPES)
+        self._declaration_kinds = node_kinds.flags(self.DECLARATION_NODE_TYPES)
+        self._node_handlers = self.dispatch_table(node_kinds)
+        
         # 用于跟踪已收集的注释
         self.important_comments = []
         
+        # 遍历中收集的注释节点
+        self.comment_nodes = []
+        
         # 用于收集变量使用信息
         self.variable_usages = {}
         
@@ -148,14 +200,21 @@ class LLMFriendlyASTCompressor:
         # 字段信息
         self.fields_info = {}
         
+        # 原始源码，节点文本按字节偏移从中读取（支持流式解析的树）
+        self.source_code = None
+        
+        # 文件总行数（按split('\n')口径），只统计换行符，不做词法扫描
+        self.total_lines = None
+        
         # 当前上下文
         self.current_class = None
         self.current_method = None
         
-    def compress(self, root_node, source_code: Optional[str] = None) -> Dict[str, Any]:
+    def compress(self, root_node, source_code: Optional[Union[str, bytes]] = None) -> Dict[str, Any]:
         """压缩整个AST，优化输出大小同时保留语义关系"""
         # 重置状态
         self.important_comments = []
+        self.comment_nodes = []
         self.variable_usages = {}
         self.method_calls = {}
         self.control_flow = {}
@@ -164,6 +223,12 @@ class LLMFriendlyASTCompressor:
         self.current_class = None
         self.current_method = None
         
+        # 统一按字节处理源码，节点文本按tree-sitter的字节偏移读取
+        if isinstance(source_code, str):
+            source_code = source_code.encode('utf-8')
+        self.source_code = source_code
+        self.total_lines = count_newlines(source_code) + 1 if source_code else None
+        
         # 第一遍：收集基本信息
         self._analyze_and_collect(root_node, source_code)
         
@@ -217,51 +282,43 @@ class LLMFriendlyASTCompressor:
         else:
             return obj
     
-    def _analyze_and_collect(self, root_node, source_code: Optional[str]) -> None:
+    def _analyze_and_collect(self, root_node, source_code: Optional[Union[str, bytes]]) -> None:
         """第一遍遍历：收集基本信息"""
-        # 提取文件注释
-        if self.preserve_comments and source_code:
-            self._extract_comments(source_code)
-        
-        # 分析结构并收集控制流、数据流信息
+        # 分析结构并收集控制流、数据流信息，同时收集注释节点和声明节点
         self._analyze_node(root_node, 0)
-    
-    def _extract_comments(self, source_code: str) -> None:
-        """从源代码提取重要注释"""
-        lines = source_code.split('\n')
-        
-        # 寻找文件头和类文档注释
-        in_doc_comment = False
-        current_comment = []
         
-        for i, line in enumerate(lines):
-            line = line.strip()
+        # 提取重要注释并关联到所在或紧随其后的声明
+        if self.preserve_comments:
+            self._extract_comments()
+    
+    def _extract_comments(self) -> None:
+        """从遍历中收集的注释节点提取重要注释，字符串中的注释标记不会被误判"""
+        for node in self.comment_nodes:
+            text = self._node_text(node)
             
             # 处理文档注释块
-            if "/**" in line:
-                in_doc_comment = True
-                current_comment = [line]
-            elif in_doc_comment and "*/" in line:
-                current_comment.append(line)
-                comment_text = "\n".join(current_comment)
-                self.important_comments.append({
+            if text.startswith("/**"):
+                comment = {
                     "type": "doc_comment",
-                    "text": comment_text
-                })
-                in_doc_comment = False
-                current_comment = []
-            elif in_doc_comment:
-                current_comment.append(line)
+                    "text": "\n".join(line.strip() for line in text.split('\n'))
+                }
             
             # 处理单行注释（只保留看起来重要的）
-            elif line.startswith("//") and any(keyword in line.lower() for keyword in [
-                "todo", "fixme", "note", "important", "bug", "warning", "hack", 
-                "功能", "注意", "关键", "实现", "处理"
-            ]):
-                self.important_comments.append({
+            elif text.startswith("//") and self.IMPORTANT_COMMENT_PATTERN.search(text):
+                comment = {
                     "type": "line_comment",
-                    "text": line
-                })
+                    "text": text.strip()
+                }
+            else:
+                continue
+            
+            declaration = self._comment_declaration(node)
+            if declaration is not None:
+                attached_to = self._declaration_label(declaration)
+                if attached_to:
+                    comment["attached_to"] = attached_to
+            
+            self.important_comments.append(comment)
         
         # 如果聚合级别高，只保留最重要的注释
         if self.aggregation_level == "high":
@@ -272,13 +329,39 @@ class LLMFriendlyASTCompressor:
                 reverse=True
             )[:5]
     
+    def _comment_declaration(self, node):
+        """
+        注释所属的声明：注释与下一个声明之间只有空白或其他注释时（如文档注释）属于该声明，
+        否则属于包含注释的最内层声明（如方法体内的注释属于该方法），都没有时返回None
+        """
+        sibling = node.next_sibling
+        while sibling is not None and self._comment_kinds[sibling.kind_id]:
+            sibling = sibling.next_sibling
+        if sibling is not None and self._declaration_kinds[sibling.kind_id]:
+            return sibling
+        
+        parent = node.parent
+        while parent is not None and not self._declaration_kinds[parent.kind_id]:
+            parent = parent.parent
+        return parent
+    
+    def _declaration_label(self, node) -> Optional[str]:
+        """生成声明的简短描述，如 class Foo、method bar"""
+        if node.type == 'field_declaration':
+            declarator = self._find_child_by_type(node, 'variable_declarator')
+            name_node = self._find_child_by_type(declarator, 'identifier') if declarator else None
+        else:
+            name_node = self._find_child_by_type(node, 'identifier')
+        
+        if not name_node:
+            return None
+        
+        kind = node.type[:-len('_declaration')]
+        return f"{kind} {self._node_text(name_node)}"
+    
     def _comment_importance(self, comment_text: str) -> int:
         """评估注释的重要性分数"""
-        score = 0
-        keywords = ["功能", "注意", "关键", "实现", "处理", "todo", "fixme", "important"]
-        for keyword in keywords:
-            if keyword.lower() in comment_text.lower():
-                score += 1
+        score = len({keyword.lower() for keyword in self.COMMENT_SCORE_PATTERN.findall(comment_text)})
         
         # 文档注释通常更重要
         if comment_text.strip().startswith("/**"):
@@ -290,67 +373,71 @@ class LLMFriendlyASTCompressor:
         return score
     
     def _analyze_node(self, node, depth: int) -> None:
-        """分析节点并收集信息"""
+        """分析节点并收集信息，按节点类型分派到对应的收集方法"""
         if node is None:
             return
         
-        # 更新当前类和方法上下文
-        self._update_context(node)
-        
-        # 收集控制流信息
-        if self.track_control_flow and node.type in self.CONTROL_FLOW_NODES:
-            self._collect_control_flow(node)
-        
-        # 收集数据流信息（变量使用和状态变更）
-        if self.track_data_flow:
-            if node.type == 'variable_declarator':
-                self._collect_variable_declaration(node)
-            elif node.type == 'identifier' and not self._is_type_or_method_name(node):
-                self._collect_variable_usage(node)
-            elif node.type in self.STATE_CHANGE_NODES:
-                self._collect_state_change(node)
-        
-        # 收集方法调用信息
-        if node.type == 'method_invocation':
-            self._collect_method_call(node)
-        
-        # 收集字段信息
-        if node.type == 'field_declaration':
-            self._collect_field_info(node)
-        
-        # 计算方法复杂度
-        if self.include_method_intent and node.type == 'method_declaration':
-            self._calculate_method_complexity(node)
+        handler = self._node_handlers[node.kind_id]
+        if handler is not None:
+            handler(self, node)
         
         # 递归处理子节点
         if hasattr(node, 'children'):
             for child in node.children:
                 self._analyze_node(child, depth + 1)
     
-    def _update_context(self, node) -> None:
-        """更新当前处理的类和方法上下文"""
-        if node.type == 'class_declaration':
-            name_node = self._find_child_by_type(node, 'identifier')
-            if name_node and hasattr(name_node, 'text'):
-                self.current_class = name_node.text.decode('utf-8')
-        
-        elif node.type == 'method_declaration':
-            name_node = self._find_child_by_type(node, 'identifier')
-            if name_node and hasattr(name_node, 'text'):
-                self.current_method = name_node.text.decode('utf-8')
-                
-                # 初始化方法的控制流和复杂度信息
-                if self.current_method not in self.control_flow:
-                    self.control_flow[self.current_method] = {"flow_elements": []}
-                
-                if self.include_method_intent and self.current_method not in self.method_complexity:
-                    self.method_complexity[self.current_method] = {
-                        "complexity": 1,  # 基础复杂度为1
-                        "max_nesting": 0
-                    }
+    def _visit_class_declaration(self, node) -> None:
+        """更新当前类上下文"""
+        name_node = self._find_child_by_type(node, 'identifier')
+        if name_node and hasattr(name_node, 'text'):
+            self.current_class = self._node_text(name_node)
+    
+    def _visit_method_declaration(self, node) -> None:
+        """更新当前方法上下文，并计算方法复杂度"""
+        name_node = self._find_child_by_type(node, 'identifier')
+        if name_node and hasattr(name_node, 'text'):
+            self.current_method = self._node_text(name_node)
+            
+            # 初始化方法的控制流和复杂度信息
+            if self.current_method not in self.control_flow:
+                self.control_flow[self.current_method] = {"flow_elements": []}
+            
+            if self.include_method_intent and self.current_method not in self.method_complexity:
+                self.method_complexity[self.current_method] = {
+                    "complexity": 1,  # 基础复杂度为1
+                    "max_nesting": 0
+                }
         
-        # 方法结束时重置当前方法
-        elif node.type == 'block' and self._is_method_body(node) and self.current_method:
+        if self.include_method_intent:
+            self._calculate_method_complexity(node)
+    
+    def _visit_field_declaration(self, node) -> None:
+        """收集字段信息"""
+        self._collect_field_info(node)
+    
+    def _visit_comment(self, node) -> None:
+        if self.preserve_comments:
+            self.comment_nodes.append(node)
+    
+    def _visit_control_flow(self, node) -> None:
+        if self.track_control_flow:
+            self._collect_control_flow(node)
+    
+    def _visit_variable_declarator(self, node) -> None:
+        if self.track_data_flow:
+            self._collect_variable_declaration(node)
+    
+    def _visit_identifier(self, node) -> None:
+        if self.track_data_flow and not self._is_type_or_method_name(node):
+            self._collect_variable_usage(node)
+    
+    def _visit_state_change(self, node) -> None:
+        if self.track_data_flow:
+            self._collect_state_change(node)
+    
+    def _visit_block(self, node) -> None:
+        """方法结束时重置当前方法"""
+        if self._is_method_body(node) and self.current_method:
             self.current_method = None
     
     def _is_method_body(self, node) -> bool:
@@ -416,7 +503,7 @@ class LLMFriendlyASTCompressor:
                 if param_node:
                     type_node = self._find_child_by_type(param_node, 'type_identifier')
                     if type_node and hasattr(type_node, 'text'):
-                        catch_info["exception_type"] = type_node.text.decode('utf-8')
+                        catch_info["exception_type"] = self._node_text(type_node)
                 
                 catches.append(catch_info)
         
@@ -439,7 +526,7 @@ class LLMFriendlyASTCompressor:
         if not name_node or not hasattr(name_node, 'text'):
             return
             
-        var_name = name_node.text.decode('utf-8')
+        var_name = self._node_text(name_node)
         
         # 获取变量类型（从父节点找）
         var_type = "unknown"
@@ -447,7 +534,7 @@ class LLMFriendlyASTCompressor:
         if parent:
             type_node = self._find_child_by_type(parent, 'type_identifier')
             if type_node and hasattr(type_node, 'text'):
-                var_type = type_node.text.decode('utf-8')
+                var_type = self._node_text(type_node)
         
         # 初始化变量使用记录
         if var_name not in self.variable_usages:
@@ -471,7 +558,7 @@ class LLMFriendlyASTCompressor:
         if not self.current_method or not hasattr(node, 'text'):
             return
             
-        var_name = node.text.decode('utf-8')
+        var_name = self._node_text(node)
         
         # 如果变量还未记录，初始化
         if var_name not in self.variable_usages:
@@ -516,7 +603,7 @@ class LLMFriendlyASTCompressor:
         if node.type == 'assignment_expression' and hasattr(node, 'children') and len(node.children) > 0:
             target_node = node.children[0]
             if hasattr(target_node, 'text'):
-                target = target_node.text.decode('utf-8')
+                target = self._node_text(target_node)
         
         if not target:
             return
@@ -563,7 +650,7 @@ class LLMFriendlyASTCompressor:
         for child in node.children:
             # 方法名通常是第二个或最后一个标识符
             if child.type == 'identifier' and hasattr(child, 'text'):
-                return child.text.decode('utf-8')
+                return self._node_text(child)
         return None
     
     def _get_caller(self, node) -> Optional[str]:
@@ -571,7 +658,7 @@ class LLMFriendlyASTCompressor:
         if hasattr(node, 'children') and len(node.children) > 0:
             first_child = node.children[0]
             if first_child.type == 'identifier' and hasattr(first_child, 'text'):
-                return first_child.text.decode('utf-8')
+                return self._node_text(first_child)
         return None
     
     def _collect_field_info(self, node) -> None:
@@ -581,7 +668,7 @@ class LLMFriendlyASTCompressor:
         if not type_node or not hasattr(type_node, 'text'):
             return
         
-        field_type = type_node.text.decode('utf-8')
+        field_type = self._node_text(type_node)
         
         # 提取字段名
         var_declarator = self._find_child_by_type(node, 'variable_declarator')
@@ -592,7 +679,7 @@ class LLMFriendlyASTCompressor:
         if not name_node or not hasattr(name_node, 'text'):
             return
             
-        field_name = name_node.text.decode('utf-8')
+        field_name = self._node_text(name_node)
         
         # 提取修饰符
         modifiers = []
@@ -628,7 +715,7 @@ class LLMFriendlyASTCompressor:
             return current_depth
         
         # 检查是否是嵌套控制结构
-        is_control_structure = node.type in self.CONTROL_FLOW_NODES
+        is_control_structure = self._control_flow_kinds[node.kind_id]
         next_depth = current_depth + (1 if is_control_structure else 0)
         
         # 递归计算子节点的嵌套深度
@@ -678,7 +765,7 @@ class LLMFriendlyASTCompressor:
         
         return False
     
-    def _extract_file_info(self, root_node, source_code: Optional[str]) -> Dict[str, Any]:
+    def _extract_file_info(self, root_node, source_code: Optional[Union[str, bytes]]) -> Dict[str, Any]:
         """提取文件基本信息"""
         file_info = {"type": "Java source file"}
         
@@ -712,9 +799,8 @@ class LLMFriendlyASTCompressor:
                 file_info["imports"] = imports
         
         # 添加文件统计信息
-        if source_code:
-            lines = source_code.split('\n')
-            file_info["total_lines"] = len(lines)
+        if self.total_lines:
+            file_info["total_lines"] = self.total_lines
         
         return file_info
     
@@ -722,13 +808,13 @@ class LLMFriendlyASTCompressor:
         """从包声明中提取包名"""
         for child in package_node.children:
             if child.type == 'scoped_identifier' and hasattr(child, 'text'):
-                return child.text.decode('utf-8')
+                return self._node_text(child)
             
             # 递归搜索
             if hasattr(child, 'children'):
                 for grandchild in child.children:
                     if grandchild.type == 'scoped_identifier' and hasattr(grandchild, 'text'):
-                        return grandchild.text.decode('utf-8')
+                        return self._node_text(grandchild)
         
         return None
     
@@ -736,13 +822,13 @@ class LLMFriendlyASTCompressor:
         """从导入声明中提取导入名"""
         for child in import_node.children:
             if child.type == 'scoped_identifier' and hasattr(child, 'text'):
-                return child.text.decode('utf-8')
+                return self._node_text(child)
             
             # 递归搜索
             if hasattr(child, 'children'):
                 for grandchild in child.children:
                     if grandchild.type == 'scoped_identifier' and hasattr(grandchild, 'text'):
-                        return grandchild.text.decode('utf-8')
+                        return self._node_text(grandchild)
         
         return None
     
@@ -766,7 +852,7 @@ class LLMFriendlyASTCompressor:
         # 提取类名
         name_node = self._find_child_by_type(class_node, 'identifier')
         if name_node and hasattr(name_node, 'text'):
-            class_info["name"] = name_node.text.decode('utf-8')
+            class_info["name"] = self._node_text(name_node)
         
         # 提取修饰符
         modifiers = []
@@ -782,7 +868,7 @@ class LLMFriendlyASTCompressor:
         # 提取继承信息
         extends_node = self._find_child_by_field(class_node, 'superclass')
         if extends_node and hasattr(extends_node, 'text'):
-            class_info["extends"] = extends_node.text.decode('utf-8')
+            class_info["extends"] = self._node_text(extends_node)
         
         # 提取字段信息（按聚合级别）
         if self.fields_info:
@@ -828,7 +914,7 @@ class LLMFriendlyASTCompressor:
         # 提取方法名
         name_node = self._find_child_by_type(method_node, 'identifier')
         if name_node and hasattr(name_node, 'text'):
-            method_name = name_node.text.decode('utf-8')
+            method_name = self._node_text(name_node)
             method_info["name"] = method_name
         else:
             return None  # 无法识别的方法
@@ -847,7 +933,7 @@ class LLMFriendlyASTCompressor:
         # 提取返回类型
         return_type = self._find_child_by_type(method_node, 'type_identifier')
         if return_type and hasattr(return_type, 'text'):
-            method_info["return_type"] = return_type.text.decode('utf-8')
+            method_info["return_type"] = self._node_text(return_type)
         else:
             # 检查是否返回void
             void_type = self._find_child_by_type(method_node, 'void_type')
@@ -865,12 +951,12 @@ class LLMFriendlyASTCompressor:
                     # 参数类型
                     type_node = self._find_child_by_type(child, 'type_identifier')
                     if type_node and hasattr(type_node, 'text'):
-                        param_info["type"] = type_node.text.decode('utf-8')
+                        param_info["type"] = self._node_text(type_node)
                     
                     # 参数名称
                     name_node = self._find_child_by_type(child, 'identifier')
                     if name_node and hasattr(name_node, 'text'):
-                        param_info["name"] = name_node.text.decode('utf-8')
+                        param_info["name"] = self._node_text(name_node)
                     
                     if param_info:
                         params.append(param_info)
@@ -1030,6 +1116,10 @@ class LLMFriendlyASTCompressor:
         
         return self.important_comments
     
+    def _node_text(self, node) -> str:
+        """按字节偏移读取节点文本，兼容read回调解析出的不含源码的树"""
+        return node_text(node, self.source_code)
+    
     def _find_child_by_type(self, node, type_name: str):
         """查找特定类型的子节点"""
         if hasattr(node, 'children'):
@@ -1063,7 +1153,7 @@ class LLMFriendlyASTCompressor:
             return "unknown"
         
         if hasattr(node, 'text'):
-            text = node.text.decode('utf-8')
+            text = self._node_text(node)
             # 如果文本太长，截断它
             if len(text) > 30:
                 return text[:27] + "..."
@@ -1085,31 +1175,8 @@ class LLMFriendlyASTCompressor:
         return node.type
 
 
-def compress_java_ast(java_code: str, 
-                       lang_path: str = None,
-                       preserve_comments: bool = True, 
-                       track_control_flow: bool = True,
-                       track_data_flow: bool = True,
-                       include_method_intent: bool = True,
-                       aggregation_level: str = "medium",
-                       use_key_mapping: bool = True) -> Dict[str, Any]:
-    """
-    解析并优化压缩Java代码的AST，使用键名映射表减小大小并保持LLM可理解性
-    
-    Args:
-        java_code: Java源代码字符串
-        lang_path: tree-sitter语言库路径
-        preserve_comments: 是否保留关键注释信息
-        track_control_flow: 是否跟踪控制流
-        track_data_flow: 是否跟踪数据流
-        include_method_intent: 是否包含方法意图分析
-        aggregation_level: 聚合级别 ("low", "medium", "high")
-        use_key_mapping: 是否使用键名映射表减小输出大小
-    
-    Returns:
-        优化压缩后的AST字典
-    """
-    # 加载tree-sitter Java语言支持
+def load_java_language(lang_path: str = None) -> Language:
+    """加载tree-sitter Java语言支持"""
     try:
         if lang_path:
             JAVA_LANGUAGE = Language(lang_path, 'java')
@@ -1134,12 +1201,46 @@ def compress_java_ast(java_code: str,
         print(f"无法加载Java语言支持: {e}")
         raise
     
-    # 设置解析器
+    return JAVA_LANGUAGE
+
+
+def create_java_parser(lang_path: str = None, language: Language = None) -> Parser:
+    """创建Java解析器，未给出language时按lang_path加载"""
     parser = Parser()
-    parser.set_language(JAVA_LANGUAGE)
+    parser.set_language(language or load_java_language(lang_path))
+    return parser
+
+
+def compress_java_ast(java_code: Union[str, bytes], 
+                       lang_path: str = None,
+                       preserve_comments: bool = True, 
+                       track_control_flow: bool = True,
+                       track_data_flow: bool = True,
+                       include_method_intent: bool = True,
+                       aggregation_level: str = "medium",
+                       use_key_mapping: bool = True) -> Dict[str, Any]:
+    """
+    解析并优化压缩Java代码的AST，使用键名映射表减小大小并保持LLM可理解性
+    
+    Args:
+        java_code: Java源代码字符串，或bytes/mmap等字节缓冲区（不做拷贝直接解析），
+                   或StreamSource（通过read回调流式解析）
+        lang_path: tree-sitter语言库路径
+        preserve_comments: 是否保留关键注释信息
+        track_control_flow: 是否跟踪控制流
+        track_data_flow: 是否跟踪数据流
+        include_method_intent: 是否包含方法意图分析
+        aggregation_level: 聚合级别 ("low", "medium", "high")
+        use_key_mapping: 是否使用键名映射表减小输出大小
+    
+    Returns:
+        优化压缩后的AST字典
+    """
+    language = load_java_language(lang_path)
+    parser = create_java_parser(language=language)
     
     # 解析代码
-    tree = parser.parse(bytes(java_code, 'utf8'))
+    tree = parser.parse(to_parser_input(java_code))
     
     # 创建压缩器
     compressor = LLMFriendlyASTCompressor(
@@ -1148,59 +1249,107 @@ def compress_java_ast(java_code: str,
         track_data_flow=track_data_flow,
         include_method_intent=include_method_intent,
         aggregation_level=aggregation_level,
-        use_key_mapping=use_key_mapping
+        use_key_mapping=use_key_mapping,
+        language=language
     )
     
     # 压缩AST
     return compressor.compress(tree.root_node, java_code)
 
 
-def save_compressed_ast(compressed_ast: Dict[str, Any], output_file: str, indent: int = 2) -> None:
+def compress_java_file(file_path: str, stream: bool = False, **kwargs) -> Dict[str, Any]:
+    """
+    读取并压缩Java源文件，进程内只保留一份源码
+    
+    Args:
+        file_path: Java源文件路径
+        stream: 为True时通过read回调从文件句柄按块流式解析（适用于超大的生成代码），
+                否则以mmap方式映射文件并直接解析映射缓冲区
+        **kwargs: 传递给compress_java_ast的其他参数
+    
+    Returns:
+        优化压缩后的AST字典
+    """
+    open_source = open_java_stream if stream else open_java_source
+    
+    # 节点文本按字节偏移从映射/文件句柄读取，压缩需在with块内完成
+    with open_source(file_path) as java_code:
+        return compress_java_ast(java_code, **kwargs)
+
+
+def save_compressed_ast(compressed_ast: Dict[str, Any], output_file: str,
+                        indent: Optional[int] = None, dictionary=None,
+                        level: Optional[int] = None) -> bytes:
     """
     将压缩后的AST保存到文件
     
     Args:
         compressed_ast: 压缩后的AST字典
         output_file: 输出文件路径
-        indent: JSON缩进级别，None表示不缩进
-    """
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(compressed_ast, f, ensure_ascii=False, indent=indent)
+        indent: JSON缩进级别，默认None输出紧凑格式
+        dictionary: zstd字典（文件路径或字典内容，见ast_dictionary.py），
+            给出时以zstd+字典压缩写入 output_file + '.zst'，读取时需提供同一份字典
+        level: 使用字典时的zstd压缩级别
     
-    print(f"AST已保存到: {output_file}")
+    Returns:
+        写入的JSON字节（压缩前），可直接用于统计大小
+    """
+    if dictionary is None:
+        payload = ast_json.dump(compressed_ast, output_file, indent=indent)
+        print(f"AST已保存到: {output_file}")
+        return payload
+    
+    # 单个文件通常只有几十KB，一次序列化后整体压缩，统计信息仍可复用JSON字节
+    payload = ast_json.dumps(compressed_ast, indent=indent)
+    output_file += ast_codec.CODEC_SUFFIXES['zstd']
+    with open(output_file, 'wb') as f:
+        for data in ast_codec.iter_compress([payload], 'zstd', level, dictionary):
+            f.write(data)
+    print(f"AST已使用字典压缩保存到: {output_file}")
+    return payload
 
 
 # 压缩JSON输出的辅助函数
-def get_compressed_json(data: Any) -> str:
-    """获取紧凑格式的JSON字符串"""
-    import gzip
-    import base64
-    
-    # 先将数据转换为JSON字符串
-    json_str = json.dumps(data, ensure_ascii=False)
-    
-    # 使用gzip压缩
-    compressed = gzip.compress(json_str.encode('utf-8'))
-    
-    # 转换为base64编码的字符串
-    base64_str = base64.b64encode(compressed).decode('ascii')
-    
-    return base64_str
+def compress_json_bytes(payload: bytes, codec: str = 'gzip', level: Optional[int] = None,
+                        dictionary=None) -> str:
+    """将已序列化的JSON字节压缩并编码为base64字符串"""
+    return ''.join(ast_codec.iter_b64encode(ast_codec.iter_compress([payload], codec, level, dictionary)))
 
 
-def load_compressed_json(base64_str: str) -> Any:
-    """从压缩的JSON字符串中加载数据"""
-    import gzip
-    import base64
+def get_compressed_json(data: Any, codec: Optional[str] = None, level: Optional[int] = None,
+                        dictionary=None) -> str:
+    """
+    获取压缩并编码为base64的JSON字符串
     
-    # 解码base64
-    compressed = base64.b64decode(base64_str)
+    序列化、压缩、base64编码逐块进行，不生成完整的JSON字节。
     
-    # 解压gzip
-    json_str = gzip.decompress(compressed).decode('utf-8')
+    Args:
+        data: 要序列化的数据
+        codec: 'gzip'或'zstd'（需安装zstandard），默认给出字典时为zstd，否则为gzip
+        level: 压缩级别，None使用各格式的默认值
+        dictionary: zstd字典（文件路径或字典内容，见ast_dictionary.py）
+    """
+    if codec is None:
+        codec = 'gzip' if dictionary is None else 'zstd'
+    return ast_codec.encode_compressed_json(data, codec, level, dictionary)
+
+
+def load_compressed_json(base64_str: str, dictionary=None) -> Any:
+    """从压缩的JSON字符串中加载数据，压缩格式（gzip/zstd）按数据开头自动识别"""
+    return ast_codec.decode_compressed_json(base64_str, dictionary)
+
+
+def key_mapping_savings(payload: bytes, key_mapping: Dict[str, str]) -> int:
+    """
+    根据已序列化的JSON估算键名映射节省的字节数
     
-    # 解析JSON
-    return json.loads(json_str)
+    统计每个短键名作为对象键出现的次数，乘以与原键名的长度差，再减去映射表本身的大小。
+    """
+    saved = 0
+    for full_key, short_key in key_mapping.items():
+        occurrences = payload.count(b'"' + short_key.encode('utf-8') + b'":')
+        saved += occurrences * (len(full_key.encode('utf-8')) - len(short_key.encode('utf-8')))
+    return saved - len(ast_json.dumps(key_mapping))
 
 
 # 使用示例
@@ -1218,18 +1367,22 @@ if __name__ == "__main__":
     parser.add_argument('--no-key-mapping', action='store_true', help='不使用键名映射表')
     parser.add_argument('--aggregation', '-a', choices=['low', 'medium', 'high'], 
                         default='medium', help='聚合级别')
-    parser.add_argument('--no-indent', action='store_true', help='输出不缩进的JSON')
+    parser.add_argument('--indent', type=int, default=None, help='JSON缩进级别，默认输出紧凑格式')
+    # 已弃用：默认即为紧凑输出，保留该选项只为兼容旧脚本，不再起作用
+    parser.add_argument('--no-indent', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--json-backend', choices=ast_json.BACKEND_ORDER, default=None,
+                        help='JSON序列化后端，默认选择已安装的最快实现')
     parser.add_argument('--compress-output', action='store_true', help='压缩输出的JSON')
+    parser.add_argument('--codec', choices=ast_codec.CODECS, default='gzip',
+                        help='--compress-output使用的压缩格式，zstd需安装zstandard')
+    parser.add_argument('--dictionary', '-D', default=None,
+                        help='zstd字典路径（由ast_dictionary.py训练），使用zstd+字典压缩输出')
+    parser.add_argument('--stream', action='store_true', help='流式解析（适用于超大的生成代码）')
     
     args = parser.parse_args()
     
-    # 读取指定的Java文件
-    try:
-        with open(args.input, 'r', encoding='utf-8') as f:
-            java_code = f.read()
-    except Exception as e:
-        print(f"读取文件失败: {e}")
-        exit(1)
+    if args.json_backend:
+        ast_json.set_backend(args.json_backend)
     
     # 生成输出文件名
     if args.output:
@@ -1239,51 +1392,66 @@ if __name__ == "__main__":
         base_name = os.path.splitext(filename)[0]
         output_file = f"{base_name}_llm_friendly_ast.json"
     
-    # 压缩AST
+    # 压缩AST（mmap缓冲区或流式read回调直接交给解析器）
     print(f"正在优化分析 {args.input}...")
-    compressed_ast = compress_java_ast(
-        java_code,
-        lang_path=args.lang_path,
-        preserve_comments=not args.no_comments,
-        track_control_flow=not args.no_control_flow,
-        track_data_flow=not args.no_data_flow,
-        include_method_intent=not args.no_method_intent,
-        aggregation_level=args.aggregation,
-        use_key_mapping=not args.no_key_mapping
-    )
+    try:
+        compressed_ast = compress_java_file(
+            args.input,
+            stream=args.stream,
+            lang_path=args.lang_path,
+            preserve_comments=not args.no_comments,
+            track_control_flow=not args.no_control_flow,
+            track_data_flow=not args.no_data_flow,
+            include_method_intent=not args.no_method_intent,
+            aggregation_level=args.aggregation,
+            use_key_mapping=not args.no_key_mapping
+        )
+    except OSError as e:
+        print(f"读取文件失败: {e}")
+        exit(1)
+    
+    # 字典只用于zstd，指定字典时以zstd压缩
+    codec = 'zstd' if args.dictionary else args.codec
+    dictionary = ast_codec.load_zstd_dictionary(args.dictionary)
     
-    # 保存AST
-    indent = None if args.no_indent else 2
+    # 保存AST，只序列化一次，统计信息直接基于写出的字节
     if args.compress_output:
-        # 压缩JSON输出
-        base64_str = get_compressed_json(compressed_ast)
+        # 压缩JSON输出：逐块序列化、压缩、编码后写入，统计各阶段的字节数
+        sizes = {'json': 0, 'compressed': 0, 'base64': 0}
+        
+        def counted(chunks, key):
+            for chunk in chunks:
+                sizes[key] += len(chunk)
+                yield chunk
+        
+        json_chunks = counted(ast_json.iter_encode(compressed_ast, indent=args.indent), 'json')
+        compressed_chunks = counted(ast_codec.iter_compress(json_chunks, codec, dictionary=dictionary), 'compressed')
         with open(output_file + '.b64', 'w') as f:
-            f.write(base64_str)
+            for text in counted(ast_codec.iter_b64encode(compressed_chunks), 'base64'):
+                f.write(text)
         print(f"压缩的AST已保存到: {output_file}.b64")
+        payload = None
+        original_size = sizes['json']
     else:
-        save_compressed_ast(compressed_ast, output_file, indent=indent)
+        payload = save_compressed_ast(compressed_ast, output_file, indent=args.indent, dictionary=dictionary)
+        original_size = len(payload)
     
     # 输出统计信息
-    print("\n优化AST统计信息:")
+    print(f"\n优化AST统计信息 (JSON后端: {ast_json.backend_name}):")
     
-    # 估算大小减少
-    original_json = json.dumps(compressed_ast)
-    original_size = len(original_json)
-    
-    # 如果使用了键名映射表，计算节省的空间
-    if not args.no_key_mapping:
-        # 假设没有使用键名映射
-        data = compressed_ast.get("data", {})
-        unwrapped_json = json.dumps(data)
-        unwrapped_size = len(unwrapped_json)
-        
-        saved_bytes = unwrapped_size - original_size + len(json.dumps(compressed_ast["key_mapping"]))
+    # 如果使用了键名映射表，计算节省的空间（需要完整的JSON字节，仅在未压缩输出时统计）
+    if not args.no_key_mapping and payload is not None:
+        saved_bytes = key_mapping_savings(payload, compressed_ast["key_mapping"])
+        unwrapped_size = original_size + saved_bytes
         save_percent = (saved_bytes / unwrapped_size) * 100 if unwrapped_size > 0 else 0
         
         print(f"- 键名映射节省空间: {saved_bytes / 1024:.2f} KB ({save_percent:.1f}%)")
     
     # 基本输出大小统计
     print(f"- AST压缩后大小: {original_size / 1024:.2f} KB")
+    if args.compress_output:
+        print(f"- {codec}压缩后大小: {sizes['compressed'] / 1024:.2f} KB")
+        print(f"- base64编码后大小: {sizes['base64'] / 1024:.2f} KB")
     
     # 显示键名映射表
     if not args.no_key_mapping:
@@ -0,0 +1,254 @@
+"""整个项目的压缩AST归档文件
+
+每个类输出一个JSON文件时，大项目会产生数十万个小文件，文件系统和下游加载都很慢。
+归档把所有文件的压缩AST写入单个文件：
+
+    文件头（固定HEADER_SIZE字节）
+    各文件的压缩数据（每个文件独立压缩，依次排列）
+    zstd字典（可选，原样保存）
+    索引（压缩的JSON）
+
+索引记录每个源文件的相对路径、其中顶层类的全限定名、数据的偏移与长度以及JSON的SHA-256，
+读取时只需解压索引，按类名找到对应文件后读取并解压这一段数据，不必解压整个归档。
+索引写在末尾，写入时可以边压缩边追加，最后回填文件头中的索引位置。
+"""
+import os
+import struct
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+import ast_codec
+import ast_json
+from output_manifest import content_digest
+
+# 与ast_table.py节点表（JAST / .jast）区分的魔数和扩展名
+ARCHIVE_MAGIC = b'JARC'
+ARCHIVE_VERSION = 1
+
+# 魔数、版本、压缩格式、保留字节、索引偏移、索引长度、字典偏移、字典长度
+_HEADER = struct.Struct('<4sHBBQQQQ')
+HEADER_SIZE = _HEADER.size
+
+_CODEC_IDS = {name: index for index, name in enumerate(ast_codec.CODECS)}
+
+ARCHIVE_SUFFIX = '.jarc'
+
+
+def class_names(compressed_ast: Dict[str, Any], default_name: Optional[str] = None) -> List[str]:
+    """
+    从ast-compressor5的输出中取出顶层类的全限定名
+
+    兼容使用与不使用键名映射的输出；没有识别出类（如只含接口的文件）时使用default_name。
+    """
+    key_mapping = compressed_ast.get("key_mapping", {})
+    data = compressed_ast.get("data", compressed_ast)
+
+    def get(obj, key, default=None):
+        return obj.get(key_mapping.get(key, key), default)
+
+    package = get(get(data, "file_info", {}), "package")
+    names = [get(class_info, "name") for class_info in get(get(data, "structure", {}), "classes", [])]
+    names = [name for name in names if name] or ([default_name] if default_name else [])
+    return [f"{package}.{name}" if package else name for name in names]
+
+
+class ArchiveWriter:
+    """
+    按顺序追加各文件的压缩AST，close时写入索引并回填文件头
+
+    add可在多个线程中调用，写入按调用顺序串行进行。
+    """
+
+    def __init__(self, path: str, codec: str = 'gzip', level: Optional[int] = None, dictionary=None):
+        """
+        Args:
+            path: 归档文件路径
+            codec: 各文件数据的压缩格式，'gzip'或'zstd'
+            level: 压缩级别，None使用各格式的默认值
+            dictionary: zstd字典（文件路径或字典内容），会一并写入归档，读取时无需另外提供
+        """
+        if codec not in _CODEC_IDS:
+            raise ValueError(f"未知的压缩格式: {codec}，可选: {', '.join(ast_codec.CODECS)}")
+        self.path = path
+        self.codec = codec
+        self.level = level
+        self.dictionary = ast_codec.load_zstd_dictionary(dictionary) if dictionary is not None else None
+        self.entries: List[Dict[str, Any]] = []
+        self._paths = set()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'wb')
+        self._file.write(b'\0' * HEADER_SIZE)
+        self._offset = HEADER_SIZE
+
+    def compress(self, payload: bytes) -> bytes:
+        """按归档的压缩设置压缩单个文件的JSON字节，可在写入线程之外调用"""
+        return ast_codec.compress(payload, self.codec, self.level, self.dictionary)
+
+    def add(self, path: str, payload: bytes, classes: Optional[List[str]] = None,
+            compressed: bool = False, size: Optional[int] = None, digest: Optional[str] = None) -> None:
+        """
+        追加一个文件
+
+        Args:
+            path: 源文件的相对路径，归档内唯一
+            payload: JSON字节，compressed为True时为已按compress压缩的数据
+            classes: 文件中顶层类的全限定名
+            compressed: payload是否已压缩
+            size: 压缩前的字节数，payload已压缩时用于统计
+            digest: 压缩前JSON的SHA-256，用于比较两次生成的归档中哪些文件变化
+        """
+        if not compressed:
+            size = len(payload)
+            digest = content_digest(payload)
+            payload = self.compress(payload)
+        with self._lock:
+            if path in self._paths:
+                raise ValueError(f"归档中已存在文件: {path}")
+            self._paths.add(path)
+            self._file.write(payload)
+            self.entries.append({
+                "path": path,
+                "classes": classes or [],
+                "offset": self._offset,
+                "length": len(payload),
+                "size": size,
+                "sha256": digest,
+            })
+            self._offset += len(payload)
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        with self._lock:
+            dict_offset = dict_length = 0
+            if self.dictionary is not None:
+                content = self.dictionary.as_bytes()
+                dict_offset, dict_length = self._offset, len(content)
+                self._file.write(content)
+                self._offset += dict_length
+
+            # 索引始终用gzip压缩，只列出内容时不需要安装zstandard
+            index = ast_codec.compress(ast_json.dumps({"files": self.entries}), 'gzip')
+            self._file.write(index)
+            self._file.seek(0)
+            self._file.write(_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, _CODEC_IDS[self.codec], 0,
+                                          self._offset, len(index), dict_offset, dict_length))
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'ArchiveWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class ArchiveReader:
+    """按路径或类的全限定名随机读取归档中的单个文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._lock = threading.Lock()
+        try:
+            header = self._file.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                raise ValueError(f"不是有效的AST归档: {path}")
+            (magic, version, codec_id, _, index_offset, index_length,
+             dict_offset, dict_length) = _HEADER.unpack(header)
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"不是有效的AST归档: {path}")
+            if version > ARCHIVE_VERSION:
+                raise ValueError(f"不支持的归档版本: {version}")
+            if index_offset == 0:
+                raise ValueError(f"归档未正常关闭，缺少索引: {path}")
+
+            self.codec = ast_codec.CODECS[codec_id]
+            # 字典在第一次解压数据时才转换，只列出内容时不需要zstandard
+            self.dictionary = self._read(dict_offset, dict_length) if dict_length else None
+            index = ast_json.loads(ast_codec.decompress(self._read(index_offset, index_length)))
+        except Exception:
+            self._file.close()
+            raise
+
+        self.entries: List[Dict[str, Any]] = index["files"]
+        self._by_path = {entry["path"]: entry for entry in self.entries}
+        self._by_class = {name: entry for entry in self.entries for name in entry["classes"]}
+
+    def _read(self, offset: int, length: int) -> bytes:
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_class or name in self._by_path
+
+    def paths(self) -> List[str]:
+        return list(self._by_path)
+
+    def class_names(self) -> List[str]:
+        return list(self._by_class)
+
+    def entry(self, name: str) -> Dict[str, Any]:
+        """按类的全限定名或文件路径查找索引项"""
+        entry = self._by_class.get(name) or self._by_path.get(name)
+        if entry is None:
+            raise KeyError(name)
+        return entry
+
+    def class_entry(self, fqn: str) -> Dict[str, Any]:
+        """只按类的全限定名查找索引项，文件路径不匹配"""
+        return self._by_class[fqn]
+
+    def read_bytes(self, name: str) -> bytes:
+        """读取并解压单个文件的JSON字节"""
+        entry = self.entry(name)
+        data = self._read(entry["offset"], entry["length"])
+        if isinstance(self.dictionary, bytes):
+            self.dictionary = ast_codec.load_zstd_dictionary(self.dictionary)
+        return bytes(ast_codec.decompress(data, self.dictionary))
+
+    def load(self, name: str) -> Dict[str, Any]:
+        """读取单个文件的压缩AST，name为类的全限定名或文件路径"""
+        return ast_json.loads(self.read_bytes(name))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._by_path)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> 'ArchiveReader':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='查看或读取压缩AST归档')
+    parser.add_argument('archive', help='归档文件路径')
+    parser.add_argument('name', nargs='?', help='要读取的类全限定名或文件路径，省略时列出内容')
+    parser.add_argument('--indent', type=int, default=None, help='输出JSON的缩进级别')
+
+    args = parser.parse_args()
+
+    with ArchiveReader(args.archive) as archive:
+        if args.name is None:
+            print(f"格式: {archive.codec}{'+字典' if archive.dictionary is not None else ''}, "
+                  f"文件数: {len(archive)}")
+            for entry in archive.entries:
+                print(f"{entry['path']}\t{entry['length']}/{entry['size']}\t{', '.join(entry['classes'])}")
+        else:
+            try:
+                print(ast_json.dumps(archive.load(args.name), indent=args.indent).decode('utf-8'))
+            except KeyError:
+                print(f"归档中没有 {args.name}")
+                exit(1)
@@ -0,0 +1,209 @@
+"""压缩AST输出的流式压缩与解压
+
+JSON由ast_json.iter_encode按块生成，逐块送入gzip或zstd压缩器后直接写入文件，
+或再逐块编码为base64，全程不生成完整的JSON字符串或完整的压缩数据副本。
+读取时按块解压，只在内存中保留解压后的JSON供解析。
+
+gzip使用标准库zlib；zstd需要安装zstandard，可选使用训练好的字典
+（每个文件重复出现的键名和节点类型放进字典后，小文件的压缩率明显提高）。
+压缩格式通过数据开头的魔数识别，读取时无需指定。
+"""
+import base64
+import binascii
+import zlib
+from typing import Any, Iterable, Iterator, Optional
+
+import ast_json
+
+CODECS = ('gzip', 'zstd')
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# 文件扩展名，与codec对应
+CODEC_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+# 读取文件时每次读入的字节数
+READ_CHUNK_SIZE = 256 * 1024
+
+# zlib的wbits取31时读写gzip格式（含头部和校验）
+_GZIP_WBITS = 31
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd压缩需要安装zstandard: pip install zstandard")
+    return zstandard
+
+
+def load_zstd_dictionary(dictionary) -> Optional[Any]:
+    """
+    将字典转换为zstandard.ZstdCompressionDict
+
+    Args:
+        dictionary: None、字典文件路径、字典内容bytes或已构建的ZstdCompressionDict
+    """
+    if dictionary is None:
+        return None
+    zstandard = _import_zstandard()
+    if isinstance(dictionary, zstandard.ZstdCompressionDict):
+        return dictionary
+    if isinstance(dictionary, str):
+        with open(dictionary, 'rb') as f:
+            dictionary = f.read()
+    return zstandard.ZstdCompressionDict(dictionary)
+
+
+def make_compressor(codec: str = 'gzip', level: Optional[int] = None, dictionary=None):
+    """创建增量压缩器，提供compress(data)与flush()"""
+    if codec == 'gzip':
+        if dictionary is not None:
+            raise ValueError("gzip不支持压缩字典")
+        return zlib.compressobj(9 if level is None else level, zlib.DEFLATED, _GZIP_WBITS)
+    if codec == 'zstd':
+        zstandard = _import_zstandard()
+        return zstandard.ZstdCompressor(level=3 if level is None else level,
+                                        dict_data=load_zstd_dictionary(dictionary)).compressobj()
+    raise ValueError(f"未知的压缩格式: {codec}，可选: {', '.join(CODECS)}")
+
+
+def make_decompressor(header: bytes, dictionary=None):
+    """按数据开头的魔数创建增量解压器，提供decompress(data)"""
+    if header.startswith(GZIP_MAGIC):
+        return zlib.decompressobj(_GZIP_WBITS)
+    if header.startswith(ZSTD_MAGIC):
+        zstandard = _import_zstandard()
+        return zstandard.ZstdDecompressor(dict_data=load_zstd_dictionary(dictionary)).decompressobj()
+    raise ValueError("无法识别的压缩格式")
+
+
+def iter_compress(chunks: Iterable[bytes], codec: str = 'gzip', level: Optional[int] = None,
+                  dictionary=None) -> Iterator[bytes]:
+    """逐块压缩，输出压缩后的数据块"""
+    compressor = make_compressor(codec, level, dictionary)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    data = compressor.flush()
+    if data:
+        yield data
+
+
+def iter_decompress(chunks: Iterable[bytes], dictionary=None) -> Iterator[bytes]:
+    """逐块解压，压缩格式由第一块的魔数确定"""
+    decompressor = None
+    for chunk in chunks:
+        if decompressor is None:
+            if not chunk:
+                continue
+            decompressor = make_decompressor(chunk, dictionary)
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    if decompressor is not None and hasattr(decompressor, 'flush'):
+        data = decompressor.flush()
+        if data:
+            yield data
+
+
+def iter_b64encode(chunks: Iterable[bytes]) -> Iterator[str]:
+    """逐块base64编码，每次只编码3字节对齐的部分，结果拼接后与一次性编码相同"""
+    remainder = b''
+    for chunk in chunks:
+        data = remainder + chunk
+        cut = len(data) - len(data) % 3
+        remainder = data[cut:]
+        if cut:
+            yield base64.b64encode(data[:cut]).decode('ascii')
+    if remainder:
+        yield base64.b64encode(remainder).decode('ascii')
+
+
+def iter_b64decode(text: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    逐块解码base64字符串
+
+    换行等空白可能出现在任意位置，每块先去掉空白，再只解码4字符对齐的部分，
+    余下的字符并入下一块，结果与去掉全部空白后一次性解码相同。
+    """
+    step = max(4, chunk_size - chunk_size % 4)
+    pending = ''
+    for start in range(0, len(text), step):
+        piece = pending + ''.join(text[start:start + step].split())
+        cut = len(piece) - len(piece) % 4
+        pending = piece[cut:]
+        if cut:
+            yield _b64decode(piece[:cut])
+    if pending:
+        yield _b64decode(pending)
+
+
+def _b64decode(text: str) -> bytes:
+    try:
+        return base64.b64decode(text)
+    except binascii.Error as e:
+        raise ValueError(f"base64数据无效: {e}")
+
+
+def iter_file(input_file: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+    with open(input_file, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _join_decompressed(chunks: Iterable[bytes], dictionary=None) -> bytearray:
+    # 解压结果直接追加到同一个缓冲区，不再拼接出额外副本
+    buffer = bytearray()
+    for data in iter_decompress(chunks, dictionary):
+        buffer += data
+    return buffer
+
+
+def compress(payload: bytes, codec: str = 'gzip', level: Optional[int] = None, dictionary=None) -> bytes:
+    """一次性压缩完整的字节数据"""
+    return b''.join(iter_compress([payload], codec, level, dictionary))
+
+
+def decompress(data: bytes, dictionary=None) -> bytearray:
+    """一次性解压完整的gzip或zstd数据"""
+    return _join_decompressed([data], dictionary)
+
+
+def write_compressed_json(obj: Any, output_file: str, codec: str = 'gzip',
+                          indent: Optional[int] = None, level: Optional[int] = None,
+                          dictionary=None) -> int:
+    """
+    将对象流式序列化并压缩写入文件
+
+    Returns:
+        写入的压缩数据字节数
+    """
+    written = 0
+    with open(output_file, 'wb') as f:
+        for data in iter_compress(ast_json.iter_encode(obj, indent), codec, level, dictionary):
+            f.write(data)
+            written += len(data)
+    return written
+
+
+def read_compressed_json(input_file: str, dictionary=None) -> Any:
+    """按块读取并解压write_compressed_json写出的文件（gzip或zstd）"""
+    return ast_json.loads(_join_decompressed(iter_file(input_file), dictionary))
+
+
+def encode_compressed_json(obj: Any, codec: str = 'gzip', level: Optional[int] = None,
+                           dictionary=None) -> str:
+    """序列化、压缩并编码为base64字符串，只有最终的base64结果是完整副本"""
+    chunks = iter_compress(ast_json.iter_encode(obj), codec, level, dictionary)
+    return ''.join(iter_b64encode(chunks))
+
+
+def decode_compressed_json(base64_str: str, dictionary=None) -> Any:
+    """解码encode_compressed_json生成的base64字符串"""
+    return ast_json.loads(_join_decompressed(iter_b64decode(base64_str), dictionary))
@@ -0,0 +1,171 @@
+"""训练压缩AST输出使用的zstd字典
+
+单个类的压缩AST只有10~50KB，每个文件都重复同样的键名映射表、节点类型和修饰符，
+gzip/zstd在单个文件内来不及积累这些重复内容，压缩率较低。
+从一批项目输出中训练zstd字典后，压缩时预先载入这些公共片段，小文件的压缩率明显提高。
+
+用法:
+    python ast_dictionary.py train -o java_ast.zdict [样本文件或目录 ...]
+    python ast_dictionary.py report -d java_ast.zdict [样本文件或目录 ...]
+
+样本默认取仓库根目录下的 *_ast_output*.json(.gz)。训练出的字典通过
+ast-compressor5.py 的 --dictionary 参数或 get_compressed_json(dictionary=...) 使用，
+读取时需提供同一份字典。
+"""
+import glob
+import gzip
+import os
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+import ast_codec
+import ast_json
+
+# 默认样本：仓库根目录下各压缩器的输出示例
+DEFAULT_SAMPLE_PATTERN = os.path.join(os.path.dirname(os.path.abspath(__file__)), '*_ast_output*.json*')
+
+# 默认字典大小，约为单个输出文件的大小
+DEFAULT_DICT_SIZE = 32 * 1024
+
+# zstd训练需要足够多的样本，样本较少时按块切分后作为训练数据
+SAMPLE_BLOCK_SIZE = 4 * 1024
+
+# 报告中比较的zstd压缩级别
+DEFAULT_LEVEL = 3
+
+
+def find_samples(paths: Iterable[str] = ()) -> List[str]:
+    """收集样本文件，目录按 *.json / *.json.gz 展开，未指定时使用DEFAULT_SAMPLE_PATTERN"""
+    paths = list(paths) or [DEFAULT_SAMPLE_PATTERN]
+    samples = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                samples.extend(os.path.join(root, name) for name in files
+                               if name.endswith('.json') or name.endswith('.json.gz'))
+        else:
+            samples.extend(glob.glob(path) if glob.has_magic(path) else [path])
+    return sorted(set(samples))
+
+
+def load_sample(path: str) -> bytes:
+    """
+    读取样本并重新序列化为紧凑格式
+
+    仓库中的示例输出有的带缩进、有的经过gzip压缩，统一为压缩器当前写出的紧凑JSON，
+    训练和统计都以实际会被压缩的字节为准。
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        return ast_json.dumps(ast_json.loads(f.read()))
+
+
+def split_blocks(payload: bytes, block_size: int = SAMPLE_BLOCK_SIZE) -> List[bytes]:
+    return [payload[start:start + block_size] for start in range(0, len(payload), block_size)]
+
+
+def train_dictionary(payloads: List[bytes], dict_size: int = DEFAULT_DICT_SIZE,
+                     level: int = DEFAULT_LEVEL):
+    """
+    从样本训练zstd字典
+
+    Args:
+        payloads: 样本JSON字节
+        dict_size: 字典大小上限（字节）
+        level: 训练时参考的压缩级别
+
+    Returns:
+        zstandard.ZstdCompressionDict，as_bytes()可直接写入文件
+    """
+    zstandard = ast_codec._import_zstandard()
+    blocks = [block for payload in payloads for block in split_blocks(payload)]
+    if not blocks:
+        raise ValueError("没有可用于训练的样本")
+    return zstandard.train_dictionary(dict_size, blocks, level=level)
+
+
+def compression_report(samples: Dict[str, bytes], dictionary=None,
+                       level: int = DEFAULT_LEVEL) -> List[Dict[str, Any]]:
+    """
+    逐个样本统计原始、gzip、zstd以及zstd+字典压缩后的字节数
+
+    Returns:
+        每个样本一项，包含path、raw、gzip、zstd，给出字典时还有zstd_dict
+    """
+    zstandard = ast_codec._import_zstandard()
+    plain = zstandard.ZstdCompressor(level=level)
+    with_dict = None
+    if dictionary is not None:
+        with_dict = zstandard.ZstdCompressor(level=level, dict_data=ast_codec.load_zstd_dictionary(dictionary))
+
+    rows = []
+    for path, payload in samples.items():
+        row = {
+            "path": path,
+            "raw": len(payload),
+            "gzip": len(zlib.compress(payload, 9)),
+            "zstd": len(plain.compress(payload)),
+        }
+        if with_dict is not None:
+            row["zstd_dict"] = len(with_dict.compress(payload))
+        rows.append(row)
+    return rows
+
+
+def print_report(rows: List[Dict[str, Any]], dict_size: Optional[int] = None) -> None:
+    columns = ["raw", "gzip", "zstd"] + (["zstd_dict"] if rows and "zstd_dict" in rows[0] else [])
+    print(f"{'样本':<48}" + ''.join(f"{column:>11}" for column in columns))
+    for row in rows:
+        name = os.path.basename(row["path"])
+        print(f"{name[:47]:<48}" + ''.join(f"{row[column]:>11}" for column in columns))
+
+    totals = {column: sum(row[column] for row in rows) for column in columns}
+    print(f"{'合计':<48}" + ''.join(f"{totals[column]:>11}" for column in columns))
+    for column in columns[1:]:
+        print(f"- {column}压缩率: {totals['raw'] / totals[column]:.2f}x")
+    if "zstd_dict" in totals:
+        print(f"- 字典相对gzip: {totals['gzip'] / totals['zstd_dict']:.2f}x, "
+              f"相对无字典zstd: {totals['zstd'] / totals['zstd_dict']:.2f}x")
+        if dict_size is not None:
+            print(f"- 字典大小: {dict_size / 1024:.1f} KB（各文件共享，只需保存一份）")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='训练并评估压缩AST输出使用的zstd字典')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help='从样本训练字典并输出压缩率对比')
+    train_parser.add_argument('samples', nargs='*', help='样本文件、目录或通配符，默认仓库中的 *_ast_output*.json')
+    train_parser.add_argument('--output', '-o', default='java_ast.zdict', help='字典输出路径')
+    train_parser.add_argument('--size', type=int, default=DEFAULT_DICT_SIZE, help='字典大小（字节）')
+    train_parser.add_argument('--level', type=int, default=DEFAULT_LEVEL, help='zstd压缩级别')
+
+    report_parser = subparsers.add_parser('report', help='用已有字典统计样本的压缩率')
+    report_parser.add_argument('samples', nargs='*', help='样本文件、目录或通配符，默认仓库中的 *_ast_output*.json')
+    report_parser.add_argument('--dictionary', '-d', required=True, help='字典文件路径')
+    report_parser.add_argument('--level', type=int, default=DEFAULT_LEVEL, help='zstd压缩级别')
+
+    args = parser.parse_args()
+
+    sample_paths = find_samples(args.samples)
+    if not sample_paths:
+        print("未找到样本文件")
+        exit(1)
+    samples = {path: load_sample(path) for path in sample_paths}
+    print(f"样本: {len(samples)} 个文件, {sum(map(len, samples.values())) / 1024:.1f} KB")
+
+    if args.command == 'train':
+        dictionary = train_dictionary(list(samples.values()), args.size, args.level)
+        content = dictionary.as_bytes()
+        with open(args.output, 'wb') as f:
+            f.write(content)
+        print(f"字典已保存到: {args.output} (id: {dictionary.dict_id()})")
+        print("注意: 以下统计的样本同时参与了训练，评估其他项目的输出请使用report命令")
+    else:
+        dictionary = args.dictionary
+        with open(dictionary, 'rb') as f:
+            content = f.read()
+
+    print_report(compression_report(samples, dictionary, args.level), len(content))
@@ -0,0 +1,164 @@
+"""压缩AST输出使用的JSON序列化后端
+
+按 orjson -> ujson -> 标准库json 的顺序选择已安装的实现，也可通过set_backend指定。
+dumps统一返回UTF-8编码的bytes（不转义非ASCII字符），indent为None时输出不含空白的紧凑格式，
+供程序读取；需要人工阅读时再指定缩进。
+iter_encode按块流式输出同样的字节，供ast_codec直接写入压缩流而不生成完整的JSON字符串。
+"""
+import json
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+BACKEND_ORDER = ('orjson', 'ujson', 'json')
+
+# iter_encode每次输出的字节数下限
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# iter_encode逐项展开的容器层数，更深的值整体交给后端序列化
+STREAM_SPLIT_DEPTH = 4
+
+
+def _orjson_backend():
+    import orjson
+
+    def dumps(obj: Any, indent: Optional[int] = None) -> bytes:
+        # orjson只支持2空格缩进，其余缩进交给标准库
+        if indent is None:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        if indent == 2:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2)
+        return _json_dumps(obj, indent)
+
+    return dumps, orjson.loads
+
+
+def _ujson_backend():
+    import ujson
+
+    def dumps(obj: Any, indent: Optional[int] = None) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False,
+                           indent=indent or 0).encode('utf-8')
+
+    def loads(data) -> Any:
+        # ujson不接受bytearray/memoryview
+        if isinstance(data, (bytearray, memoryview)):
+            data = bytes(data)
+        return ujson.loads(data)
+
+    return dumps, loads
+
+
+def _json_dumps(obj: Any, indent: Optional[int] = None) -> bytes:
+    separators = (',', ':') if indent is None else (',', ': ')
+    return json.dumps(obj, ensure_ascii=False, indent=indent, separators=separators).encode('utf-8')
+
+
+def _json_backend():
+    return _json_dumps, json.loads
+
+
+_BACKENDS: Dict[str, Callable[[], Tuple[Callable, Callable]]] = {
+    'orjson': _orjson_backend,
+    'ujson': _ujson_backend,
+    'json': _json_backend,
+}
+
+backend_name = None
+_dumps = None
+_loads = None
+
+
+def set_backend(name: Optional[str] = None) -> str:
+    """
+    选择序列化后端
+
+    Args:
+        name: 'orjson'、'ujson'或'json'，为None时选择第一个可用的后端
+
+    Returns:
+        实际使用的后端名称
+    """
+    global backend_name, _dumps, _loads
+    if name is not None and name not in _BACKENDS:
+        raise ValueError(f"未知的JSON后端: {name}，可选: {', '.join(BACKEND_ORDER)}")
+
+    for candidate in ((name,) if name else BACKEND_ORDER):
+        try:
+            _dumps, _loads = _BACKENDS[candidate]()
+        except ImportError:
+            if name:
+                raise
+            continue
+        backend_name = candidate
+        break
+    return backend_name
+
+
+def dumps(obj: Any, indent: Optional[int] = None) -> bytes:
+    """序列化为UTF-8编码的JSON，indent为None时输出紧凑格式"""
+    return _dumps(obj, indent)
+
+
+def loads(data) -> Any:
+    """解析JSON，接受bytes、bytearray或str"""
+    return _loads(data)
+
+
+def iter_encode(obj: Any, indent: Optional[int] = None,
+                chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    流式序列化，依次输出的字节拼接后与dumps(obj, indent)的紧凑输出一致
+
+    紧凑格式下外层STREAM_SPLIT_DEPTH层的dict/list逐项展开，其中的值用当前后端一次性序列化，
+    内存中只需保留单个成员的JSON；指定缩进时使用标准库的iterencode。
+    小片段合并到chunk_size后再输出，减少下游压缩器的调用次数。
+    """
+    if indent is None:
+        pieces = _iter_compact(obj, STREAM_SPLIT_DEPTH)
+    else:
+        encoder = json.JSONEncoder(ensure_ascii=False, indent=indent, separators=(',', ': '))
+        pieces = (piece.encode('utf-8') for piece in encoder.iterencode(obj))
+
+    pending = []
+    size = 0
+    for piece in pieces:
+        pending.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b''.join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield b''.join(pending)
+
+
+def _iter_compact(obj: Any, depth: int) -> Iterator[bytes]:
+    if depth <= 0 or not isinstance(obj, (dict, list)) or not obj:
+        yield _dumps(obj, None)
+    elif isinstance(obj, dict):
+        separator = b'{'
+        for key, value in obj.items():
+            yield separator
+            # 与dumps一致，非字符串键转换为字符串
+            yield _dumps(key if isinstance(key, str) else json.dumps(key).strip('"'), None)
+            yield b':'
+            yield from _iter_compact(value, depth - 1)
+            separator = b','
+        yield b'}'
+    else:
+        separator = b'['
+        for item in obj:
+            yield separator
+            yield from _iter_compact(item, depth - 1)
+            separator = b','
+        yield b']'
+
+
+def dump(obj: Any, output_file: str, indent: Optional[int] = None) -> bytes:
+    """序列化并写入文件，返回写入的字节，调用方可直接据此统计大小"""
+    payload = _dumps(obj, indent)
+    with open(output_file, 'wb') as f:
+        f.write(payload)
+    return payload
+
+
+set_backend()
@@ -0,0 +1,308 @@
+"""压缩AST归档的惰性读取接口
+
+检索服务通常只需要某个方法的摘要，整个读入并解析所有输出既慢又占内存。
+LazyArchive在ast_archive的索引之上把类和方法暴露为代理对象：
+代理只记录类名/方法位置，访问属性时才从归档中读取并解析该类所在文件的数据，
+解析结果放入有容量上限的LRU缓存，常用的类保留在内存中，其余的随时淘汰。
+键名映射也只在取出具体字段时才展开为完整键名。
+"""
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from ast_archive import ArchiveReader
+
+# 默认缓存的文件数
+DEFAULT_CACHE_SIZE = 128
+
+
+class LRUCache:
+    """线程安全的LRU缓存，超出容量时淘汰最久未使用的项"""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+
+        # 解压和解析在锁外进行，同一文件被并发加载时以后完成的为准
+        value = loader()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+class _Section:
+    """一个源文件解析后的数据，按完整键名读取，键名映射在取值时才展开"""
+
+    __slots__ = ('data', 'key_mapping', 'reverse_mapping', 'classes', 'method_name_counts')
+
+    def __init__(self, compressed_ast: Dict[str, Any]):
+        self.key_mapping = compressed_ast.get("key_mapping", {})
+        self.reverse_mapping = {short: full for full, short in self.key_mapping.items()}
+        self.data = compressed_ast.get("data", compressed_ast)
+        self.classes = {}
+        # 文件内各方法名出现的次数（跨所有类），文件级分析按方法名记录，重名时无法区分
+        self.method_name_counts = Counter()
+        for class_info in self.get(self.get(self.data, "structure", {}), "classes", []):
+            self.classes.setdefault(self.get(class_info, "name"), class_info)
+            self.method_name_counts.update(self.get(method_info, "name")
+                                           for method_info in self.get(class_info, "methods", []))
+
+    def get(self, obj: Dict[str, Any], key: str, default=None) -> Any:
+        return obj.get(self.key_mapping.get(key, key), default)
+
+    def expand(self, obj: Any) -> Any:
+        """将（子）对象中的短键名恢复为完整键名"""
+        if isinstance(obj, dict):
+            return {self.reverse_mapping.get(k, k): self.expand(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self.expand(item) for item in obj]
+        return obj
+
+    def package(self) -> Optional[str]:
+        return self.get(self.get(self.data, "file_info", {}), "package")
+
+
+class LazyArchive:
+    """
+    按需读取的归档视图
+
+    用法:
+        with LazyArchive("project.jarc") as archive:
+            method = archive["com.example.Service"].method("run")
+            print(method.summary())
+    """
+
+    def __init__(self, path: str, cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            path: ast_archive写出的归档文件路径
+            cache_size: 同时保留在内存中的已解析文件数上限
+        """
+        self._reader = ArchiveReader(path)
+        self._cache = LRUCache(cache_size)
+
+    def class_names(self) -> List[str]:
+        """归档中所有顶层类的全限定名"""
+        return self._reader.class_names()
+
+    def __contains__(self, fqn: str) -> bool:
+        try:
+            self._reader.class_entry(fqn)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._reader.class_names())
+
+    def __getitem__(self, fqn: str) -> 'ClassProxy':
+        """按类的全限定名取得代理；归档中的文件路径不是类名，同样抛出KeyError"""
+        entry = self._reader.class_entry(fqn)
+        return ClassProxy(self, fqn, entry["path"])
+
+    def get(self, fqn: str) -> Optional['ClassProxy']:
+        try:
+            return self[fqn]
+        except KeyError:
+            return None
+
+    def method(self, qualified_name: str) -> 'MethodProxy':
+        """按 类全限定名#方法名 查找方法"""
+        fqn, _, name = qualified_name.partition('#')
+        method = self[fqn].method(name)
+        if method is None:
+            raise KeyError(qualified_name)
+        return method
+
+    def section(self, path: str) -> _Section:
+        """读取（或从缓存取出）一个源文件的数据"""
+        return self._cache.get(path, lambda: _Section(self._reader.load(path)))
+
+    def cache_info(self) -> Dict[str, int]:
+        return {"hits": self._cache.hits, "misses": self._cache.misses,
+                "size": len(self._cache), "maxsize": self._cache.maxsize}
+
+    def close(self) -> None:
+        self._cache.clear()
+        self._reader.close()
+
+    def __enter__(self) -> 'LazyArchive':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class ClassProxy:
+    """
+    归档中一个类的代理
+
+    代理本身不持有解析后的数据，每次访问经由缓存取得，缓存淘汰后再次访问会重新读取。
+    """
+
+    __slots__ = ('_archive', 'fqn', 'path')
+
+    def __init__(self, archive: LazyArchive, fqn: str, path: str):
+        self._archive = archive
+        self.fqn = fqn
+        self.path = path
+
+    @property
+    def name(self) -> str:
+        return self.fqn.rpartition('.')[2]
+
+    def _section(self) -> _Section:
+        return self._archive.section(self.path)
+
+    def _raw(self) -> Dict[str, Any]:
+        # 没有识别出类的文件以文件名作为类名，此时没有类级别的数据
+        return self._section().classes.get(self.name, {})
+
+    def _field(self, key: str, default=None) -> Any:
+        section = self._section()
+        return section.expand(section.get(self._raw(), key, default))
+
+    @property
+    def package(self) -> Optional[str]:
+        return self._section().package()
+
+    @property
+    def modifiers(self) -> List[str]:
+        return self._field("modifiers", [])
+
+    @property
+    def extends(self) -> Optional[str]:
+        return self._field("extends")
+
+    @property
+    def fields(self) -> List[Dict[str, Any]]:
+        return self._field("fields", [])
+
+    @property
+    def methods(self) -> List['MethodProxy']:
+        section = self._section()
+        return [MethodProxy(self, index, section.get(method_info, "name"))
+                for index, method_info in enumerate(section.get(self._raw(), "methods", []))]
+
+    def method(self, name: str) -> Optional['MethodProxy']:
+        """按名称查找方法，重载时返回第一个"""
+        for method in self.methods:
+            if method.name == name:
+                return method
+        return None
+
+    def file_info(self) -> Dict[str, Any]:
+        section = self._section()
+        return section.expand(section.get(section.data, "file_info", {}))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """展开为完整键名的类数据"""
+        return self._section().expand(self._raw())
+
+    def __repr__(self) -> str:
+        return f"<ClassProxy {self.fqn}>"
+
+
+class MethodProxy:
+    """
+    类中一个方法的代理，按方法名关联控制流、复杂度等文件级分析结果
+
+    ast-compressor5只按方法名记录这些分析结果，重载方法以及同一文件中其他类（含内部类）的
+    同名方法会合并为一项，无法归属到具体方法，此时analysis与control_flow返回None；
+    匿名类中的方法不出现在结构信息中，与其同名的方法同样可能取到合并后的数据。
+    """
+
+    __slots__ = ('_class', 'index', 'name')
+
+    def __init__(self, class_proxy: ClassProxy, index: int, name: str):
+        self._class = class_proxy
+        self.index = index
+        self.name = name
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self._class.fqn}#{self.name}"
+
+    def _file_level(self, key: str) -> Optional[Dict[str, Any]]:
+        section = self._class._section()
+        if section.method_name_counts[self.name] > 1:
+            return None
+        value = section.get(section.data, key, {}).get(self.name)
+        return section.expand(value) if value is not None else None
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        """方法签名信息：修饰符、返回类型、参数"""
+        section = self._class._section()
+        methods = section.get(self._class._raw(), "methods", [])
+        return section.expand(methods[self.index])
+
+    @property
+    def analysis(self) -> Optional[Dict[str, Any]]:
+        """复杂度、意图等方法分析"""
+        return self._file_level("method_analysis")
+
+    @property
+    def control_flow(self) -> Optional[Dict[str, Any]]:
+        return self._file_level("control_flow")
+
+    def summary(self) -> Dict[str, Any]:
+        """检索时使用的方法上下文：签名、分析与控制流"""
+        summary = {"class": self._class.fqn, **self.info}
+        analysis = self.analysis
+        if analysis:
+            summary["analysis"] = analysis
+        control_flow = self.control_flow
+        if control_flow:
+            summary["control_flow"] = control_flow
+        return summary
+
+    def __repr__(self) -> str:
+        return f"<MethodProxy {self.qualified_name}>"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import ast_json
+
+    parser = argparse.ArgumentParser(description='按需读取压缩AST归档中的类或方法')
+    parser.add_argument('archive', help='归档文件路径')
+    parser.add_argument('name', help='类全限定名，或 类全限定名#方法名')
+    parser.add_argument('--indent', type=int, default=2, help='输出JSON的缩进级别')
+
+    args = parser.parse_args()
+
+    with LazyArchive(args.archive) as archive:
+        try:
+            if '#' in args.name:
+                result = archive.method(args.name).summary()
+            else:
+                class_proxy = archive[args.name]
+                result = class_proxy.to_dict()
+                result["methods"] = [method.name for method in class_proxy.methods]
+        except KeyError:
+            print(f"归档中没有 {args.name}")
+            exit(1)
+        print(ast_json.dumps(result, indent=args.indent).decode('utf-8'))
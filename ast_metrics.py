@@ -0,0 +1,287 @@
+"""基于列式节点表的方法复杂度统计
+
+在ast_table.NodeTable上一次性计算整个项目所有方法的圈复杂度、最大嵌套深度和语句类型分布，
+替代EnhancedASTCompressor中逐方法递归遍历的 _calculate_cyclomatic_complexity、
+_calculate_max_nesting、_count_statement_types。
+
+安装了NumPy时全部为数组运算：用指针倍增求每个节点所属的方法和外层控制结构数，
+再按方法用bincount统计判定点与语句类型；未安装时退回对节点表的单遍线性扫描。
+嵌套在方法内的匿名类/局部类的方法单独统计，不计入外层方法。
+
+圈复杂度沿用_calculate_cyclomatic_complexity的判定点类型（见DECISION_NODE_TYPES）。
+该函数只遍历_extract_control_flow提取出的控制流，按节点统计时以下位置的判定点也会计入，
+因而个别方法的结果会比压缩器偏大：增强for、synchronized、带标签语句的循环体内，
+以及lambda和表达式中的结构；嵌套深度同样不计入嵌套方法。
+bench_ast_metrics.py给出源码目录时逐方法与EnhancedASTCompressor的结果核对并列出差异。
+"""
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+from ast_table import NodeTable, load_node_table
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 作为统计单元的方法节点
+METHOD_NODE_TYPES = {'method_declaration', 'constructor_declaration', 'compact_constructor_declaration'}
+
+# 圈复杂度的判定点，与_calculate_cyclomatic_complexity的实际结果一致：
+# if、switch、for、while、do各加1（switch只计一次，不按case标签计；不计 && / || 与三元表达式）。
+# 该函数的类型集合虽列出catch_clause，但catch只作为try节点的子项递归其块体，从不计数，这里同样不计
+DECISION_NODE_TYPES = {
+    'if_statement', 'switch_statement', 'for_statement', 'while_statement', 'do_statement'
+}
+
+# 增加嵌套深度的节点，与_calculate_max_nesting一致
+NESTING_NODE_TYPES = {
+    'if_statement', 'for_statement', 'while_statement', 'do_statement',
+    'switch_statement', 'try_statement'
+}
+
+
+def _is_statement_type(type_name: str) -> bool:
+    # 与_count_statement_types一致：各类*_statement以及方法调用
+    return type_name.endswith('_statement') or type_name == 'method_invocation'
+
+
+def _kind_flags(table: NodeTable, type_names) -> List[bool]:
+    return [name in type_names for name in table.kinds]
+
+
+def compute_method_metrics(table: NodeTable, use_numpy: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    计算节点表中所有方法的复杂度指标
+
+    Args:
+        table: 节点表
+        use_numpy: 是否使用NumPy，默认在已安装时使用
+
+    Returns:
+        按方法在表中的先序排列的各列：
+        methods（方法节点下标）、file（文件下标）、cyclomatic、max_nesting、
+        statement_kinds（语句类型名）、statement_counts（方法数 × 语句类型数的计数）
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    statement_kinds = [name for name in table.kinds if _is_statement_type(name)]
+    if use_numpy:
+        metrics = _numpy_method_metrics(table, statement_kinds)
+    else:
+        metrics = _python_method_metrics(table, statement_kinds)
+    metrics["statement_kinds"] = statement_kinds
+    return metrics
+
+
+def _ancestor_sums(parent, weights):
+    """指针倍增：每个节点到根路径上（含自身）weights之和，迭代次数为树深的对数"""
+    total = weights.astype(np.int32)
+    jump = parent.copy()
+    active = np.flatnonzero(jump >= 0)
+    while active.size:
+        targets = jump[active]
+        total[active] += total[targets]
+        jump[active] = jump[targets]
+        active = active[jump[active] >= 0]
+    return total
+
+
+def _nearest_marked(parent, marked):
+    """指针倍增：每个节点最近的被标记祖先（含自身），没有时为所在文件的根节点"""
+    nearest = np.where(marked | (parent < 0), np.arange(len(parent)), parent)
+    while True:
+        jumped = nearest[nearest]
+        if np.array_equal(jumped, nearest):
+            return nearest
+        nearest = jumped
+
+
+def _numpy_method_metrics(table: NodeTable, statement_kinds: List[str]) -> Dict[str, Any]:
+    columns = table.to_numpy()
+    kind = columns['kind']
+    parent = columns['parent'].astype(np.int64)
+    file_starts = columns['file_starts']
+
+    # 按类型id查表得到各类节点的掩码
+    is_method_kind = np.array(_kind_flags(table, METHOD_NODE_TYPES), dtype=bool)
+    is_decision_kind = np.array(_kind_flags(table, DECISION_NODE_TYPES), dtype=bool)
+    is_nesting_kind = np.array(_kind_flags(table, NESTING_NODE_TYPES), dtype=bool)
+    statement_column = np.full(len(table.kinds), -1, dtype=np.int64)
+    for column, name in enumerate(statement_kinds):
+        statement_column[table.kind_id(name)] = column
+
+    is_method = is_method_kind[kind]
+    methods = np.flatnonzero(is_method)
+    method_count = len(methods)
+    statement_count = len(statement_kinds)
+
+    owner = _nearest_marked(parent, is_method)
+    owned = np.flatnonzero(is_method[owner])
+    # 节点所属方法在methods中的序号
+    method_position = np.full(len(kind), -1, dtype=np.int64)
+    method_position[methods] = np.arange(method_count)
+    owner_position = method_position[owner[owned]]
+    owned_kind = kind[owned]
+
+    decisions = is_decision_kind[owned_kind]
+    cyclomatic = 1 + np.bincount(owner_position[decisions], minlength=method_count)
+
+    # 嵌套深度 = 节点外层控制结构数 - 所属方法外层控制结构数
+    nesting = _ancestor_sums(parent, is_nesting_kind[kind])
+    relative_nesting = nesting[owned] - nesting[owner[owned]]
+    max_nesting = np.zeros(method_count, dtype=np.int32)
+    np.maximum.at(max_nesting, owner_position, relative_nesting)
+
+    owned_column = statement_column[owned_kind]
+    statements = owned_column >= 0
+    statement_counts = np.bincount(
+        owner_position[statements] * statement_count + owned_column[statements],
+        minlength=method_count * statement_count
+    ).reshape(method_count, statement_count)
+
+    return {
+        "methods": methods,
+        "file": np.searchsorted(file_starts, methods, side='right') - 1,
+        "cyclomatic": cyclomatic,
+        "max_nesting": max_nesting,
+        "statement_counts": statement_counts
+    }
+
+
+def _python_method_metrics(table: NodeTable, statement_kinds: List[str]) -> Dict[str, Any]:
+    # 先序排列中父节点总在子节点之前，一次正向扫描即可得到所属方法与嵌套深度
+    is_method_kind = _kind_flags(table, METHOD_NODE_TYPES)
+    is_decision_kind = _kind_flags(table, DECISION_NODE_TYPES)
+    is_nesting_kind = _kind_flags(table, NESTING_NODE_TYPES)
+    statement_column = [-1] * len(table.kinds)
+    for column, name in enumerate(statement_kinds):
+        statement_column[table.kind_id(name)] = column
+
+    kind = table.kind
+    parent = table.parent
+    node_count = len(table)
+    owner = [-1] * node_count
+    nesting = [0] * node_count
+    method_position = {}
+    methods, files, cyclomatic, max_nesting, statement_counts = [], [], [], [], []
+
+    file_index = 0
+    file_end = table.file_starts[1] if len(table.file_paths) else 0
+    for index in range(node_count):
+        while index >= file_end:
+            file_index += 1
+            file_end = table.file_starts[file_index + 1]
+
+        node_kind = kind[index]
+        parent_index = parent[index]
+        depth = nesting[parent_index] if parent_index != -1 else 0
+        if is_nesting_kind[node_kind]:
+            depth += 1
+        nesting[index] = depth
+
+        if is_method_kind[node_kind]:
+            method_owner = index
+            method_position[index] = len(methods)
+            methods.append(index)
+            files.append(file_index)
+            cyclomatic.append(1)
+            max_nesting.append(0)
+            statement_counts.append([0] * len(statement_kinds))
+        else:
+            method_owner = owner[parent_index] if parent_index != -1 else -1
+        owner[index] = method_owner
+        if method_owner == -1:
+            continue
+
+        position = method_position[method_owner]
+        if is_decision_kind[node_kind]:
+            cyclomatic[position] += 1
+        relative = depth - nesting[method_owner]
+        if relative > max_nesting[position]:
+            max_nesting[position] = relative
+        column = statement_column[node_kind]
+        if column != -1:
+            statement_counts[position][column] += 1
+
+    return {
+        "methods": methods,
+        "file": files,
+        "cyclomatic": cyclomatic,
+        "max_nesting": max_nesting,
+        "statement_counts": statement_counts
+    }
+
+
+def method_name(table: NodeTable, method_index: int, source) -> str:
+    """从源码中读取方法名（方法节点的第一个identifier子节点）"""
+    identifier = table.kind_id('identifier')
+    for child in table.children(method_index):
+        if table.kind[child] == identifier:
+            return bytes(source[table.start_byte[child]:table.end_byte[child]]).decode('utf-8')
+    return ''
+
+
+def iter_method_records(table: NodeTable, metrics: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """把compute_method_metrics的列式结果逐个方法展开为dict"""
+    statement_kinds = metrics["statement_kinds"]
+    for position, method_index in enumerate(metrics["methods"]):
+        method_index = int(method_index)
+        counts = metrics["statement_counts"][position]
+        yield {
+            "file_path": table.file_paths[int(metrics["file"][position])],
+            "start_byte": int(table.start_byte[method_index]),
+            "cyclomatic": int(metrics["cyclomatic"][position]),
+            "max_nesting": int(metrics["max_nesting"][position]),
+            "statements": {kind: int(count) for kind, count in zip(statement_kinds, counts) if count}
+        }
+
+
+# 使用示例
+if __name__ == "__main__":
+    import argparse
+
+    from java_source import open_java_source
+
+    parser = argparse.ArgumentParser(description='基于节点表统计项目中所有方法的复杂度')
+    parser.add_argument('table', help='ast_table.py导出的节点表文件')
+    parser.add_argument('--output', '-o', help='输出JSON文件路径', default='method_metrics.json')
+    parser.add_argument('--no-numpy', action='store_true', help='不使用NumPy')
+    parser.add_argument('--with-names', action='store_true', help='读取源文件补充方法名')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.table):
+        print(f"错误: 文件 {args.table} 不存在")
+        sys.exit(1)
+
+    node_table = load_node_table(args.table)
+    try:
+        result = compute_method_metrics(node_table, use_numpy=not args.no_numpy and np is not None)
+        records = list(iter_method_records(node_table, result))
+
+        if args.with_names:
+            by_file = {}
+            for position, record in enumerate(records):
+                by_file.setdefault(record["file_path"], []).append(position)
+            for file_path, positions in by_file.items():
+                try:
+                    with open_java_source(file_path) as source_code:
+                        for position in positions:
+                            records[position]["name"] = method_name(
+                                node_table, int(result["methods"][position]), source_code)
+                except OSError as e:
+                    print(f"读取文件 {file_path} 时出错: {e}")
+    finally:
+        node_table.close()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False, indent=2)
+
+    print(f"方法复杂度已保存到: {args.output}")
+    print(f"- 方法数: {len(records)}")
+    if records:
+        print(f"- 最大圈复杂度: {max(record['cyclomatic'] for record in records)}")
+        print(f"- 最大嵌套深度: {max(record['max_nesting'] for record in records)}")
@@ -0,0 +1,377 @@
+"""Java AST批量压缩流水线
+
+基于asyncio的 读取 -> 解析+压缩 -> 写出 三段流水线：
+文件读写在线程池中并发执行，解析与压缩在进程池中执行，
+各阶段之间使用有界队列，下游变慢时上游自动等待，内存占用保持有界。
+解析与压缩复用ast-compressor5.py中的compress_java_ast。
+指定archive时所有结果写入单个归档文件（见ast_archive.py），而不是每个源文件一个JSON。
+文件按路径排序处理，归档中的条目按输入顺序追加；输出目录中的manifest.json记录每个输出的内容哈希，
+同样的输入在任何机器上都得到同样的输出和清单。
+"""
+import asyncio
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import ast_archive
+import ast_codec
+import ast_json
+from java_file_filter import JavaFileFilter, add_filter_arguments, filter_from_args
+from output_manifest import MANIFEST_NAME, content_digest, file_digest, manifest_entry, write_manifest
+
+# ast-compressor5.py文件名含连字符，无法直接import，按路径加载
+_COMPRESSOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ast-compressor5.py')
+_compressor_module = None
+
+# 输出文件名后缀，与ast-compressor5.py命令行保持一致
+OUTPUT_SUFFIX = "_llm_friendly_ast.json"
+
+# 队列结束标记
+_DONE = None
+
+
+def load_compressor_module():
+    """在当前进程中加载（并缓存）ast-compressor5模块"""
+    global _compressor_module
+    if _compressor_module is None:
+        spec = importlib.util.spec_from_file_location("ast_compressor5", _COMPRESSOR_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _compressor_module = module
+    return _compressor_module
+
+
+def _compress_source(source: bytes, options: Dict[str, Any], indent: Optional[int],
+                     json_backend: Optional[str] = None) -> bytes:
+    """进程池任务：解析并压缩一个文件，在子进程内完成JSON序列化以减少回传开销"""
+    if json_backend and json_backend != ast_json.backend_name:
+        ast_json.set_backend(json_backend)
+    compressor = load_compressor_module()
+    compressed_ast = compressor.compress_java_ast(source, **options)
+    return ast_json.dumps(compressed_ast, indent=indent)
+
+
+# 子进程中按字典内容缓存的zstd字典，避免每个文件重新构建
+_worker_dictionaries: Dict[bytes, Any] = {}
+
+
+def _compress_source_for_archive(source: bytes, default_class: str, options: Dict[str, Any],
+                                 json_backend: Optional[str], codec: str, level: Optional[int],
+                                 dictionary: Optional[bytes]) -> Tuple[List[str], int, str, bytes]:
+    """进程池任务：解析、压缩并按归档设置压缩JSON，返回 (类全限定名, JSON字节数, JSON哈希, 压缩数据)"""
+    if json_backend and json_backend != ast_json.backend_name:
+        ast_json.set_backend(json_backend)
+    compressor = load_compressor_module()
+    compressed_ast = compressor.compress_java_ast(source, **options)
+    payload = ast_json.dumps(compressed_ast)
+    if dictionary is not None:
+        if dictionary not in _worker_dictionaries:
+            _worker_dictionaries[dictionary] = ast_codec.load_zstd_dictionary(dictionary)
+        dictionary = _worker_dictionaries[dictionary]
+    data = ast_codec.compress(payload, codec, level, dictionary)
+    return ast_archive.class_names(compressed_ast, default_class), len(payload), content_digest(payload), data
+
+
+def _read_file(file_path: str) -> bytes:
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def _write_file(output_file: str, content: bytes) -> None:
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with open(output_file, 'wb') as f:
+        f.write(content)
+
+
+def find_java_files(input_path: str, file_filter: Optional[JavaFileFilter] = None) -> List[str]:
+    """收集输入路径下需要处理的Java文件，目录按file_filter过滤（默认跳过构建目录和生成代码）"""
+    if os.path.isfile(input_path):
+        return [input_path]
+
+    # 按名称排序遍历，处理顺序与文件系统无关
+    if file_filter is None:
+        file_filter = JavaFileFilter()
+    return list(file_filter.iter_files(input_path))
+
+
+def get_output_path(file_path: str, input_root: str, output_dir: str) -> str:
+    """按输入目录的相对路径生成输出文件路径"""
+    if os.path.isfile(input_root):
+        relative_path = os.path.basename(file_path)
+    else:
+        relative_path = os.path.relpath(file_path, input_root)
+    base_name = os.path.splitext(relative_path)[0]
+    return os.path.join(output_dir, base_name + OUTPUT_SUFFIX)
+
+
+def get_archive_path(file_path: str, input_root: str) -> str:
+    """归档中使用的路径：相对输入目录、以/分隔"""
+    if os.path.isfile(input_root):
+        return os.path.basename(file_path)
+    return os.path.relpath(file_path, input_root).replace(os.sep, '/')
+
+
+async def compress_files_async(file_paths: Iterable[str],
+                               input_root: str,
+                               output_dir: str,
+                               workers: Optional[int] = None,
+                               io_workers: int = 4,
+                               queue_size: int = 16,
+                               indent: Optional[int] = None,
+                               json_backend: Optional[str] = None,
+                               archive: Optional[str] = None,
+                               codec: str = 'gzip',
+                               level: Optional[int] = None,
+                               dictionary=None,
+                               **options) -> Dict[str, Any]:
+    """
+    以流水线方式批量压缩Java文件
+
+    Args:
+        file_paths: 待处理的Java文件路径
+        input_root: 输入根目录（或单个文件），用于计算输出的相对路径
+        output_dir: 输出目录
+        workers: 解析与压缩的进程数，默认为CPU核数
+        io_workers: 读写文件的线程数
+        queue_size: 各阶段队列的容量，决定同时驻留内存的文件数上限；
+                    归档模式下也是已读取但尚未按序写入归档的文件数上限
+        indent: JSON缩进级别，默认None输出紧凑格式
+        json_backend: JSON序列化后端名称，默认选择已安装的最快实现
+        archive: 归档文件路径，指定时所有结果写入该归档，忽略output_dir与indent
+        codec: 归档中各文件数据的压缩格式，'gzip'或'zstd'
+        level: 归档的压缩级别，None使用各格式的默认值
+        dictionary: 归档使用的zstd字典（文件路径或字典内容），会写入归档
+        **options: 传递给compress_java_ast的压缩选项
+
+    Returns:
+        统计信息：处理文件数、失败文件列表、耗时、清单路径
+    """
+    loop = asyncio.get_running_loop()
+    workers = workers or os.cpu_count() or 1
+    read_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+    stats = {"files": 0, "failed": [], "elapsed": 0.0, "manifest": None}
+    start_time = time.time()
+    manifest = {}
+
+    # 归档模式：子进程完成JSON的压缩，写入阶段只按顺序追加到归档
+    archive_writer = None
+    dictionary_bytes = None
+    if archive:
+        archive_writer = ast_archive.ArchiveWriter(archive, codec, level, dictionary)
+        if archive_writer.dictionary is not None:
+            dictionary_bytes = archive_writer.dictionary.as_bytes()
+
+    # 归档条目按输入顺序追加：先完成的结果按序号暂存，等前面的文件写入后再追加
+    pending = {}
+    next_sequence = 0
+    archive_lock = asyncio.Lock()
+    # 乱序窗口：读取每个文件前占用一个名额，按序追加到归档后才归还。
+    # 某个靠前的文件处理很慢时，读取阶段最多领先它queue_size个文件，pending不会无限增长
+    reorder_window = asyncio.Semaphore(queue_size) if archive and queue_size > 0 else None
+
+    def append_to_archive(items):
+        written = 0
+        for file_path, content in items:
+            if content is None:
+                continue
+            classes, size, digest, data = content
+            archive_path = get_archive_path(file_path, input_root)
+            try:
+                archive_writer.add(archive_path, data, classes, True, size, digest)
+            except (OSError, ValueError) as e:
+                print(f"写入归档 {archive} 时出错: {e}")
+                stats["failed"].append(file_path)
+                continue
+            manifest[f"{os.path.basename(archive)}!{archive_path}"] = manifest_entry(digest, size)
+            written += 1
+        return written
+
+    with ThreadPoolExecutor(max_workers=io_workers) as io_pool, \
+            ProcessPoolExecutor(max_workers=workers) as cpu_pool:
+
+        async def read_stage():
+            # 队列已满时put会等待，读取速度自动受限于下游处理速度
+            try:
+                for sequence, file_path in enumerate(file_paths):
+                    if reorder_window is not None:
+                        await reorder_window.acquire()
+                    try:
+                        source = await loop.run_in_executor(io_pool, _read_file, file_path)
+                    except OSError as e:
+                        print(f"读取文件 {file_path} 时出错: {e}")
+                        stats["failed"].append(file_path)
+                        # 失败的文件也占用序号，归档写入才能越过它继续
+                        await write_queue.put((sequence, file_path, None))
+                        continue
+                    await read_queue.put((sequence, file_path, source))
+            finally:
+                for _ in range(workers):
+                    await read_queue.put(_DONE)
+
+        async def compress_stage():
+            while True:
+                item = await read_queue.get()
+                if item is _DONE:
+                    break
+                sequence, file_path, source = item
+                try:
+                    if archive_writer is not None:
+                        default_class = os.path.splitext(os.path.basename(file_path))[0]
+                        content = await loop.run_in_executor(cpu_pool, _compress_source_for_archive,
+                                                             source, default_class, options, json_backend,
+                                                             codec, level, dictionary_bytes)
+                    else:
+                        content = await loop.run_in_executor(cpu_pool, _compress_source, source, options,
+                                                             indent, json_backend)
+                except Exception as e:
+                    print(f"处理文件 {file_path} 时出错: {e}")
+                    stats["failed"].append(file_path)
+                    content = None
+                await write_queue.put((sequence, file_path, content))
+
+        def report_progress(count):
+            previous = stats["files"]
+            stats["files"] += count
+            if stats["files"] // 100 > previous // 100:
+                print(f"已处理 {stats['files']} 个文件...")
+
+        async def write_archive(sequence, file_path, content):
+            nonlocal next_sequence
+            pending[sequence] = (file_path, content)
+            # 取出可按序追加的条目和写入都在锁内完成，多个写入协程之间不会打乱顺序
+            async with archive_lock:
+                ready = []
+                while next_sequence in pending:
+                    ready.append(pending.pop(next_sequence))
+                    next_sequence += 1
+                if ready:
+                    try:
+                        report_progress(await loop.run_in_executor(io_pool, append_to_archive, ready))
+                    finally:
+                        if reorder_window is not None:
+                            for _ in ready:
+                                reorder_window.release()
+
+        async def write_stage():
+            while True:
+                item = await write_queue.get()
+                if item is _DONE:
+                    break
+                sequence, file_path, content = item
+                if archive_writer is not None:
+                    await write_archive(sequence, file_path, content)
+                    continue
+                if content is None:
+                    continue
+                output_file = get_output_path(file_path, input_root, output_dir)
+                try:
+                    await loop.run_in_executor(io_pool, _write_file, output_file, content)
+                except OSError as e:
+                    print(f"写入文件 {output_file} 时出错: {e}")
+                    stats["failed"].append(file_path)
+                    continue
+                manifest[os.path.relpath(output_file, output_dir).replace(os.sep, '/')] = \
+                    manifest_entry(content_digest(content), len(content))
+                report_progress(1)
+
+        writers = [asyncio.ensure_future(write_stage()) for _ in range(io_workers)]
+        try:
+            await asyncio.gather(read_stage(), *(compress_stage() for _ in range(workers)))
+        finally:
+            for _ in writers:
+                await write_queue.put(_DONE)
+            await asyncio.gather(*writers)
+            if archive_writer is not None:
+                archive_writer.close()
+
+    # 清单只列出本次写出的文件；归档模式下写在归档旁，逐条列出归档中各文件的JSON哈希
+    if archive_writer is not None:
+        manifest[os.path.basename(archive)] = manifest_entry(file_digest(archive), os.path.getsize(archive))
+        stats["manifest"] = os.path.join(os.path.dirname(archive), MANIFEST_NAME)
+    else:
+        stats["manifest"] = os.path.join(output_dir, MANIFEST_NAME)
+    write_manifest(stats["manifest"], manifest)
+
+    stats["elapsed"] = time.time() - start_time
+    return stats
+
+
+def compress_directory(input_path: str, output_dir: str, file_filter: Optional[JavaFileFilter] = None,
+                       **kwargs) -> Dict[str, Any]:
+    """
+    批量压缩目录（或单个文件）中的Java源码，同步入口
+
+    Args:
+        input_path: Java文件或目录路径
+        output_dir: 输出目录
+        file_filter: 扫描目录时使用的文件过滤，跳过的文件数记录在其skipped中
+        **kwargs: 传递给compress_files_async的参数及压缩选项
+    """
+    file_paths = find_java_files(input_path, file_filter)
+    return asyncio.run(compress_files_async(file_paths, input_path, output_dir, **kwargs))
+
+
+# 使用示例
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Java AST批量压缩流水线')
+    parser.add_argument('input', help='Java源代码文件或目录路径')
+    parser.add_argument('--output', '-o', help='输出目录', default='ast_output')
+    parser.add_argument('--lang-path', '-l', help='tree-sitter语言库路径', default=None)
+    parser.add_argument('--workers', '-j', type=int, default=None, help='解析与压缩的进程数，默认为CPU核数')
+    parser.add_argument('--io-workers', type=int, default=4, help='读写文件的线程数')
+    parser.add_argument('--queue-size', type=int, default=16, help='各阶段队列容量（控制内存占用）')
+    parser.add_argument('--aggregation', '-a', choices=['low', 'medium', 'high'],
+                        default='medium', help='聚合级别')
+    parser.add_argument('--no-comments', action='store_true', help='不保留注释')
+    parser.add_argument('--no-key-mapping', action='store_true', help='不使用键名映射表')
+    parser.add_argument('--indent', type=int, default=None, help='JSON缩进级别，默认输出紧凑格式')
+    # 已弃用：默认即为紧凑输出，保留该选项只为兼容旧脚本，不再起作用
+    parser.add_argument('--no-indent', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--json-backend', choices=ast_json.BACKEND_ORDER, default=None,
+                        help='JSON序列化后端，默认选择已安装的最快实现')
+    parser.add_argument('--archive', default=None,
+                        help=f'写入单个归档文件（如 project{ast_archive.ARCHIVE_SUFFIX}）而不是每个文件一个JSON')
+    parser.add_argument('--codec', choices=ast_codec.CODECS, default='gzip', help='归档的压缩格式')
+    parser.add_argument('--dictionary', '-D', default=None,
+                        help='归档使用的zstd字典（由ast_dictionary.py训练），指定时使用zstd')
+    add_filter_arguments(parser)
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"错误: 路径 {args.input} 不存在")
+        sys.exit(1)
+
+    print(f"开始批量压缩: {args.input}")
+    file_filter = filter_from_args(args)
+    stats = compress_directory(
+        args.input,
+        args.output,
+        file_filter=file_filter,
+        workers=args.workers,
+        io_workers=args.io_workers,
+        queue_size=args.queue_size,
+        indent=args.indent,
+        json_backend=args.json_backend,
+        archive=args.archive,
+        codec='zstd' if args.dictionary else args.codec,
+        dictionary=args.dictionary,
+        lang_path=args.lang_path,
+        aggregation_level=args.aggregation,
+        preserve_comments=not args.no_comments,
+        use_key_mapping=not args.no_key_mapping
+    )
+
+    print(f"完成! 共处理 {stats['files']} 个文件, 失败 {len(stats['failed'])} 个")
+    for line in file_filter.summary_lines():
+        print(line)
+    if args.archive:
+        print(f"归档已保存到: {args.archive}")
+    print(f"内容哈希清单: {stats['manifest']}")
+    print(f"总耗时: {stats['elapsed']:.2f} 秒")
@@ -0,0 +1,271 @@
+"""列式AST节点表
+
+把tree-sitter语法树展平为若干并列的数组（节点类型id、父节点下标、起止字节、
+第一个子节点、下一个兄弟节点），整个项目的所有文件拼接在同一张表中。
+相比ast-compressor.py那种每个节点一个dict的嵌套结构，内存占用小一个数量级，
+并可保存为可直接mmap的二进制文件，加载时不做拷贝；安装了NumPy时可用to_numpy()做向量化分析。
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+from java_source import open_java_source, to_parser_input
+
+# 文件格式：魔数、版本、节点数、文件数、元数据长度，随后为元数据JSON与各列数据（均按8字节对齐）
+MAGIC = b'JAST'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sIQQQ')
+
+# 列名及其array类型码，顺序即文件中的存储顺序
+COLUMNS = (
+    ('kind', 'H'),
+    ('parent', 'i'),
+    ('start_byte', 'I'),
+    ('end_byte', 'I'),
+    ('first_child', 'i'),
+    ('next_sibling', 'i'),
+)
+
+# 与array类型码对应的NumPy dtype（小端）
+_NUMPY_DTYPES = {'H': '<u2', 'i': '<i4', 'I': '<u4', 'q': '<i8'}
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+class NodeTable:
+    """
+    展平后的AST节点表
+
+    节点按文件依次、文件内按先序排列；parent/first_child/next_sibling为全局下标，-1表示不存在。
+    第i个文件的节点位于 [file_starts[i], file_starts[i + 1]) 区间。
+    """
+
+    def __init__(self, kinds: List[str], columns: Dict[str, object], file_starts, file_paths: List[str]):
+        self.kinds = kinds
+        self.kind = columns['kind']
+        self.parent = columns['parent']
+        self.start_byte = columns['start_byte']
+        self.end_byte = columns['end_byte']
+        self.first_child = columns['first_child']
+        self.next_sibling = columns['next_sibling']
+        self.file_starts = file_starts
+        self.file_paths = file_paths
+        self._kind_ids = {name: i for i, name in enumerate(kinds)}
+        # 从文件加载时持有的映射，保证各列的memoryview有效
+        self._mapped = None
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def kind_id(self, type_name: str) -> Optional[int]:
+        """节点类型名对应的id，表中未出现的类型返回None"""
+        return self._kind_ids.get(type_name)
+
+    def node_type(self, index: int) -> str:
+        return self.kinds[self.kind[index]]
+
+    def children(self, index: int) -> Iterator[int]:
+        """按顺序迭代节点的子节点下标"""
+        child = self.first_child[index]
+        while child != -1:
+            yield child
+            child = self.next_sibling[child]
+
+    def columns(self) -> Dict[str, object]:
+        return {name: getattr(self, name) for name, _ in COLUMNS}
+
+    def to_numpy(self) -> Dict[str, object]:
+        """
+        以NumPy数组形式返回各列（需要安装NumPy），从文件加载的表不做拷贝
+
+        从文件加载的表返回的数组直接引用文件映射：数组仍存活时close()无法解除映射，
+        会推迟到这些数组全部释放后由垃圾回收完成，因此需要及时释放内存时应先丢弃数组再close()。
+        """
+        import numpy as np
+
+        result = {}
+        for name, typecode in COLUMNS + (('file_starts', 'q'),):
+            result[name] = np.frombuffer(getattr(self, name), dtype=_NUMPY_DTYPES[typecode])
+        return result
+
+    def save(self, output_file: str) -> None:
+        """保存为可mmap加载的二进制文件"""
+        meta = json.dumps({"kinds": self.kinds, "file_paths": self.file_paths},
+                          ensure_ascii=False).encode('utf-8')
+        with open(output_file, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(self), len(self.file_paths), len(meta)))
+            f.write(meta + b'\0' * _padding(len(meta)))
+            for name, typecode in COLUMNS + (('file_starts', 'q'),):
+                data = memoryview(getattr(self, name)).cast('B')
+                f.write(data)
+                f.write(b'\0' * _padding(len(data)))
+
+    def close(self) -> None:
+        """
+        释放load_node_table建立的文件映射，之后不能再访问表中的列
+
+        仍有to_numpy()返回的数组引用映射时不抛出BufferError：表放弃对映射的引用，
+        待这些数组释放后映射随之回收。
+        """
+        if self._mapped is None:
+            return
+        try:
+            for name, _ in COLUMNS + (('file_starts', 'q'),):
+                view = getattr(self, name)
+                if isinstance(view, memoryview):
+                    view.release()
+            self._mapped.close()
+        except BufferError:
+            pass
+        self._mapped = None
+
+
+def load_node_table(input_file: str) -> NodeTable:
+    """以mmap方式加载节点表，各列为映射上的memoryview，不拷贝数据；用完调用close()"""
+    with open(input_file, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, node_count, file_count, meta_size = _HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        mapped.close()
+        raise ValueError(f"{input_file} 不是有效的AST节点表文件")
+
+    offset = _HEADER.size
+    meta = json.loads(mapped[offset:offset + meta_size].decode('utf-8'))
+    offset += meta_size + _padding(meta_size)
+
+    view = memoryview(mapped)
+    columns = {}
+    for name, typecode in COLUMNS + (('file_starts', 'q'),):
+        count = file_count + 1 if name == 'file_starts' else node_count
+        size = count * array(typecode).itemsize
+        columns[name] = view[offset:offset + size].cast(typecode)
+        offset += size + _padding(size)
+    view.release()
+
+    table = NodeTable(meta["kinds"], columns, columns['file_starts'], meta["file_paths"])
+    table._mapped = mapped
+    return table
+
+
+class NodeTableBuilder:
+    """逐个文件把语法树追加进节点表"""
+
+    def __init__(self):
+        self.kinds = []
+        self._kind_ids = {}
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS}
+        self.file_starts = array('q', [0])
+        self.file_paths = []
+
+    def _kind_id(self, type_name: str) -> int:
+        kind = self._kind_ids.get(type_name)
+        if kind is None:
+            kind = self._kind_ids[type_name] = len(self.kinds)
+            self.kinds.append(type_name)
+        return kind
+
+    def add_tree(self, root_node, file_path: str = '') -> None:
+        """用TreeCursor先序遍历语法树并追加到表中，不递归、不创建children列表"""
+        kind = self.columns['kind']
+        parent = self.columns['parent']
+        start_byte = self.columns['start_byte']
+        end_byte = self.columns['end_byte']
+        first_child = self.columns['first_child']
+        next_sibling = self.columns['next_sibling']
+
+        cursor = root_node.walk()
+        # 祖先节点下标栈，以及每一层最近追加的子节点下标（用于回填next_sibling）
+        ancestors = [-1]
+        last_child = [-1]
+        while True:
+            node = cursor.node
+            index = len(kind)
+            parent_index = ancestors[-1]
+
+            kind.append(self._kind_id(node.type))
+            parent.append(parent_index)
+            start_byte.append(node.start_byte)
+            end_byte.append(node.end_byte)
+            first_child.append(-1)
+            next_sibling.append(-1)
+
+            previous = last_child[-1]
+            if previous != -1:
+                next_sibling[previous] = index
+            elif parent_index != -1:
+                first_child[parent_index] = index
+            last_child[-1] = index
+
+            if cursor.goto_first_child():
+                ancestors.append(index)
+                last_child.append(-1)
+                continue
+
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    self.file_starts.append(len(kind))
+                    self.file_paths.append(file_path)
+                    return
+                ancestors.pop()
+                last_child.pop()
+
+    def build(self) -> NodeTable:
+        return NodeTable(self.kinds, self.columns, self.file_starts, self.file_paths)
+
+
+def flatten_tree(root_node, file_path: str = '') -> NodeTable:
+    """把单个语法树展平为节点表"""
+    builder = NodeTableBuilder()
+    builder.add_tree(root_node, file_path)
+    return builder.build()
+
+
+def build_project_table(input_path: str, parser) -> NodeTable:
+    """解析目录（或单个文件）中的所有Java文件并展平到同一张节点表"""
+    from ast_pipeline import find_java_files
+
+    builder = NodeTableBuilder()
+    for file_path in find_java_files(input_path):
+        try:
+            with open_java_source(file_path) as source_code:
+                tree = parser.parse(to_parser_input(source_code))
+        except OSError as e:
+            print(f"读取文件 {file_path} 时出错: {e}")
+            continue
+        builder.add_tree(tree.root_node, file_path)
+    return builder.build()
+
+
+# 使用示例
+if __name__ == "__main__":
+    import argparse
+
+    from ast_pipeline import load_compressor_module
+
+    parser = argparse.ArgumentParser(description='导出列式AST节点表')
+    parser.add_argument('input', help='Java源代码文件或目录路径')
+    parser.add_argument('--output', '-o', help='输出文件路径', default='project_ast.jast')
+    parser.add_argument('--lang-path', '-l', help='tree-sitter语言库路径', default=None)
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"错误: 路径 {args.input} 不存在")
+        sys.exit(1)
+
+    java_parser = load_compressor_module().create_java_parser(args.lang_path)
+    table = build_project_table(args.input, java_parser)
+    table.save(args.output)
+
+    print(f"节点表已保存到: {args.output}")
+    print(f"- 文件数: {len(table.file_paths)}")
+    print(f"- 节点数: {len(table)}")
+    print(f"- 节点类型数: {len(table.kinds)}")
+    print(f"- 文件大小: {os.path.getsize(args.output) / 1024:.2f} KB")
@@ -0,0 +1,52 @@
+"""按节点类型分派的访问器基类
+
+ASTCompressor、EnhancedASTCompressor、LLMFriendlyASTCompressor共用。
+子类在NODE_HANDLERS中按优先级列出 (节点类型集合, 处理方法名)，类创建时合并为类型名到方法的映射；
+实例化时按语法的kind_id展开为列表，每个节点只需一次下标访问就能取得处理函数，
+新增处理方法只需在表中加一行，不会加长if/elif链。
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from java_node_kinds import KIND_ID_LIMIT, NodeKinds
+
+
+class NodeVisitor:
+    """按node.kind_id分派处理方法的基类"""
+
+    # (节点类型集合, 处理方法名)，同一类型出现多次时靠前的优先
+    NODE_HANDLERS: Tuple[Tuple[Iterable[str], str], ...] = ()
+
+    # 其余类型的处理方法名，为None时分派表中对应位置为None
+    DEFAULT_HANDLER: Optional[str] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        handler_names = {}
+        for type_names, method_name in cls.NODE_HANDLERS:
+            if not callable(getattr(cls, method_name, None)):
+                raise TypeError(f"{cls.__name__}.NODE_HANDLERS 引用了不存在的方法 {method_name}")
+            for type_name in type_names:
+                handler_names.setdefault(type_name, method_name)
+        if cls.DEFAULT_HANDLER is not None and not callable(getattr(cls, cls.DEFAULT_HANDLER, None)):
+            raise TypeError(f"{cls.__name__}.DEFAULT_HANDLER 引用了不存在的方法 {cls.DEFAULT_HANDLER}")
+
+        cls._handler_names: Dict[str, str] = handler_names
+        cls._dispatch_tables: Dict[NodeKinds, List[Optional[Callable]]] = {}
+
+    @classmethod
+    def dispatch_table(cls, node_kinds: NodeKinds) -> List[Optional[Callable]]:
+        """
+        按kind_id索引的处理函数表，每个类每种语法只生成一次
+
+        表中为未绑定的函数，调用方式为 table[node.kind_id](self, node, ...)。
+        """
+        table = cls._dispatch_tables.get(node_kinds)
+        if table is None:
+            default = getattr(cls, cls.DEFAULT_HANDLER) if cls.DEFAULT_HANDLER else None
+            table = [default] * KIND_ID_LIMIT
+            for type_name, method_name in cls._handler_names.items():
+                handler = getattr(cls, method_name)
+                for kind_id in node_kinds.ids(type_name):
+                    table[kind_id] = handler
+            cls._dispatch_tables[node_kinds] = table
+        return table
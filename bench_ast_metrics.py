@@ -0,0 +1,223 @@
+"""比较逐方法递归遍历与ast_metrics向量化计算方法复杂度的耗时
+
+用法: python bench_ast_metrics.py [节点表文件 | 方法数量]
+      python bench_ast_metrics.py Java源码目录 [语言库路径]
+
+给出ast_table.py导出的节点表时直接使用，否则按典型方法体结构构造合成节点表。
+递归版本按EnhancedASTCompressor中 _calculate_max_nesting、_count_statement_types 的方式
+对每个方法的子树逐节点递归，两者结果逐项核对一致后输出耗时。
+这一核对只验证ast_metrics与同口径的递归实现一致；给出源码目录时另外用ast-compressor3.py
+压缩每个文件，逐方法与其method_complexity中的圈复杂度和嵌套深度核对并列出差异。
+
+加速比随表的规模下降：递归版本的耗时与节点数成正比，而向量化版本的花式索引在表超出CPU缓存后
+每个节点的开销增加。本机合成表上NumPy向量化在5000个方法（157万节点）时约15~17x，
+20000个方法（628万节点）时降到约7~8x，达不到10x，输出中同时给出每个节点的耗时。
+"""
+import os
+import sys
+import time
+from array import array
+from collections import Counter
+
+from ast_metrics import (compute_method_metrics, METHOD_NODE_TYPES, DECISION_NODE_TYPES,
+                         NESTING_NODE_TYPES, _is_statement_type)
+from ast_table import COLUMNS, NodeTable, load_node_table
+
+METHODS_PER_FILE = 20
+
+
+class _SyntheticTable:
+    """直接按先序追加节点，构造不依赖tree-sitter的节点表"""
+
+    def __init__(self):
+        self.kinds = []
+        self.kind_ids = {}
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS}
+        self.file_starts = array('q', [0])
+        self.file_paths = []
+        self.last_child = {}
+
+    def add(self, type_name, parent=-1):
+        columns = self.columns
+        index = len(columns['kind'])
+        if type_name not in self.kind_ids:
+            self.kind_ids[type_name] = len(self.kinds)
+            self.kinds.append(type_name)
+        columns['kind'].append(self.kind_ids[type_name])
+        columns['parent'].append(parent)
+        columns['start_byte'].append(index)
+        columns['end_byte'].append(index + 1)
+        columns['first_child'].append(-1)
+        columns['next_sibling'].append(-1)
+        if parent != -1:
+            previous = self.last_child.get(parent, -1)
+            if previous == -1:
+                columns['first_child'][parent] = index
+            else:
+                columns['next_sibling'][previous] = index
+            self.last_child[parent] = index
+        return index
+
+    def add_statements(self, parent, depth, seed):
+        for i in range(4):
+            statement = self.add('expression_statement', parent)
+            call = self.add('method_invocation', statement)
+            self.add('identifier', call)
+            self.add('argument_list', call)
+        if depth < 3:
+            if_statement = self.add('if_statement', parent)
+            condition = self.add('binary_expression', if_statement)
+            self.add('identifier', condition)
+            self.add('&&' if seed % 2 else '||', condition)
+            self.add('identifier', condition)
+            self.add_statements(self.add('block', if_statement), depth + 1, seed + 1)
+            loop = self.add('for_statement', parent)
+            self.add_statements(self.add('block', loop), depth + 1, seed + 2)
+        self.add('return_statement', parent)
+
+    def add_file(self, method_count, file_index):
+        program = self.add('program')
+        body = self.add('class_body', self.add('class_declaration', program))
+        for m in range(method_count):
+            method = self.add('method_declaration', body)
+            self.add('identifier', method)
+            self.add_statements(self.add('block', method), 0, m)
+        self.file_starts.append(len(self.columns['kind']))
+        self.file_paths.append(f"File{file_index}.java")
+
+    def build(self):
+        return NodeTable(self.kinds, self.columns, self.file_starts, self.file_paths)
+
+
+def synthetic_table(method_count):
+    builder = _SyntheticTable()
+    for file_index in range(max(1, method_count // METHODS_PER_FILE)):
+        builder.add_file(min(METHODS_PER_FILE, method_count), file_index)
+    return builder.build()
+
+
+def recursive_metrics(table):
+    """逐方法递归遍历子树，遇到嵌套的方法节点时不进入（与ast_metrics口径一致）"""
+    results = []
+
+    def max_nesting(index, current_depth):
+        max_depth = current_depth
+        if table.node_type(index) in NESTING_NODE_TYPES:
+            current_depth += 1
+            max_depth = current_depth
+        for child in table.children(index):
+            if table.node_type(child) not in METHOD_NODE_TYPES:
+                max_depth = max(max_depth, max_nesting(child, current_depth))
+        return max_depth
+
+    def count(index, counts):
+        node_type = table.node_type(index)
+        if node_type in DECISION_NODE_TYPES:
+            counts['__decisions__'] += 1
+        if _is_statement_type(node_type):
+            counts[node_type] += 1
+        for child in table.children(index):
+            if table.node_type(child) not in METHOD_NODE_TYPES:
+                count(child, counts)
+
+    for index in range(len(table)):
+        if table.node_type(index) in METHOD_NODE_TYPES:
+            counts = Counter()
+            count(index, counts)
+            decisions = counts.pop('__decisions__', 0)
+            results.append((index, 1 + decisions, max_nesting(index, 0), dict(counts)))
+    return results
+
+
+def as_tuples(metrics):
+    results = []
+    for position, index in enumerate(metrics["methods"]):
+        counts = {kind: int(count) for kind, count
+                  in zip(metrics["statement_kinds"], metrics["statement_counts"][position]) if count}
+        results.append((int(index), int(metrics["cyclomatic"][position]),
+                        int(metrics["max_nesting"][position]), counts))
+    return results
+
+
+def compare_with_compressor(directory, lang_path=None):
+    """用EnhancedASTCompressor压缩目录中的每个文件，逐方法核对圈复杂度与嵌套深度"""
+    import importlib.util
+
+    from ast_metrics import method_name
+    from ast_table import build_project_table
+    from java_source import open_java_source
+
+    spec = importlib.util.spec_from_file_location(
+        'ast_compressor3', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ast-compressor3.py'))
+    compressor = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(compressor)
+
+    from ast_pipeline import load_compressor_module
+    table = build_project_table(directory, load_compressor_module().create_java_parser(lang_path))
+    metrics = compute_method_metrics(table)
+
+    by_file = {}
+    for position, method_index in enumerate(metrics["methods"]):
+        by_file.setdefault(int(metrics["file"][position]), []).append((position, int(method_index)))
+
+    compared, mismatches = 0, []
+    for file_index, positions in by_file.items():
+        file_path = table.file_paths[file_index]
+        with open_java_source(file_path) as source:
+            expected = compressor.compress_java_ast(source, lang_path).get("method_complexity", {})
+            names = [(position, method_name(table, method_index, source)) for position, method_index in positions]
+        name_counts = Counter(name for _, name in names)
+        for position, name in names:
+            # 压缩器按方法名记录，重载方法无法一一对应，跳过
+            if name_counts[name] > 1 or name not in expected:
+                continue
+            compared += 1
+            actual = (int(metrics["cyclomatic"][position]), int(metrics["max_nesting"][position]))
+            wanted = (expected[name]["cyclomatic"], expected[name]["max_nesting"])
+            if actual != wanted:
+                mismatches.append((file_path, name, wanted, actual))
+
+    print(f"与EnhancedASTCompressor核对: {compared} 个方法, 一致 {compared - len(mismatches)} 个")
+    for file_path, name, wanted, actual in mismatches[:20]:
+        print(f"- {file_path} {name}: 压缩器(圈复杂度, 嵌套)={wanted}, ast_metrics={actual}")
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    argument = sys.argv[1] if len(sys.argv) > 1 else '5000'
+    if os.path.isdir(argument):
+        compare_with_compressor(argument, sys.argv[2] if len(sys.argv) > 2 else None)
+        return
+    if os.path.exists(argument):
+        table = load_node_table(argument)
+    else:
+        table = synthetic_table(int(argument))
+
+    expected, recursive_seconds = timed(recursive_metrics, table)
+    linear, linear_seconds = timed(compute_method_metrics, table, use_numpy=False)
+    assert as_tuples(linear) == expected, "单遍扫描结果与递归结果不一致"
+
+    per_node = 1e9 / len(table)
+    print(f"节点数: {len(table)}, 方法数: {len(expected)}")
+    print(f"- 逐方法递归:   {recursive_seconds:.3f} 秒 ({recursive_seconds * per_node:.0f} ns/节点)")
+    print(f"- 单遍扫描:     {linear_seconds:.3f} 秒 ({linear_seconds * per_node:.0f} ns/节点, "
+          f"{recursive_seconds / linear_seconds:.1f}x)")
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("- NumPy未安装，跳过向量化计算")
+        return
+    vectorized, numpy_seconds = timed(compute_method_metrics, table, use_numpy=True)
+    assert as_tuples(vectorized) == expected, "向量化结果与递归结果不一致"
+    print(f"- NumPy向量化:  {numpy_seconds:.3f} 秒 ({numpy_seconds * per_node:.0f} ns/节点, "
+          f"{recursive_seconds / numpy_seconds:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""比较java-analysis.py提取结果用dict与__slots__记录保存时的内存占用
+
+用法: python bench_java_records.py [类数量]
+
+按典型项目的规模构造合成数据（每个类若干方法、字段和局部变量，类型名大量重复），
+分别以原先的dict结构和java_records中的记录类型保存，用tracemalloc统计内存。
+"""
+import sys
+import tracemalloc
+
+from java_records import ClassInfo, MethodInfo, FieldInfo, LocalVar
+
+METHODS_PER_CLASS = 8
+FIELDS_PER_CLASS = 6
+LOCALS_PER_METHOD = 5
+
+TYPES = [
+    (b'String', b'java.lang.String'),
+    (b'int', b'int'),
+    (b'List<String>', b'java.util.List<String>'),
+    (b'Map<String, Object>', b'java.util.Map<String, Object>'),
+    (b'Document', b'org.w3c.dom.Document'),
+    (b'DocumentBuilder', b'javax.xml.parsers.DocumentBuilder'),
+]
+
+
+def _type_at(i):
+    # 每次都解码出新字符串，模拟从不同文件的语法树节点中取得的文本
+    var_type, full_path = TYPES[i % len(TYPES)]
+    return var_type.decode('utf-8'), full_path.decode('utf-8')
+
+
+def build_dicts(class_count):
+    classes = []
+    for c in range(class_count):
+        package = f"com.example.module{c % 50}"
+        class_name = f"Class{c}"
+        class_info = {
+            'name': class_name,
+            'full_path': f"{package}.{class_name}",
+            'methods': [],
+            'fields': [],
+            'line': 10,
+            'file_path': f"src/main/java/com/example/module{c % 50}/{class_name}.java"
+        }
+        for m in range(METHODS_PER_CLASS):
+            method = {'name': f"method{m}", 'return_type': 'void', 'local_variables': [], 'line': 20 + m}
+            for v in range(LOCALS_PER_METHOD):
+                var_type, full_path = _type_at(v)
+                method['local_variables'].append(
+                    {'name': f"var{v}", 'type': var_type, 'type_full_path': full_path, 'line': 21 + v})
+            class_info['methods'].append(method)
+        for f in range(FIELDS_PER_CLASS):
+            var_type, full_path = _type_at(f)
+            class_info['fields'].append(
+                {'name': f"field{f}", 'type': var_type, 'type_full_path': full_path, 'line': 12 + f})
+        classes.append(class_info)
+    return classes
+
+
+def build_records(class_count):
+    classes = []
+    for c in range(class_count):
+        package = f"com.example.module{c % 50}"
+        class_name = f"Class{c}"
+        class_info = ClassInfo(class_name, package, 10,
+                               f"src/main/java/com/example/module{c % 50}/{class_name}.java")
+        for m in range(METHODS_PER_CLASS):
+            method = MethodInfo(f"method{m}", 'void', 20 + m)
+            for v in range(LOCALS_PER_METHOD):
+                var_type, full_path = _type_at(v)
+                method.local_variables.append(LocalVar(f"var{v}", var_type, full_path, 21 + v))
+            class_info.methods.append(method)
+        for f in range(FIELDS_PER_CLASS):
+            var_type, full_path = _type_at(f)
+            class_info.fields.append(FieldInfo(f"field{f}", var_type, full_path, 12 + f))
+        classes.append(class_info)
+    return classes
+
+
+def measure(builder, class_count):
+    tracemalloc.start()
+    data = builder(class_count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current
+
+
+def main():
+    class_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    dict_bytes = measure(build_dicts, class_count)
+    record_bytes = measure(build_records, class_count)
+
+    print(f"类数量: {class_count} (每类 {METHODS_PER_CLASS} 个方法, {FIELDS_PER_CLASS} 个字段, "
+          f"每方法 {LOCALS_PER_METHOD} 个局部变量)")
+    print(f"- dict结构:     {dict_bytes / 1024 / 1024:.1f} MB")
+    print(f"- __slots__记录: {record_bytes / 1024 / 1024:.1f} MB")
+    print(f"- 减少: {(1 - record_bytes / dict_bytes) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""比较多线程下每个请求新建Parser与使用tree_sitter_java.ParserPool的解析吞吐量
+
+用法: python bench_parser_pool.py [Java源码目录] [--threads 1,2,4,8] [--requests 2000]
+
+给出目录时使用其中的.java文件（循环使用），否则构造合成的Java源码。
+tree-sitter解析时释放GIL，线程数增加时吞吐量应随CPU核数近似线性增长；
+新建Parser的方式每个请求都要创建解析器并设置语言，差距主要体现在小文件上。
+需要安装tree-sitter和tree-sitter-java（pip install ./ 安装本仓库的Python绑定）。
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tree_sitter import Language, Parser
+
+import tree_sitter_java
+
+METHODS_PER_FILE = 30
+
+
+def synthetic_source(index: int) -> bytes:
+    methods = []
+    for m in range(METHODS_PER_FILE):
+        methods.append(
+            f"    public int method{m}(int value, String name) {{\n"
+            f"        int total = value;\n"
+            f"        for (int i = 0; i < {m + 3}; i++) {{\n"
+            f"            if (name != null && i % 2 == 0) {{ total += name.length() * i; }}\n"
+            f"            else {{ total -= i; }}\n"
+            f"        }}\n"
+            f"        return total;\n"
+            f"    }}\n")
+    return (f"package com.example.bench;\n\nimport java.util.List;\n\n"
+            f"public class Bench{index} {{\n" + ''.join(methods) + "}\n").encode('utf-8')
+
+
+def load_sources(directory: str):
+    sources = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith('.java'):
+                with open(os.path.join(root, file), 'rb') as f:
+                    sources.append(f.read())
+    return sources
+
+
+def run(parse, sources, requests: int, threads: int) -> float:
+    """以threads个线程完成requests次解析，返回耗时（秒）"""
+    work = [sources[i % len(sources)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for tree in executor.map(parse, work):
+            assert tree.root_node is not None
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多线程解析吞吐量：新建Parser与ParserPool对比')
+    parser.add_argument('directory', nargs='?', help='Java源码目录，默认使用合成源码')
+    parser.add_argument('--threads', default='1,2,4,8', help='逗号分隔的线程数')
+    parser.add_argument('--requests', type=int, default=2000, help='每种配置的解析次数')
+    args = parser.parse_args()
+
+    sources = load_sources(args.directory) if args.directory else [synthetic_source(i) for i in range(64)]
+    if not sources:
+        print(f"错误: {args.directory} 中没有.java文件")
+        return
+    thread_counts = [int(count) for count in args.threads.split(',')]
+    total_bytes = sum(len(sources[i % len(sources)]) for i in range(args.requests))
+    print(f"源码 {len(sources)} 个, 每种配置解析 {args.requests} 次 ({total_bytes / 1024 / 1024:.1f} MB), "
+          f"CPU核数 {os.cpu_count()}")
+
+    language = Language(tree_sitter_java.language())
+
+    def parse_with_new_parser(source):
+        return Parser(language).parse(source)
+
+    print(f"{'线程数':>6} {'新建Parser(次/秒)':>18} {'ParserPool(次/秒)':>18} {'池化加速':>8} {'池化扩展比':>10}")
+    baseline = None
+    for threads in thread_counts:
+        pool = tree_sitter_java.ParserPool(max_size=threads)
+        # 预热：创建池中的解析器
+        run(pool.parse, sources, threads, threads)
+        new_elapsed = run(parse_with_new_parser, sources, args.requests, threads)
+        pool_elapsed = run(pool.parse, sources, args.requests, threads)
+        new_rate = args.requests / new_elapsed
+        pool_rate = args.requests / pool_elapsed
+        if baseline is None:
+            baseline = pool_rate
+        print(f"{threads:>6} {new_rate:>18.1f} {pool_rate:>18.1f} {pool_rate / new_rate:>7.2f}x "
+              f"{pool_rate / baseline:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,3 +9,67 @@ class TestLanguage(TestCase):
             tree_sitter.Language(tree_sitter_java.language())
         except Exception:
             self.fail("Error loading Java grammar")
+
+
+class TestQueries(TestCase):
+    def test_query_text(self):
+        self.assertIn("@", tree_sitter_java.HIGHLIGHTS_QUERY)
+        self.assertIn("@", tree_sitter_java.TAGS_QUERY)
+
+    def test_compiled_queries_are_cached(self):
+        query = tree_sitter_java.highlights_query()
+        self.assertIsInstance(query, tree_sitter.Query)
+        self.assertGreater(query.pattern_count, 0)
+        self.assertIs(tree_sitter_java.highlights_query(), query)
+        self.assertIs(tree_sitter_java.tags_query(), tree_sitter_java.tags_query())
+
+
+class TestParserPool(TestCase):
+    def test_parse(self):
+        pool = tree_sitter_java.ParserPool(max_size=2)
+        tree = pool.parse(b"class A { void f() {} }")
+        self.assertEqual(tree.root_node.type, "program")
+        self.assertFalse(tree.root_node.has_error)
+        self.assertEqual(pool.idle, 1)
+
+    def test_thread_affinity(self):
+        pool = tree_sitter_java.ParserPool(max_size=2)
+        first = pool.checkout()
+        second = pool.checkout()
+        pool.checkin(second)
+        pool.checkin(first)
+        self.assertIs(pool.checkout(), second)
+
+    def test_bounded(self):
+        pool = tree_sitter_java.ParserPool(max_size=1)
+        parser = pool.checkout()
+        with self.assertRaises(TimeoutError):
+            pool.checkout(timeout=0.01)
+        pool.checkin(parser)
+        with pool.parser(timeout=0.01) as again:
+            self.assertIs(again, parser)
+        self.assertEqual(pool.size, 1)
+
+    def test_checkin_rejects_unknown_or_returned_parser(self):
+        pool = tree_sitter_java.ParserPool(max_size=2)
+        parser = pool.checkout()
+        pool.checkin(parser)
+        with self.assertRaises(ValueError):
+            pool.checkin(parser)
+        with self.assertRaises(ValueError):
+            pool.checkin(tree_sitter.Parser(tree_sitter.Language(tree_sitter_java.language())))
+        self.assertEqual(pool.idle, 1)
+        self.assertEqual(pool.size, 1)
+        first, second = pool.checkout(), pool.checkout()
+        self.assertIsNot(first, second)
+
+    def test_concurrent_checkout(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = tree_sitter_java.ParserPool(max_size=2)
+        sources = [f"class C{i} {{ int x = {i}; }}".encode() for i in range(32)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            trees = list(executor.map(pool.parse, sources))
+        self.assertTrue(all(not tree.root_node.has_error for tree in trees))
+        self.assertLessEqual(pool.size, 2)
+        self.assertEqual(pool.idle, pool.size)
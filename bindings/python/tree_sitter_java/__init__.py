@@ -1,29 +1,78 @@
 """Java grammar for tree-sitter"""
 
-from importlib.resources import files as _files
+from os.path import dirname, isfile, join
+from threading import Lock
 
 from ._binding import language
+from ._pool import ParserPool
+
+_QUERY_FILES = {
+    "HIGHLIGHTS_QUERY": "highlights.scm",
+    "TAGS_QUERY": "tags.scm",
+}
+
+_compiled_queries = {}
+_compile_lock = Lock()
+
+
+def _read_query(file):
+    # Read straight from the package directory when installed unzipped;
+    # importing importlib.resources costs more than the rest of the package.
+    path = join(dirname(__file__), "queries", file)
+    if isfile(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    from importlib.resources import files
+
+    return (files(f"{__package__}.queries") / file).read_text()
 
 
 def _get_query(name, file):
-    query = _files(f"{__package__}.queries") / file
-    globals()[name] = query.read_text()
+    globals()[name] = _read_query(file)
     return globals()[name]
 
 
+def _compiled_query(name):
+    query = _compiled_queries.get(name)
+    if query is not None:
+        return query
+
+    from tree_sitter import Language, Query
+
+    with _compile_lock:
+        query = _compiled_queries.get(name)
+        if query is None:
+            source = globals().get(name) or _get_query(name, _QUERY_FILES[name])
+            query = Query(Language(language()), source)
+            _compiled_queries[name] = query
+    return query
+
+
+def highlights_query():
+    """Get the compiled highlights query, compiling it on first use."""
+    return _compiled_query("HIGHLIGHTS_QUERY")
+
+
+def tags_query():
+    """Get the compiled tags query, compiling it on first use."""
+    return _compiled_query("TAGS_QUERY")
+
+
 def __getattr__(name):
-    if name == "HIGHLIGHTS_QUERY":
-        return _get_query("HIGHLIGHTS_QUERY", "highlights.scm")
-    if name == "TAGS_QUERY":
-        return _get_query("TAGS_QUERY", "tags.scm")
+    if name in _QUERY_FILES:
+        return _get_query(name, _QUERY_FILES[name])
 
     raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 __all__ = [
     "language",
+    "ParserPool",
     "HIGHLIGHTS_QUERY",
     "TAGS_QUERY",
+    "highlights_query",
+    "tags_query",
 ]
 
 
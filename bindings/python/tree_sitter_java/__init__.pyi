@@ -1,6 +1,25 @@
+from contextlib import AbstractContextManager
 from typing import Final
 
+from tree_sitter import Parser, Query, Tree
+
 HIGHLIGHTS_QUERY: Final[str]
 TAGS_QUERY: Final[str]
 
 def language() -> object: ...
+
+def highlights_query() -> Query: ...
+
+def tags_query() -> Query: ...
+
+class ParserPool:
+    max_size: int
+    def __init__(self, max_size: int | None = None) -> None: ...
+    @property
+    def size(self) -> int: ...
+    @property
+    def idle(self) -> int: ...
+    def checkout(self, timeout: float | None = None) -> Parser: ...
+    def checkin(self, parser: Parser) -> None: ...
+    def parser(self, timeout: float | None = None) -> AbstractContextManager[Parser]: ...
+    def parse(self, source: bytes, timeout: float | None = None) -> Tree: ...
@@ -0,0 +1,116 @@
+"""Thread-safe pool of Java parsers."""
+
+import os
+import threading
+from contextlib import contextmanager
+
+from ._binding import language
+
+
+class ParserPool:
+    """A bounded pool of ``tree_sitter.Parser`` objects set to the Java language.
+
+    Parsers are created lazily, up to ``max_size``. A thread that checks out a
+    parser gets back the one it used last when that parser is idle, so the
+    parser's internal buffers stay warm for that thread. When every parser is
+    in use, ``checkout`` blocks until one is returned or ``timeout`` expires.
+
+    >>> pool = ParserPool()
+    >>> with pool.parser() as parser:
+    ...     tree = parser.parse(b"class A {}")
+    """
+
+    def __init__(self, max_size=None):
+        if max_size is None:
+            max_size = os.cpu_count() or 1
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self._language = None
+        self._idle = []
+        self._checked_out = set()
+        self._size = 0
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    @property
+    def size(self):
+        """The number of parsers created so far."""
+        return self._size
+
+    @property
+    def idle(self):
+        """The number of parsers currently checked in."""
+        return len(self._idle)
+
+    def _new_parser(self):
+        from tree_sitter import Language, Parser
+
+        if self._language is None:
+            self._language = Language(language())
+        return Parser(self._language)
+
+    def _available(self):
+        return bool(self._idle) or self._size < self.max_size
+
+    def checkout(self, timeout=None):
+        """Take a parser from the pool, creating one if the pool is not full.
+
+        Raises ``TimeoutError`` if no parser becomes available within
+        ``timeout`` seconds.
+        """
+        preferred = getattr(self._local, "parser", None)
+        with self._condition:
+            if not self._condition.wait_for(self._available, timeout):
+                raise TimeoutError("no parser available in the pool")
+            if self._idle:
+                if preferred is not None and preferred in self._idle:
+                    self._idle.remove(preferred)
+                    self._checked_out.add(preferred)
+                    return preferred
+                parser = self._idle.pop()
+                self._checked_out.add(parser)
+                self._local.parser = parser
+                return parser
+            self._size += 1
+
+        try:
+            parser = self._new_parser()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._checked_out.add(parser)
+        self._local.parser = parser
+        return parser
+
+    def checkin(self, parser):
+        """Return a parser previously obtained from ``checkout``.
+
+        Raises ``ValueError`` if the parser did not come from this pool or has
+        already been checked in.
+        """
+        with self._condition:
+            if parser not in self._checked_out:
+                raise ValueError("parser is not checked out from this pool")
+            self._checked_out.remove(parser)
+        parser.reset()
+        with self._condition:
+            self._idle.append(parser)
+            self._condition.notify()
+
+    @contextmanager
+    def parser(self, timeout=None):
+        """Check out a parser for the duration of a ``with`` block."""
+        parser = self.checkout(timeout)
+        try:
+            yield parser
+        finally:
+            self.checkin(parser)
+
+    def parse(self, source, timeout=None):
+        """Parse ``source`` with a pooled parser and return the tree."""
+        with self.parser(timeout) as parser:
+            return parser.parse(source)
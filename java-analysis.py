@@ -1,10 +1,27 @@
 import os
 import sys
 import time  # 添加time模块用于计时
+import json
+import zlib
 from tree_sitter import Language, Parser
 import re
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+
+from java_source import open_java_source, open_java_stream, to_parser_input, node_text, count_lines
+from java_records import ClassInfo, MethodInfo, FieldInfo, LocalVar
+from java_structure_db import StructureDatabase, load_classes, DEFAULT_DB_NAME
+from java_structure_export import StructureExporter, FORMATS as EXPORT_FORMATS
+from output_manifest import write_directory_manifest, MANIFEST_NAME
+from java_file_filter import JavaFileFilter, add_filter_arguments, filter_from_args, walk_order_key
+from java_git_changes import GitError, changed_java_files, find_dependents
+from java_parse_errors import ParseErrorReport, collect_parse_errors, DEFAULT_REPORT_NAME as DEFAULT_ERROR_REPORT_NAME
+from java_external_sort import ExternalSorter, DEFAULT_MEMORY_LIMIT as DEFAULT_SORT_MEMORY_LIMIT
+
+# 超过该大小的源文件改用read回调流式解析（如30MB以上的JAXB/protobuf生成代码）
+STREAM_THRESHOLD_BYTES = 16 * 1024 * 1024
 
 def setup_tree_sitter():
     """设置tree-sitter-java解析器"""
@@ -27,17 +44,17 @@ def setup_tree_sitter():
     
     return parser
 
-def get_package_name(root_node):
+def get_package_name(root_node, source=None):
     """从语法树中提取包名"""
     package_node = next((node for node in root_node.children 
                          if node.type == "package_declaration"), None)
     if package_node:
         for child in package_node.children:
             if child.type == "scoped_identifier":
-                return child.text.decode('utf-8')
+                return node_text(child, source)
     return ""
 
-def get_imports(root_node):
+def get_imports(root_node, source=None):
     """提取所有导入语句，用于解析全路径类型"""
     imports = {}
     import_nodes = [node for node in root_node.children 
@@ -46,7 +63,7 @@ def get_imports(root_node):
     for import_node in import_nodes:
         for child in import_node.children:
             if child.type == "scoped_identifier":
-                import_text = child.text.decode('utf-8')
+                import_text = node_text(child, source)
                 class_name = import_text.split('.')[-1]
                 if class_name != "*":  # 忽略通配符导入
                     imports[class_name] = import_text
@@ -57,26 +74,14 @@ def get_line_number(node):
     """获取节点的起始行号"""
     return node.start_point[0] + 1  # 行号从0开始，转为1开始
 
-def get_class_info(class_node, package_name, imports, file_path):
+def get_class_info(class_node, package_name, imports, file_path, source=None):
     """提取类信息及其方法和变量"""
-    class_info = {
-        'name': '',
-        'full_path': '',
-        'methods': [],
-        'fields': [],
-        'line': get_line_number(class_node),
-        'file_path': file_path
-    }
-    
-    # 提取类名
+    class_info = ClassInfo(package=package_name, line=get_line_number(class_node), file_path=file_path)
+    
+    # 提取类名（全路径由ClassInfo.full_path按包名拼接）
     for child in class_node.children:
         if child.type == "identifier":
-            class_name = child.text.decode('utf-8')
-            class_info['name'] = class_name
-            if package_name:
-                class_info['full_path'] = f"{package_name}.{class_name}"
-            else:
-                class_info['full_path'] = class_name
+            class_info.name = node_text(child, source)
     
     # 提取类声明体
     class_body = next((child for child in class_node.children 
@@ -86,49 +91,45 @@ def get_class_info(class_node, package_name, imports, file_path):
         # 提取方法
         for child in class_body.children:
             if child.type == "method_declaration":
-                method_info = extract_method_info(child, imports, package_name)
+                method_info = extract_method_info(child, imports, package_name, source)
                 if method_info:
-                    class_info['methods'].append(method_info)
+                    class_info.methods.append(method_info)
             
             # 提取字段/变量
             elif child.type == "field_declaration":
-                field_infos = extract_field_info(child, imports, package_name)
-                class_info['fields'].extend(field_infos)
+                field_infos = extract_field_info(child, imports, package_name, source)
+                class_info.fields.extend(field_infos)
     
     return class_info
 
-def extract_method_info(method_node, imports, package_name):
+def extract_method_info(method_node, imports, package_name, source=None):
     """提取方法信息及其内部局部变量"""
-    method_info = {
-        'name': '',
-        'return_type': '',
-        'local_variables': [],
-        'line': get_line_number(method_node)
-    }
+    method_info = MethodInfo(line=get_line_number(method_node))
     
     # 提取方法名和返回类型
     for child in method_node.children:
         if child.type == "identifier":
-            method_info['name'] = child.text.decode('utf-8')
+            method_info.name = node_text(child, source)
         elif child.type == "primitive_type" or child.type == "type_identifier":
-            method_info['return_type'] = child.text.decode('utf-8')
+            method_info.return_type = sys.intern(node_text(child, source))
         elif child.type == "void_type":
-            method_info['return_type'] = "void"
+            method_info.return_type = "void"
         
         # 提取方法体
         elif child.type == "block":
             # 遍历方法体寻找局部变量声明
-            extract_local_variables(child, method_info['local_variables'], imports, package_name)
+            extract_local_variables(child, method_info.local_variables, imports, package_name, source)
     
     return method_info
 
-def extract_type_full_info(node, imports, package_name):
+def extract_type_full_info(node, imports, package_name, source=None):
     """提取类型的完整信息，包括集合类型和数组类型"""
     # 处理基本类型和普通类型
     if node.type == "primitive_type":
-        return node.text.decode('utf-8'), node.text.decode('utf-8')
+        primitive_type = node_text(node, source)
+        return primitive_type, primitive_type
     elif node.type == "type_identifier":
-        var_type = node.text.decode('utf-8')
+        var_type = node_text(node, source)
         # 尝试解析全路径
         if var_type in imports:
             var_type_full_path = imports[var_type]
@@ -143,11 +144,11 @@ def extract_type_full_info(node, imports, package_name):
         
         for child in node.children:
             if child.type == "type_identifier":
-                base_type = child.text.decode('utf-8')
+                base_type = node_text(child, source)
             elif child.type in ["type_arguments", "type_argument"]:
                 for arg_child in child.children:
                     if arg_child.type in ["type_identifier", "primitive_type"]:
-                        type_args.append(arg_child.text.decode('utf-8'))
+                        type_args.append(node_text(arg_child, source))
         
         if base_type and type_args:
             var_type = f"{base_type}<{', '.join(type_args)}>"
@@ -165,7 +166,7 @@ def extract_type_full_info(node, imports, package_name):
         element_type = None
         for child in node.children:
             if child.type in ["type_identifier", "primitive_type"]:
-                element_type_name, element_type_full_path = extract_type_full_info(child, imports, package_name)
+                element_type_name, element_type_full_path = extract_type_full_info(child, imports, package_name, source)
                 var_type = f"{element_type_name}[]"
                 var_type_full_path = f"{element_type_full_path}[]"
                 return var_type, var_type_full_path
@@ -192,7 +193,7 @@ def guess_type_from_name(var_name):
     # 对于无法猜测的变量，返回空字符串
     return '', ''
 
-def extract_local_variables(block_node, local_vars, imports, package_name):
+def extract_local_variables(block_node, local_vars, imports, package_name, source=None):
     """从方法体中提取局部变量"""
     
     def traverse_node(node):
@@ -205,23 +206,20 @@ def extract_local_variables(block_node, local_vars, imports, package_name):
             for child in node.children:
                 # 处理基本类型和普通类型
                 if child.type in ["primitive_type", "type_identifier", "generic_type", "array_type"]:
-                    var_type, var_type_full_path = extract_type_full_info(child, imports, package_name)
+                    var_type, var_type_full_path = extract_type_full_info(child, imports, package_name, source)
                 # 处理变量声明
                 elif child.type == "variable_declarator":
                     for grandchild in child.children:
                         if grandchild.type == "identifier":
-                            var_name = grandchild.text.decode('utf-8')
+                            var_name = node_text(grandchild, source)
                             
                             # 如果无法从声明中获取类型，尝试根据变量名猜测
                             if not var_type:
                                 var_type, var_type_full_path = guess_type_from_name(var_name)
                             
-                            var_declarations.append({
-                                'name': var_name,
-                                'type': var_type,
-                                'type_full_path': var_type_full_path,
-                                'line': get_line_number(child)  # 记录变量声明的行号
-                            })
+                            # 记录变量声明的行号
+                            var_declarations.append(LocalVar(var_name, var_type, var_type_full_path,
+                                                             get_line_number(child)))
             
             # 添加所有变量声明到列表
             local_vars.extend(var_declarations)
@@ -232,7 +230,7 @@ def extract_local_variables(block_node, local_vars, imports, package_name):
     
     traverse_node(block_node)
 
-def extract_field_info(field_node, imports, package_name):
+def extract_field_info(field_node, imports, package_name, source=None):
     """提取字段/变量信息"""
     field_infos = []
     
@@ -245,89 +243,242 @@ def extract_field_info(field_node, imports, package_name):
     
     # 如果找到类型节点，提取类型信息
     if type_node:
-        var_type, var_type_full_path = extract_type_full_info(type_node, imports, package_name)
+        var_type, var_type_full_path = extract_type_full_info(type_node, imports, package_name, source)
         
         # 查找所有变量声明
         for child in field_node.children:
             if child.type == "variable_declarator":
                 for grandchild in child.children:
                     if grandchild.type == "identifier":
-                        field_name = grandchild.text.decode('utf-8')
+                        field_name = node_text(grandchild, source)
                         
                         # 如果无法从声明中获取类型，尝试根据变量名猜测
                         if not var_type:
                             var_type, var_type_full_path = guess_type_from_name(field_name)
                             
-                        field_infos.append({
-                            'name': field_name,
-                            'type': var_type,
-                            'type_full_path': var_type_full_path,
-                            'line': get_line_number(child)  # 记录字段声明的行号
-                        })
+                        # 记录字段声明的行号
+                        field_infos.append(FieldInfo(field_name, var_type, var_type_full_path,
+                                                     get_line_number(child)))
     
     return field_infos
 
-def process_java_file(file_path, parser):
-    """处理单个Java文件"""
-    with open(file_path, 'rb') as f:
-        source_code = f.read()
-    
-    # 计算文件行数
-    line_count = len(source_code.splitlines())
-    
-    tree = parser.parse(source_code)
-    root_node = tree.root_node
-    
-    package_name = get_package_name(root_node)
-    imports = get_imports(root_node)
-    
-    classes = []
-    
-    # 提取所有类声明
-    for node in root_node.children:
-        if node.type == "class_declaration":
-            class_info = get_class_info(node, package_name, imports, file_path)
-            classes.append(class_info)
+def process_java_file(file_path, parser, stream=None, error_report=None):
+    """处理单个Java文件
+    
+    stream为None时按文件大小自动选择：小文件以mmap方式读取并直接解析映射缓冲区，
+    超过STREAM_THRESHOLD_BYTES的文件通过read回调从文件句柄流式解析。
+    两种方式下节点文本都按字节偏移读取，进程内只保留一份源码。
+    error_report为ParseErrorReport时，同时记录这棵树中的ERROR/MISSING节点。
+    """
+    if stream is None:
+        stream = os.path.getsize(file_path) >= STREAM_THRESHOLD_BYTES
+    
+    open_source = open_java_stream if stream else open_java_source
+    
+    # 节点文本依赖打开的映射/文件句柄，提取需在with块内完成
+    with open_source(file_path) as source_code:
+        # 计算文件行数：只需行数，按块统计换行符，不做注释扫描（注释区间只有压缩器需要）
+        line_count = count_lines(source_code)
+        
+        tree = parser.parse(to_parser_input(source_code))
+        root_node = tree.root_node
+        
+        if error_report is not None:
+            error_report.add_file(file_path, collect_parse_errors(root_node, source_code))
+        
+        package_name = get_package_name(root_node, source_code)
+        imports = get_imports(root_node, source_code)
+        
+        classes = []
+        
+        # 提取所有类声明
+        for node in root_node.children:
+            if node.type == "class_declaration":
+                class_info = get_class_info(node, package_name, imports, file_path, source_code)
+                classes.append(class_info)
     
     return classes, line_count
 
-def process_directory(directory_path, parser):
-    """递归处理目录中的所有Java文件"""
+def process_directory(directory_path, parser, sinks=(), file_filter=None, error_report=None, collect=True):
+    """递归处理目录中的所有Java文件
+    
+    sinks为输出后端（StructureDatabase、StructureExporter），每处理完一个文件就调用其add_file，
+    由各后端自行按批次写出。file_filter为JavaFileFilter，解析前跳过构建目录、生成代码等文件，
+    未指定时使用默认规则。error_report为ParseErrorReport时记录语法错误和处理失败的文件。
+    collect为False时不在内存中保留提取结果（由sinks接收，如ExternalSorter），返回的类列表为空。
+    """
     all_classes = []
     total_lines = 0
     total_files = 0
-    
-    for root, _, files in os.walk(directory_path):
-        for file in files:
-            if file.endswith('.java'):
-                file_path = os.path.join(root, file)
-                try:
-                    classes, line_count = process_java_file(file_path, parser)
-                    all_classes.extend(classes)
-                    total_lines += line_count
-                    total_files += 1
-                    if total_files % 100 == 0:
-                        print(f"已处理 {total_files} 个文件, {total_lines} 行代码...")
-                except Exception as e:
-                    print(f"处理文件 {file_path} 时出错: {e}")
+    if file_filter is None:
+        file_filter = JavaFileFilter()
+    
+    # 目录和文件按名称排序遍历，输出顺序与文件系统无关，不同机器上的结果一致
+    for file_path in file_filter.iter_files(directory_path):
+        try:
+            classes, line_count = process_java_file(file_path, parser, error_report=error_report)
+            for sink in sinks:
+                sink.add_file(file_path, classes, line_count)
+            if collect:
+                all_classes.extend(classes)
+            total_lines += line_count
+            total_files += 1
+            if total_files % 100 == 0:
+                print(f"已处理 {total_files} 个文件, {total_lines} 行代码...")
+        except Exception as e:
+            print(f"处理文件 {file_path} 时出错: {e}")
+            if error_report is not None:
+                error_report.add_failure(file_path, e)
     
     return all_classes, total_lines, total_files
 
+def update_changed_files(java_path, since, db_path, parser, file_filter=None, error_report=None):
+    """增量更新结构数据库：只重新处理自since以来变化的文件，以及引用了变化类型的文件（import或同包引用）
+    
+    数据库需来自之前对同一目录的全量扫描（--db）。变化和删除的文件先从数据库中移除，
+    重新处理后的结果追加写入，其余文件的记录保持不变。
+    
+    Returns:
+        统计信息：changed/deleted/dependents为文件列表，packages为受影响的包名集合
+    """
+    changed, deleted = changed_java_files(java_path, since)
+    if file_filter is None:
+        file_filter = JavaFileFilter()
+    changed = list(file_filter.iter_paths(java_path, changed))
+    
+    db = StructureDatabase(db_path, overwrite=False)
+    try:
+        old_classes = db.classes_in_files(changed + deleted)
+        
+        results = {}
+        for file_path in changed:
+            try:
+                results[file_path] = process_java_file(file_path, parser, error_report=error_report)
+            except Exception as e:
+                print(f"处理文件 {file_path} 时出错: {e}")
+                if error_report is not None:
+                    error_report.add_failure(file_path, e)
+        
+        # 变化的类型包括修改前（可能已被删除或改名）和修改后的类
+        changed_types = {full_path for full_path, _ in old_classes}
+        changed_types.update(class_info.full_path for classes, _ in results.values() for class_info in classes)
+        
+        excluded = set(changed) | set(deleted)
+        candidates = [file_path for file_path in db.file_paths() if file_path not in excluded]
+        dependents = find_dependents(candidates, changed_types) if changed_types else []
+        for file_path in dependents:
+            try:
+                results[file_path] = process_java_file(file_path, parser, error_report=error_report)
+            except Exception as e:
+                print(f"处理文件 {file_path} 时出错: {e}")
+                if error_report is not None:
+                    error_report.add_failure(file_path, e)
+        
+        db.remove_files(changed + dependents + deleted)
+        packages = {package for _, package in old_classes}
+        for file_path in sorted(results, key=lambda path: walk_order_key(os.path.relpath(path, java_path))):
+            classes, line_count = results[file_path]
+            db.add_file(file_path, classes, line_count)
+            packages.update(class_info.package or '' for class_info in classes)
+    finally:
+        db.close()
+    
+    return {"changed": changed, "deleted": deleted, "dependents": dependents, "packages": packages}
+
+def load_project_classes(db_path, java_path):
+    """从数据库读回全部类，按全量扫描时的遍历顺序排列（增量更新追加的记录排在数据库末尾）"""
+    classes, total_lines, total_files = load_classes(db_path)
+    classes.sort(key=lambda class_info: walk_order_key(os.path.relpath(class_info.file_path, java_path)))
+    return classes, total_lines, total_files
+
+def export_classes(classes, export_dir, export_format=None):
+    """将已提取的类导出为列式表格"""
+    with StructureExporter(export_dir, export_format) as exporter:
+        for class_info in classes:
+            exporter.add_file(class_info.file_path, [class_info])
+
+def remove_stale_markdown_files(output_dir, file_count):
+    """删除上次生成的、编号超过本次文件数的Markdown文件"""
+    file_index = file_count + 1
+    while os.path.exists(os.path.join(output_dir, f"java_structure_{file_index}.md")):
+        os.remove(os.path.join(output_dir, f"java_structure_{file_index}.md"))
+        file_index += 1
+
+def stream_sorted_classes(sorter, sinks=()):
+    """按全限定名顺序逐个产出ExternalSorter中的类，同时写入各输出后端"""
+    for file_path, line_count in sorter.empty_files:
+        for sink in sinks:
+            sink.add_file(file_path, [], line_count)
+    for class_info, line_count in sorter.sorted():
+        for sink in sinks:
+            sink.add_file(class_info.file_path, [class_info], line_count)
+        yield class_info
+
 def generate_markdown_header():
     """生成Markdown文件的头部内容"""
     return "# Java项目结构分析\n\n" + \
            "| 类 | 方法 | 变量名 | 变量类型 | 变量位置 | 源文件位置 |\n" + \
            "|---|------|-------|--------|--------|----------|\n"
 
+# 每个Markdown文件的大小上限
+MAX_MARKDOWN_FILE_SIZE = 2 * 1024 * 1024  # 2MB
+
+# 按包分片输出的子目录、索引文件名，以及无包名的类使用的分片名
+PACKAGE_SHARD_DIR = "packages"
+PACKAGE_INDEX_NAME = "index.json"
+DEFAULT_PACKAGE_SHARD = "_default"
+
+def render_class_markdown(class_info):
+    """生成单个类的Markdown表格行"""
+    class_name = class_info.full_path
+    class_file = class_info.file_path
+    class_line = class_info.line
+    
+    # 为当前类生成内容
+    class_content = ""
+    
+    # 如果类没有方法和字段，添加一个空行
+    if not class_info.methods and not class_info.fields:
+        class_content += f"| {class_name} | | | | | {class_file}:{class_line} |\n"
+    else:
+        # 处理每个方法
+        for i, method in enumerate(class_info.methods):
+            method_name = method.name
+            method_line = method.line
+            
+            # 第一个方法显示类名，其余方法不显示
+            if i == 0:
+                class_content += f"| {class_name} | {method_name} | | | | {class_file}:{class_line} / 方法:{method_line} |\n"
+            else:
+                class_content += f"| | {method_name} | | | | {class_file}:方法:{method_line} |\n"
+            
+            # 处理方法内部的局部变量
+            for var in method.local_variables:
+                var_name = var.name
+                var_type = var.type_full_path
+                var_line = var.line
+                class_content += f"| | | {var_name} | {var_type} | 局部变量 | 行:{var_line} |\n"
+        
+        # 处理每个字段
+        for i, field in enumerate(class_info.fields):
+            field_name = field.name
+            field_type = field.type_full_path
+            field_line = field.line
+            
+            # 如果没有方法但有字段，第一个字段显示类名
+            if not class_info.methods and i == 0:
+                class_content += f"| {class_name} | | {field_name} | {field_type} | 类字段 | {class_file}:{class_line} / 字段:{field_line} |\n"
+            else:
+                class_content += f"| | | {field_name} | {field_type} | 类字段 | 行:{field_line} |\n"
+    
+    return class_content
+
 def generate_markdown_files(classes, output_dir):
     """生成多个Markdown文件，每个不超过2MB"""
     # 创建输出目录
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    # 定义每个文件的最大大小为2MB
-    MAX_FILE_SIZE = 2 * 1024 * 1024  # 2MB
-    
     file_index = 1
     current_file_path = os.path.join(output_dir, f"java_structure_{file_index}.md")
     
@@ -339,51 +490,12 @@ def generate_markdown_files(classes, output_dir):
     
     # 处理所有类
     for class_info in classes:
-        class_name = class_info['full_path']
-        class_file = class_info['file_path']
-        class_line = class_info['line']
-        
-        # 为当前类生成内容
-        class_content = ""
-        
-        # 如果类没有方法和字段，添加一个空行
-        if not class_info['methods'] and not class_info['fields']:
-            class_content += f"| {class_name} | | | | | {class_file}:{class_line} |\n"
-        else:
-            # 处理每个方法
-            for i, method in enumerate(class_info['methods']):
-                method_name = method['name']
-                method_line = method['line']
-                
-                # 第一个方法显示类名，其余方法不显示
-                if i == 0:
-                    class_content += f"| {class_name} | {method_name} | | | | {class_file}:{class_line} / 方法:{method_line} |\n"
-                else:
-                    class_content += f"| | {method_name} | | | | {class_file}:方法:{method_line} |\n"
-                
-                # 处理方法内部的局部变量
-                for var in method['local_variables']:
-                    var_name = var['name']
-                    var_type = var['type_full_path']
-                    var_line = var.get('line', '')
-                    class_content += f"| | | {var_name} | {var_type} | 局部变量 | 行:{var_line} |\n"
-            
-            # 处理每个字段
-            for i, field in enumerate(class_info['fields']):
-                field_name = field['name']
-                field_type = field['type_full_path']
-                field_line = field.get('line', '')
-                
-                # 如果没有方法但有字段，第一个字段显示类名
-                if not class_info['methods'] and i == 0:
-                    class_content += f"| {class_name} | | {field_name} | {field_type} | 类字段 | {class_file}:{class_line} / 字段:{field_line} |\n"
-                else:
-                    class_content += f"| | | {field_name} | {field_type} | 类字段 | 行:{field_line} |\n"
+        class_content = render_class_markdown(class_info)
         
         # 检查添加这个类的内容是否会使当前文件超过大小限制
         content_size = len(class_content.encode('utf-8'))
         
-        if current_file_size + content_size > MAX_FILE_SIZE:
+        if current_file_size + content_size > MAX_MARKDOWN_FILE_SIZE:
             # 如果会超过，创建新文件
             file_index += 1
             current_file_path = os.path.join(output_dir, f"java_structure_{file_index}.md")
@@ -401,35 +513,325 @@ def generate_markdown_files(classes, output_dir):
     
     return file_index  # 返回生成的文件数量
 
+def package_shard_name(package, buckets=None):
+    """包所在的分片名：每个包一个分片，或按包名的CRC32散列到固定数量的桶"""
+    if buckets:
+        return f"bucket_{zlib.crc32(package.encode('utf-8')) % buckets:04d}"
+    return package or DEFAULT_PACKAGE_SHARD
+
+def write_markdown_shard(shard_dir, shard_name, classes):
+    """
+    写出一个分片，超过MAX_MARKDOWN_FILE_SIZE时拆分为 分片名.md、分片名.2.md ...
+    
+    内容先在内存中拼好再一次写入，返回写出的文件名列表；没有类时不写文件。
+    """
+    header = generate_markdown_header()
+    header_size = len(header.encode('utf-8'))
+    parts = []
+    current = [header]
+    current_size = header_size
+    for class_info in classes:
+        class_content = render_class_markdown(class_info)
+        content_size = len(class_content.encode('utf-8'))
+        if current_size + content_size > MAX_MARKDOWN_FILE_SIZE and len(current) > 1:
+            parts.append(current)
+            current = [header]
+            current_size = header_size
+        current.append(class_content)
+        current_size += content_size
+    if len(current) > 1:
+        parts.append(current)
+    
+    file_names = []
+    for part_index, part in enumerate(parts, 1):
+        file_name = f"{shard_name}.md" if part_index == 1 else f"{shard_name}.{part_index}.md"
+        with open(os.path.join(shard_dir, file_name), 'w', encoding='utf-8') as f:
+            f.write(''.join(part))
+        file_names.append(file_name)
+    return file_names
+
+def load_package_index(output_dir):
+    """读取按包分片输出的索引，不存在时返回None"""
+    index_path = os.path.join(output_dir, PACKAGE_SHARD_DIR, PACKAGE_INDEX_NAME)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def generate_package_markdown(classes, output_dir, buckets=None, workers=4, packages=None):
+    """按Java包分片生成Markdown，多个分片由线程池并行写出
+    
+    分片写入 输出目录/packages/，索引 packages/index.json 记录每个包所在的分片文件，
+    查找某个包时只需打开对应的文件。
+    packages不为None时为增量更新：只重写包含这些包的分片，其余分片和索引项保持不变；
+    classes仍需包含这些分片中的全部类（如从结构数据库读回），已不存在的包会从索引中移除。
+    
+    Returns:
+        本次写出的分片数
+    """
+    shard_dir = os.path.join(output_dir, PACKAGE_SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    
+    # 分片名 -> 包名 -> 类列表
+    shards = defaultdict(lambda: defaultdict(list))
+    for class_info in classes:
+        package = class_info.package or ''
+        shards[package_shard_name(package, buckets)][package].append(class_info)
+    
+    index = load_package_index(output_dir) if packages is not None else None
+    if index is None or index.get("buckets") != buckets:
+        # 全量生成，或分片方式改变时无法增量更新
+        index = {"buckets": buckets, "packages": {}, "shards": {}}
+        targets = set(shards)
+        for file_name in os.listdir(shard_dir):
+            if file_name.endswith('.md'):
+                os.remove(os.path.join(shard_dir, file_name))
+    else:
+        targets = {package_shard_name(package, buckets) for package in packages}
+    
+    def write_shard(shard_name):
+        shard_packages = shards.get(shard_name, {})
+        shard_classes = [class_info for package in sorted(shard_packages)
+                         for class_info in shard_packages[package]]
+        return shard_name, sorted(shard_packages), write_markdown_shard(shard_dir, shard_name, shard_classes)
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(write_shard, sorted(targets)))
+    
+    for shard_name, shard_packages, file_names in results:
+        # 删除分片旧的、本次不再需要的拆分文件
+        for old_name in index["shards"].pop(shard_name, {}).get("files", []):
+            if old_name not in file_names and os.path.exists(os.path.join(shard_dir, old_name)):
+                os.remove(os.path.join(shard_dir, old_name))
+        for package, info in list(index["packages"].items()):
+            if info == shard_name:
+                del index["packages"][package]
+        if file_names:
+            index["shards"][shard_name] = {"packages": shard_packages, "files": file_names}
+            for package in shard_packages:
+                index["packages"][package] = shard_name
+    
+    index["packages"] = dict(sorted(index["packages"].items()))
+    index["shards"] = dict(sorted(index["shards"].items()))
+    with open(os.path.join(shard_dir, PACKAGE_INDEX_NAME), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    
+    return len(results)
+
+def generate_sorted_package_markdown(classes, output_dir, workers=4):
+    """按包分片生成Markdown，classes为按包名有序的流（如ExternalSorter的输出）
+    
+    同一个包的类连续出现，读完一个包即提交写出，内存中只保留尚未写完的少量分片；
+    输出目录结构和索引格式与generate_package_markdown相同，不支持散列分桶和增量更新。
+    
+    Returns:
+        写出的分片数
+    """
+    shard_dir = os.path.join(output_dir, PACKAGE_SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    for file_name in os.listdir(shard_dir):
+        if file_name.endswith('.md'):
+            os.remove(os.path.join(shard_dir, file_name))
+    
+    index = {"buckets": None, "packages": {}, "shards": {}}
+    pending = deque()
+    
+    def collect(item):
+        shard_name, package, future = item
+        file_names = future.result()
+        if file_names:
+            index["shards"][shard_name] = {"packages": [package], "files": file_names}
+            index["packages"][package] = shard_name
+    
+    shard_count = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for package, package_classes in groupby(classes, key=lambda class_info: class_info.package or ''):
+            shard_name = package_shard_name(package)
+            future = pool.submit(write_markdown_shard, shard_dir, shard_name, list(package_classes))
+            pending.append((shard_name, package, future))
+            shard_count += 1
+            # 限制尚未写完的分片数，内存占用不随包的数量增长
+            while len(pending) > workers * 2:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+    
+    index["packages"] = dict(sorted(index["packages"].items()))
+    index["shards"] = dict(sorted(index["shards"].items()))
+    with open(os.path.join(shard_dir, PACKAGE_INDEX_NAME), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    
+    return shard_count
+
 def main():
-    if len(sys.argv) < 2:
-        print("用法: python java-analysis.py <Java项目路径> [输出目录]")
-        sys.exit(1)
-    
-    java_path = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else "java_structure_docs"
+    import argparse
+    
+    arg_parser = argparse.ArgumentParser(description='Java项目结构分析')
+    arg_parser.add_argument('java_path', nargs='?', help='Java项目路径（目录或单个.java文件）')
+    arg_parser.add_argument('output_dir', nargs='?', default='java_structure_docs', help='输出目录')
+    arg_parser.add_argument('--db', nargs='?', const='', default=None,
+                            help=f'同时写入SQLite数据库，默认为 输出目录/{DEFAULT_DB_NAME}')
+    arg_parser.add_argument('--export', nargs='?', const='', default=None,
+                            help='同时导出列式表格到该目录，默认为 输出目录/tables')
+    arg_parser.add_argument('--export-format', choices=EXPORT_FORMATS, default=None,
+                            help='导出格式，默认已安装pyarrow时为parquet，否则为csv')
+    arg_parser.add_argument('--no-markdown', action='store_true', help='不生成Markdown（需配合--db或--export）')
+    arg_parser.add_argument('--layout', choices=['numbered', 'package'], default='numbered',
+                            help=f'Markdown分片方式：按顺序编号，或按Java包写入 输出目录/{PACKAGE_SHARD_DIR}/')
+    arg_parser.add_argument('--buckets', type=int, default=None,
+                            help='按包分片时散列到固定数量的桶，默认每个包一个文件')
+    arg_parser.add_argument('--workers', type=int, default=4, help='并行写出分片的线程数')
+    arg_parser.add_argument('--from-db', default=None,
+                            help='从已有数据库重新生成Markdown，不扫描源码（用法: --from-db 数据库 [输出目录]）')
+    arg_parser.add_argument('--error-report', nargs='?', const='', default=None,
+                            help=f'记录语法错误（ERROR/MISSING节点）的JSON报告，默认为 输出目录/{DEFAULT_ERROR_REPORT_NAME}')
+    arg_parser.add_argument('--since', default=None,
+                            help='只重新分析自该git版本以来变化的文件及引用了变化类型的文件，'
+                                 '合并到已有的输出中（需要之前使用--db生成的结构数据库）')
+    arg_parser.add_argument('--sort-by-fqn', action='store_true',
+                            help='按类全限定名排序输出，数据超过--sort-memory时在磁盘上外部归并排序')
+    arg_parser.add_argument('--sort-memory', type=float, default=DEFAULT_SORT_MEMORY_LIMIT / 1024 / 1024,
+                            help='排序缓冲区的内存上限（MB）')
+    arg_parser.add_argument('--sort-temp-dir', default=None, help='排序临时文件目录，默认为系统临时目录')
+    add_filter_arguments(arg_parser)
+    
+    args = arg_parser.parse_args()
+    if not args.java_path and not args.from_db:
+        arg_parser.error("需要指定Java项目路径，或使用--from-db从数据库生成")
+    if args.since and (args.from_db or not os.path.isdir(args.java_path)):
+        arg_parser.error("--since需要指定Java项目目录，不能与--from-db同时使用")
+    if args.sort_by_fqn and (args.from_db or args.since or args.buckets):
+        arg_parser.error("--sort-by-fqn只用于全量扫描，不能与--from-db、--since或--buckets同时使用")
+    
+    java_path = args.java_path
+    output_dir = args.output_dir
+    if args.from_db and java_path and output_dir == arg_parser.get_default('output_dir'):
+        # --from-db时不扫描源码，唯一的位置参数即为输出目录
+        output_dir = java_path
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
     
     # 记录开始时间
     start_time = time.time()
-    print(f"开始分析Java项目: {java_path}")
     
-    parser = setup_tree_sitter()
-    
-    total_lines = 0
-    total_files = 0
-    
-    if os.path.isfile(java_path) and java_path.endswith('.java'):
-        classes, line_count = process_java_file(java_path, parser)
-        total_lines = line_count
-        total_files = 1
-    elif os.path.isdir(java_path):
-        classes, total_lines, total_files = process_directory(java_path, parser)
+    sinks = []
+    db_path = None
+    export_dir = None
+    file_filter = None
+    error_report = None
+    error_report_path = None
+    incremental = None
+    file_count = 0
+    markdown_written = False
+    if args.error_report is not None and not args.from_db:
+        error_report_path = args.error_report or os.path.join(output_dir, DEFAULT_ERROR_REPORT_NAME)
+        error_report = ParseErrorReport()
+    if args.from_db:
+        # 从数据库读回提取结果，只重新生成Markdown
+        if not os.path.exists(args.from_db):
+            print(f"错误: 数据库 {args.from_db} 不存在")
+            sys.exit(1)
+        print(f"从数据库重新生成Markdown: {args.from_db}")
+        java_path = args.from_db
+        classes, total_lines, total_files = load_classes(args.from_db)
+        if args.export is not None:
+            export_dir = args.export or os.path.join(output_dir, "tables")
+            export_classes(classes, export_dir, args.export_format)
+    elif args.since:
+        # 增量模式：以之前全量扫描生成的数据库为基础，只重新处理变化的文件
+        db_path = args.db or os.path.join(output_dir, DEFAULT_DB_NAME)
+        if not os.path.exists(db_path):
+            print(f"错误: 结构数据库 {db_path} 不存在，请先使用--db进行一次全量分析")
+            sys.exit(1)
+        print(f"增量分析Java项目: {java_path} (自 {args.since} 以来的变化)")
+        
+        parser = setup_tree_sitter()
+        file_filter = filter_from_args(args)
+        try:
+            incremental = update_changed_files(java_path, args.since, db_path, parser, file_filter, error_report)
+        except GitError as e:
+            print(f"错误: 无法获取git变更: {e}")
+            sys.exit(1)
+        print(f"变化 {len(incremental['changed'])} 个文件, 删除 {len(incremental['deleted'])} 个, "
+              f"引用变化类型的文件 {len(incremental['dependents'])} 个")
+        
+        classes, total_lines, total_files = load_project_classes(db_path, java_path)
+        if args.export is not None:
+            export_dir = args.export or os.path.join(output_dir, "tables")
+            export_classes(classes, export_dir, args.export_format)
+        if error_report is not None:
+            error_report.write(error_report_path)
     else:
-        print(f"错误: 文件路径 {java_path} 不是有效的Java文件或目录")
-        sys.exit(1)
-    
-    # 生成Markdown文件
-    file_count = generate_markdown_files(classes, output_dir)
+        print(f"开始分析Java项目: {java_path}")
+        
+        parser = setup_tree_sitter()
+        
+        if args.db is not None:
+            db_path = args.db or os.path.join(output_dir, DEFAULT_DB_NAME)
+            sinks.append(StructureDatabase(db_path))
+        if args.export is not None:
+            export_dir = args.export or os.path.join(output_dir, "tables")
+            sinks.append(StructureExporter(export_dir, args.export_format))
+        
+        total_lines = 0
+        total_files = 0
+        
+        # 排序模式下扫描结果先进入外部排序器，排好序后再依次写入各输出后端和Markdown
+        sorter = None
+        scan_sinks = sinks
+        if args.sort_by_fqn:
+            sorter = ExternalSorter(int(args.sort_memory * 1024 * 1024), args.sort_temp_dir)
+            scan_sinks = [sorter]
+        
+        try:
+            if os.path.isfile(java_path) and java_path.endswith('.java'):
+                classes, line_count = process_java_file(java_path, parser, error_report=error_report)
+                for sink in scan_sinks:
+                    sink.add_file(java_path, classes, line_count)
+                total_lines = line_count
+                total_files = 1
+            elif os.path.isdir(java_path):
+                # 直接指定的单个文件不经过滤，只过滤目录扫描
+                file_filter = filter_from_args(args)
+                classes, total_lines, total_files = process_directory(java_path, parser, scan_sinks, file_filter,
+                                                                      error_report, collect=sorter is None)
+            else:
+                print(f"错误: 文件路径 {java_path} 不是有效的Java文件或目录")
+                sys.exit(1)
+            
+            if sorter is not None:
+                print(f"按全限定名排序 {sorter.record_count} 个类...")
+                sorted_classes = stream_sorted_classes(sorter, sinks)
+                if args.no_markdown:
+                    for _ in sorted_classes:
+                        pass
+                elif args.layout == 'package':
+                    file_count = generate_sorted_package_markdown(sorted_classes, output_dir, args.workers)
+                else:
+                    file_count = generate_markdown_files(sorted_classes, output_dir)
+                markdown_written = True
+                if sorter.run_count:
+                    print(f"外部排序使用了 {sorter.run_count} 个有序段")
+        finally:
+            for sink in sinks:
+                sink.close()
+            if sorter is not None:
+                sorter.close()
+        
+        if error_report is not None:
+            error_report.write(error_report_path)
+    
+    # 生成Markdown文件（排序模式下已在排序输出时写出）
+    if args.no_markdown or markdown_written:
+        pass
+    elif args.layout == 'package':
+        # 增量模式只重写受影响的包所在的分片
+        packages = incremental["packages"] if incremental else None
+        file_count = generate_package_markdown(classes, output_dir, args.buckets, args.workers, packages)
+    else:
+        file_count = generate_markdown_files(classes, output_dir)
+        if incremental:
+            remove_stale_markdown_files(output_dir, file_count)
     
     # 计算总耗时
     end_time = time.time()
@@ -437,9 +839,29 @@ def main():
     
     # 打印统计信息
     print(f"分析完成! 结果已保存到 {output_dir} 目录中的 {file_count} 个文件")
+    if db_path:
+        print(f"结构数据库已保存到: {db_path}")
+    if export_dir:
+        print(f"表格已导出到: {export_dir}")
+    if error_report_path:
+        print(f"语法错误报告已保存到: {error_report_path}")
     print(f"总计扫描了 {total_files} 个Java文件, {total_lines} 行代码")
+    detail_lines = []
+    if incremental:
+        detail_lines.append(f"增量分析: 自 {args.since} 以来变化 {len(incremental['changed'])} 个文件, "
+                            f"删除 {len(incremental['deleted'])} 个, "
+                            f"重新处理引用变化类型的文件 {len(incremental['dependents'])} 个")
+    if file_filter:
+        detail_lines += file_filter.summary_lines()
+    if error_report is not None:
+        detail_lines += error_report.summary_lines()
+    for line in detail_lines:
+        print(line)
     print(f"总耗时: {execution_time:.2f} 秒")
     
+    # 输出文件的内容哈希清单，summary.txt含运行时间，不列入清单
+    manifest = write_directory_manifest(output_dir, exclude=("summary.txt",))
+    
     # 将统计信息也写入到summary.txt文件中
     summary_path = os.path.join(output_dir, "summary.txt")
     with open(summary_path, 'w', encoding='utf-8') as f:
@@ -448,8 +870,17 @@ def main():
         f.write(f"分析的项目路径: {os.path.abspath(java_path)}\n")
         f.write(f"总计扫描文件数: {total_files} 个Java文件\n")
         f.write(f"总计代码行数: {total_lines} 行\n")
+        for line in detail_lines:
+            f.write(line + "\n")
         f.write(f"总计耗时: {execution_time:.2f} 秒\n")
         f.write(f"生成的Markdown文件数: {file_count} 个\n")
+        if db_path:
+            f.write(f"结构数据库: {os.path.abspath(db_path)}\n")
+        if export_dir:
+            f.write(f"导出表格目录: {os.path.abspath(export_dir)}\n")
+        if error_report_path:
+            f.write(f"语法错误报告: {os.path.abspath(error_report_path)}\n")
+        f.write(f"内容哈希清单: {MANIFEST_NAME} ({len(manifest)} 个文件)\n")
         f.write(f"\n分析时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
 
 if __name__ == "__main__":
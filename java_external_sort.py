@@ -0,0 +1,177 @@
+"""按类全限定名排序提取结果的外部归并排序
+
+超大项目的all_classes无法整体放入内存排序。ExternalSorter与StructureDatabase一样按文件接收提取结果，
+缓存的记录估算超过内存上限时按排序键排好序写入临时文件（一个有序段），
+最后对所有有序段做多路归并，按顺序逐个产出记录，下游的Markdown/数据库写入器边读边写，
+任一时刻内存中只有一个缓冲区和每个有序段的一条记录。
+
+排序键为 (包名, 类名)：与按全限定名排序一致，并保证同一个包的类连续出现，
+按包分片的输出可以逐包写出。键相同的记录保持扫描顺序。
+"""
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from java_records import ClassInfo
+
+# 默认内存上限（字节），只计缓冲区中记录的估算大小
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024
+
+# 单次归并同时打开的有序段数上限，超过时先分组归并为更长的有序段
+MAX_MERGE_FAN_IN = 64
+
+# 记录大小估算：各对象的固定开销（含__slots__实例、列表和intern前的字符串头）
+_CLASS_OVERHEAD = 400
+_METHOD_OVERHEAD = 250
+_VARIABLE_OVERHEAD = 200
+
+_RUN_BUFFER_SIZE = 1024 * 1024
+
+
+def sort_key(class_info: ClassInfo) -> Tuple[str, str]:
+    return class_info.package or '', class_info.name
+
+
+def _record_key(record: Tuple[int, ClassInfo]) -> Tuple[str, str]:
+    return sort_key(record[1])
+
+
+def estimate_size(class_info: ClassInfo) -> int:
+    """估算一个类的记录在内存中的字节数，只用于决定何时写出有序段"""
+    size = _CLASS_OVERHEAD + len(class_info.name) + len(class_info.file_path or '')
+    for method in class_info.methods:
+        size += _METHOD_OVERHEAD + len(method.name) + _VARIABLE_OVERHEAD * len(method.local_variables)
+    size += _VARIABLE_OVERHEAD * len(class_info.fields)
+    return size
+
+
+def _write_run(path: str, records: Iterable[Tuple[int, ClassInfo]]) -> None:
+    # 每条记录单独序列化，读取时逐条反序列化，不必整段读入内存
+    with open(path, 'wb', buffering=_RUN_BUFFER_SIZE) as f:
+        for record in records:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_run(path: str) -> Iterator[Tuple[int, ClassInfo]]:
+    with open(path, 'rb', buffering=_RUN_BUFFER_SIZE) as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class ExternalSorter:
+    """
+    有内存上限的类记录排序器
+
+    用法:
+        with ExternalSorter(memory_limit) as sorter:
+            for ...:
+                sorter.add_file(file_path, classes, line_count)
+            for class_info, line_count in sorter.sorted():
+                ...
+
+    每条记录附带所在文件的行数，供按文件统计的数据库写入器使用；没有类的文件记录在empty_files中。
+    """
+
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT, temp_dir: Optional[str] = None,
+                 max_fan_in: int = MAX_MERGE_FAN_IN):
+        """
+        Args:
+            memory_limit: 缓冲区的内存上限（字节），超过时写出一个有序段
+            temp_dir: 临时文件所在目录，默认为系统临时目录
+            max_fan_in: 单次归并的有序段数上限
+        """
+        self.memory_limit = memory_limit
+        self.max_fan_in = max(2, max_fan_in)
+        self.empty_files = []
+        self.record_count = 0
+        self._temp_dir = tempfile.mkdtemp(prefix='java_sort_', dir=temp_dir)
+        self._buffer = []
+        self._buffer_size = 0
+        self._runs = []
+        self._next_run = 0
+
+    @property
+    def run_count(self) -> int:
+        return len(self._runs)
+
+    def _new_run_path(self) -> str:
+        path = os.path.join(self._temp_dir, f"run_{self._next_run:06d}.pickle")
+        self._next_run += 1
+        return path
+
+    def add_file(self, file_path: str, classes: Iterable[ClassInfo], line_count: int = 0) -> None:
+        """追加一个源文件的提取结果"""
+        empty = True
+        for class_info in classes:
+            empty = False
+            self._buffer.append((line_count, class_info))
+            self._buffer_size += estimate_size(class_info)
+            self.record_count += 1
+        if empty:
+            self.empty_files.append((file_path, line_count))
+        if self._buffer_size >= self.memory_limit:
+            self._spill()
+
+    def _spill(self) -> None:
+        """将缓冲区排序后写出为一个有序段"""
+        if not self._buffer:
+            return
+        # list.sort是稳定排序，键相同的记录保持扫描顺序
+        self._buffer.sort(key=_record_key)
+        path = self._new_run_path()
+        _write_run(path, self._buffer)
+        self._runs.append(path)
+        self._buffer = []
+        self._buffer_size = 0
+
+    def _merge_runs(self, paths: List[str]) -> str:
+        path = self._new_run_path()
+        _write_run(path, heapq.merge(*(_read_run(run_path) for run_path in paths), key=_record_key))
+        for run_path in paths:
+            os.remove(run_path)
+        return path
+
+    def sorted(self) -> Iterator[Tuple[ClassInfo, int]]:
+        """
+        按 (包名, 类名) 顺序逐个产出 (类, 所在文件行数)
+
+        只写出过一个缓冲区以内的数据时直接在内存中排序；否则先写出剩余记录，
+        有序段过多时按顺序分组预先归并（heapq.merge在键相同时按输入顺序输出，分组归并不改变相对顺序），
+        最后一遍多路归并。
+        """
+        if not self._runs:
+            self._buffer.sort(key=_record_key)
+            records, self._buffer = self._buffer, []
+            self._buffer_size = 0
+            for line_count, class_info in records:
+                yield class_info, line_count
+            return
+
+        self._spill()
+        while len(self._runs) > self.max_fan_in:
+            runs = self._runs
+            self._runs = []
+            for start in range(0, len(runs), self.max_fan_in):
+                group = runs[start:start + self.max_fan_in]
+                self._runs.append(group[0] if len(group) == 1 else self._merge_runs(group))
+
+        for line_count, class_info in heapq.merge(*(_read_run(path) for path in self._runs), key=_record_key):
+            yield class_info, line_count
+
+    def close(self) -> None:
+        """删除临时文件"""
+        self._buffer = []
+        self._runs = []
+        shutil.rmtree(self._temp_dir, ignore_errors=True)
+
+    def __enter__(self) -> 'ExternalSorter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
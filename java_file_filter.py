@@ -0,0 +1,355 @@
+"""扫描Java源码前的快速过滤
+
+target/、build/、generated-sources/ 等目录下的编译产物和生成代码，以及体积很大的第三方源码，
+往往占据解析的大部分时间却没有分析价值。JavaFileFilter在解析之前按以下顺序判断，开销都远小于解析：
+
+1. 排除规则命中的目录整棵跳过，不再遍历（默认排除常见的构建输出目录，target/、build/
+   只在旁边有构建文件且不在src/*/java源码根之下时才视为构建输出）；
+2. 项目中.gitignore忽略的目录和文件；
+3. include/exclude通配符（gitignore语法：不含/的模式匹配任意层级的名称，**匹配多级目录）；
+4. 文件大小上限（只取stat，不读内容）；
+5. 读取文件开头HEADER_SNIFF_BYTES字节，含@Generated等生成代码标记的跳过。
+
+被跳过的文件按原因计数，跳过的目录逐个列出，写入summary.txt。
+"""
+import os
+import re
+from collections import Counter
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# 默认排除的目录（生成代码、IDE与版本库目录），按名称匹配任意层级
+DEFAULT_EXCLUDES = (
+    'generated-sources/', 'generated-test-sources/',
+    '.gradle/', '.idea/', '.git/', 'node_modules/',
+)
+
+# 默认排除的Maven/Gradle/Ant构建输出目录。这两个名字也常用作包名（如com/acme/build/），
+# 因此只在同级目录中有BUILD_FILES之一、且不位于src/*/java源码根之下时排除
+BUILD_OUTPUT_DIRS = ('target', 'build')
+BUILD_FILES = ('pom.xml', 'build.gradle', 'build.gradle.kts', 'settings.gradle', 'settings.gradle.kts', 'build.xml')
+_SOURCE_ROOT_PATTERN = re.compile(r'(?:^|/)src/[^/]+/java/')
+
+# summary.txt中最多逐个列出的跳过目录数
+MAX_LISTED_DIRS = 50
+
+# 读取文件开头用于识别生成代码的字节数（@Generated一般位于import之后、类声明之前）
+HEADER_SNIFF_BYTES = 16 * 1024
+
+# 标记生成代码的注解：@Generated须作为完整的标识符出现（不匹配JPA的@GeneratedValue），
+# 全限定写法只认javax/jakarta的注解，Hibernate的@org.hibernate.annotations.Generated标注的是生成列而非生成代码
+_GENERATED_ANNOTATION_PACKAGES = rb'(?:javax\.annotation(?:\.processing)?|jakarta\.annotation)'
+_QUALIFIED_GENERATED_PATTERN = re.compile(rb'@' + _GENERATED_ANNOTATION_PACKAGES + rb'\.Generated\b')
+# 简单名@Generated只在导入了上述注解时算作生成标记
+_GENERATED_IMPORT_PATTERN = re.compile(rb'\bimport\s+' + _GENERATED_ANNOTATION_PACKAGES + rb'\.Generated\s*;')
+_SIMPLE_GENERATED_PATTERN = re.compile(rb'@Generated\b')
+
+# 已知代码生成器写在文件头部的说明，只匹配这些完整的说明文字，手写代码注释中的"DO NOT EDIT"不算
+GENERATOR_BANNERS = (
+    b'Generated by the protocol buffer compiler',
+    b'Autogenerated by Thrift',
+    b'Autogenerated by Avro',
+    b'Generated By:JavaCC',
+    b'This file is generated by jOOQ',
+    b'This file was generated by the JavaTM Architecture for XML Binding',
+    b'This file was generated by the Eclipse Implementation of JAXB',
+)
+_ANTLR_BANNER_PATTERN = re.compile(rb'^// Generated from \S+ by ANTLR \d', re.MULTILINE)
+
+# 跳过原因，按判断顺序排列
+SKIP_REASONS = ('excluded', 'gitignore', 'not_included', 'size', 'generated')
+
+SKIP_REASON_LABELS = {
+    'excluded': '排除规则',
+    'gitignore': '.gitignore',
+    'not_included': '不匹配包含规则',
+    'size': '超过大小上限',
+    'generated': '生成代码',
+}
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """将gitignore风格的通配符转换为正则，*和?不匹配/，**匹配任意多级目录"""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                regex.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                regex.append('.*')
+                i += 2
+                continue
+            regex.append('[^/]*')
+        elif c == '?':
+            regex.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                regex.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    return ''.join(regex)
+
+
+class PathRule:
+    """一条gitignore语法的路径规则"""
+
+    __slots__ = ('pattern', 'negated', 'dir_only', 'base', '_regex')
+
+    def __init__(self, pattern: str, base: str = ''):
+        """
+        Args:
+            pattern: 规则文本
+            base: 规则所在目录（相对扫描根目录、以/分隔），.gitignore中的规则相对其所在目录
+        """
+        self.negated = pattern.startswith('!')
+        if self.negated:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        # 含/的模式相对base匹配完整路径，否则匹配任意层级的名称
+        anchored = '/' in pattern
+        pattern = pattern.lstrip('/')
+        self.pattern = pattern
+        self.base = base
+        prefix = '' if anchored else '(?:.*/)?'
+        self._regex = re.compile(prefix + _glob_to_regex(pattern) + r'\Z', re.DOTALL)
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not path.startswith(self.base + '/'):
+                return False
+            path = path[len(self.base) + 1:]
+        return self._regex.match(path) is not None
+
+
+def parse_rules(lines: Sequence[str], base: str = '') -> List[PathRule]:
+    """解析.gitignore内容或命令行给出的模式，忽略空行和注释"""
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n').rstrip('\r')
+        if not line.strip() or line.startswith('#'):
+            continue
+        # 行尾未转义的空格不属于模式
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        rules.append(PathRule(line, base))
+    return rules
+
+
+def match_rules(rules: Sequence[PathRule], path: str, is_dir: bool) -> bool:
+    """按gitignore的语义判断路径是否被规则命中：最后一条匹配的规则决定结果"""
+    matched = False
+    for rule in rules:
+        if rule.negated == matched and rule.matches(path, is_dir):
+            matched = not rule.negated
+    return matched
+
+
+def is_generated_source(file_path: str, sniff_bytes: int = HEADER_SNIFF_BYTES) -> bool:
+    """读取文件开头，判断是否含生成代码标记"""
+    with open(file_path, 'rb') as f:
+        header = f.read(sniff_bytes)
+    return is_generated_header(header)
+
+
+def is_generated_header(header: bytes) -> bool:
+    """判断文件开头的内容是否含生成代码标记（生成代码注解或已知生成器的说明文字）"""
+    if _QUALIFIED_GENERATED_PATTERN.search(header):
+        return True
+    if _SIMPLE_GENERATED_PATTERN.search(header) and _GENERATED_IMPORT_PATTERN.search(header):
+        return True
+    if any(banner in header for banner in GENERATOR_BANNERS):
+        return True
+    return _ANTLR_BANNER_PATTERN.search(header) is not None
+
+
+class JavaFileFilter:
+    """解析前的文件过滤，遍历时同时统计跳过的文件数"""
+
+    def __init__(self,
+                 includes: Sequence[str] = (),
+                 excludes: Sequence[str] = (),
+                 default_excludes: bool = True,
+                 use_gitignore: bool = True,
+                 max_file_size: Optional[int] = None,
+                 skip_generated: bool = True):
+        """
+        Args:
+            includes: 给出时只处理匹配其中之一的.java文件
+            excludes: 额外的排除模式，目录模式命中时整棵子树跳过
+            default_excludes: 是否使用DEFAULT_EXCLUDES
+            use_gitignore: 是否读取扫描目录中的.gitignore
+            max_file_size: 文件大小上限（字节），None表示不限制
+            skip_generated: 是否跳过含生成代码标记的文件
+        """
+        self.include_rules = parse_rules(includes)
+        self.exclude_rules = parse_rules((DEFAULT_EXCLUDES if default_excludes else ()) + tuple(excludes))
+        self.exclude_build_output = default_excludes
+        self.use_gitignore = use_gitignore
+        self.max_file_size = max_file_size
+        self.skip_generated = skip_generated
+        self.skipped = Counter()
+        # 整棵跳过的目录（相对扫描根目录的路径）
+        self.skipped_dirs: List[str] = []
+
+    def is_build_output(self, dir_path: str, relative_path: str) -> bool:
+        """目录是否为默认排除的构建输出目录（见BUILD_OUTPUT_DIRS）"""
+        if not self.exclude_build_output or os.path.basename(dir_path) not in BUILD_OUTPUT_DIRS:
+            return False
+        if _SOURCE_ROOT_PATTERN.search(relative_path):
+            return False
+        parent = os.path.dirname(dir_path)
+        return any(os.path.isfile(os.path.join(parent, name)) for name in BUILD_FILES)
+
+    def is_excluded_dir(self, dir_path: str, relative_path: str) -> bool:
+        return match_rules(self.exclude_rules, relative_path, True) or self.is_build_output(dir_path, relative_path)
+
+    def _load_gitignore(self, dir_path: str, relative_dir: str) -> List[PathRule]:
+        gitignore_path = os.path.join(dir_path, '.gitignore')
+        if not self.use_gitignore or not os.path.isfile(gitignore_path):
+            return []
+        with open(gitignore_path, 'r', encoding='utf-8', errors='replace') as f:
+            return parse_rules(f.readlines(), relative_dir)
+
+    def check_file(self, file_path: str, relative_path: str,
+                   gitignore_rules: Sequence[PathRule] = ()) -> Optional[str]:
+        """返回文件被跳过的原因，需要解析时返回None"""
+        if match_rules(self.exclude_rules, relative_path, False):
+            return 'excluded'
+        if gitignore_rules and match_rules(gitignore_rules, relative_path, False):
+            return 'gitignore'
+        if self.include_rules and not match_rules(self.include_rules, relative_path, False):
+            return 'not_included'
+        if self.max_file_size is not None and os.path.getsize(file_path) > self.max_file_size:
+            return 'size'
+        if self.skip_generated and is_generated_source(file_path):
+            return 'generated'
+        return None
+
+    def iter_files(self, root: str) -> Iterator[str]:
+        """
+        按名称排序遍历root，逐个返回需要解析的文件路径
+
+        被排除的目录不进入，只计入skipped_dirs；被跳过的文件按原因计入skipped。
+        """
+        gitignore_by_dir = {root: self._load_gitignore(root, '')}
+        for dir_path, dir_names, file_names in os.walk(root):
+            relative_dir = os.path.relpath(dir_path, root).replace(os.sep, '/')
+            relative_dir = '' if relative_dir == '.' else relative_dir
+            gitignore_rules = gitignore_by_dir.pop(dir_path)
+
+            kept_dirs = []
+            for dir_name in sorted(dir_names):
+                relative_path = f"{relative_dir}/{dir_name}" if relative_dir else dir_name
+                child_path = os.path.join(dir_path, dir_name)
+                if (self.is_excluded_dir(child_path, relative_path)
+                        or match_rules(gitignore_rules, relative_path, True)):
+                    self.skipped_dirs.append(relative_path)
+                    continue
+                gitignore_by_dir[child_path] = gitignore_rules + self._load_gitignore(child_path, relative_path)
+                kept_dirs.append(dir_name)
+            dir_names[:] = kept_dirs
+
+            for file_name in sorted(file_names):
+                if not file_name.endswith('.java'):
+                    continue
+                relative_path = f"{relative_dir}/{file_name}" if relative_dir else file_name
+                file_path = os.path.join(dir_path, file_name)
+                try:
+                    reason = self.check_file(file_path, relative_path, gitignore_rules)
+                except OSError:
+                    # 无法读取的文件交给解析阶段报告错误
+                    reason = None
+                if reason is None:
+                    yield file_path
+                else:
+                    self.skipped[reason] += 1
+
+    def iter_paths(self, root: str, file_paths: Iterable[str]) -> Iterator[str]:
+        """
+        过滤给定的文件列表（如git列出的变更文件），规则与iter_files相同
+
+        路径上任一目录被排除规则命中时文件计为excluded；不读取.gitignore，由调用方保证文件未被忽略。
+        """
+        for file_path in file_paths:
+            if not file_path.endswith('.java'):
+                continue
+            relative_path = os.path.relpath(file_path, root).replace(os.sep, '/')
+            parts = relative_path.split('/')
+            if any(self.is_excluded_dir(os.path.join(root, *parts[:i]), '/'.join(parts[:i]))
+                   for i in range(1, len(parts))):
+                self.skipped['excluded'] += 1
+                continue
+            try:
+                reason = self.check_file(file_path, relative_path)
+            except OSError:
+                reason = None
+            if reason is None:
+                yield file_path
+            else:
+                self.skipped[reason] += 1
+
+    def summary_lines(self) -> List[str]:
+        """summary.txt中的跳过统计"""
+        total = sum(self.skipped.values())
+        details = ', '.join(f"{SKIP_REASON_LABELS[reason]} {self.skipped[reason]}"
+                            for reason in SKIP_REASONS if self.skipped[reason])
+        lines = [f"跳过的Java文件数: {total} 个" + (f" ({details})" if details else "")]
+        if self.skipped_dirs:
+            lines.append(f"跳过的目录数: {len(self.skipped_dirs)} 个（排除规则或.gitignore命中，未遍历）")
+            lines += [f"- {path}/" for path in self.skipped_dirs[:MAX_LISTED_DIRS]]
+            if len(self.skipped_dirs) > MAX_LISTED_DIRS:
+                lines.append(f"- ... 另有 {len(self.skipped_dirs) - MAX_LISTED_DIRS} 个")
+        return lines
+
+
+def walk_order_key(relative_path: str) -> Tuple:
+    """
+    iter_files的遍历顺序对应的排序键：同一目录下先文件后子目录，各自按名称排序
+
+    增量更新后按此排序，输出顺序与全量扫描一致。
+    """
+    parts = relative_path.replace(os.sep, '/').split('/')
+    return tuple((1, name) for name in parts[:-1]) + ((0, parts[-1]),)
+
+
+def add_filter_arguments(parser) -> None:
+    """为命令行添加过滤参数"""
+    parser.add_argument('--include', action='append', default=None,
+                        help='只处理匹配的.java文件（gitignore语法，可多次指定，如 src/main/java/**）')
+    parser.add_argument('--exclude', action='append', default=[],
+                        help='额外排除的文件或目录（gitignore语法，可多次指定）')
+    parser.add_argument('--no-default-excludes', action='store_true',
+                        help=f"不排除默认的目录: {' '.join(DEFAULT_EXCLUDES)}，"
+                             f"以及旁边有构建文件的 {'/ '.join(BUILD_OUTPUT_DIRS)}/")
+    parser.add_argument('--no-gitignore', action='store_true', help='不读取.gitignore')
+    parser.add_argument('--max-file-size', type=float, default=None,
+                        help='跳过超过该大小（MB）的文件，默认不限制')
+    parser.add_argument('--include-generated', action='store_true',
+                        help='不跳过含@Generated等生成代码标记的文件')
+
+
+def filter_from_args(args) -> JavaFileFilter:
+    max_file_size = int(args.max_file_size * 1024 * 1024) if args.max_file_size else None
+    return JavaFileFilter(includes=args.include or (),
+                          excludes=args.exclude,
+                          default_excludes=not args.no_default_excludes,
+                          use_gitignore=not args.no_gitignore,
+                          max_file_size=max_file_size,
+                          skip_generated=not args.include_generated)
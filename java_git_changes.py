@@ -0,0 +1,147 @@
+"""基于本地git仓库的变更文件检测
+
+CI中只需要重新分析某个提交范围内改动的文件。本模块调用本地git（不访问网络）列出
+自某个版本以来变化的.java文件，并找出引用了变更类型的其他文件，
+供java-analysis.py --since增量更新已有的输出。
+
+import扫描只读取文件开头到第一个类型声明为止的文本，不做语法解析。
+同包的类型不需要import即可使用，因此与变更类型同包的文件再按简单类名做整词查找；
+注释或字符串中出现类名也会被当作引用，只会多重新处理文件，不会漏掉依赖。
+"""
+import os
+import re
+import subprocess
+from typing import Iterable, List, Set, Tuple
+
+
+class GitError(RuntimeError):
+    """git命令执行失败或路径不在git仓库中"""
+
+
+_IMPORT_PATTERN = re.compile(r'^\s*import\s+(?:static\s+)?([\w.]+(?:\s*\.\s*\*)?)\s*;')
+_PACKAGE_PATTERN = re.compile(r'^\s*package\s+([\w.\s]+?)\s*;')
+
+# 第一个类型声明出现后不会再有import
+_TYPE_DECLARATION_PATTERN = re.compile(
+    r'^\s*(?:@\w+(?:\([^)]*\))?\s+)*'
+    r'(?:(?:public|protected|private|abstract|final|static|sealed|non-sealed|strictfp)\s+)*'
+    r'(?:class|interface|enum|record|@interface)\b')
+
+
+def _git(repo_dir: str, *args: str) -> str:
+    try:
+        result = subprocess.run(['git', '-C', repo_dir, *args], capture_output=True, check=True)
+    except FileNotFoundError:
+        raise GitError("未找到git命令")
+    except subprocess.CalledProcessError as e:
+        raise GitError(e.stderr.decode('utf-8', errors='replace').strip() or f"git {args[0]} 执行失败")
+    return result.stdout.decode('utf-8', errors='replace')
+
+
+def _split_paths(output: str) -> List[str]:
+    return [path for path in output.split('\0') if path]
+
+
+def changed_java_files(java_path: str, since: str) -> Tuple[List[str], List[str]]:
+    """
+    列出自since以来变化的.java文件，包括工作区中未提交的修改和未跟踪的新文件
+
+    Args:
+        java_path: 项目目录（需位于git仓库中），只考虑该目录下的文件
+        since: 起始版本（提交、分支或标签）
+
+    Returns:
+        (新增或修改的文件, 删除的文件)，路径与遍历java_path得到的形式一致（java_path/相对路径）
+    """
+    _git(java_path, 'rev-parse', '--verify', f'{since}^{{commit}}')
+
+    # --relative使路径相对java_path并只列出该目录下的文件；重命名按删除+新增处理
+    output = _git(java_path, 'diff', '--name-status', '--no-renames', '--relative', '-z', since,
+                  '--', '*.java')
+    fields = _split_paths(output)
+    changed, deleted = set(), set()
+    for status, path in zip(fields[0::2], fields[1::2]):
+        (deleted if status.startswith('D') else changed).add(path)
+
+    untracked = _git(java_path, 'ls-files', '--others', '--exclude-standard', '-z', '--', '*.java')
+    changed.update(_split_paths(untracked))
+
+    def to_path(relative_path):
+        return os.path.join(java_path, relative_path.replace('/', os.sep))
+
+    return [to_path(path) for path in sorted(changed)], [to_path(path) for path in sorted(deleted)]
+
+
+def read_header(file_path: str) -> Tuple[str, List[str]]:
+    """读取文件的包名（默认包为空字符串）和import语句（不含import/static关键字，通配符导入以.*结尾）"""
+    package = ''
+    imports = []
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = _IMPORT_PATTERN.match(line)
+            if match:
+                imports.append(re.sub(r'\s+', '', match.group(1)))
+                continue
+            match = _PACKAGE_PATTERN.match(line)
+            if match:
+                package = re.sub(r'\s+', '', match.group(1))
+            elif _TYPE_DECLARATION_PATTERN.match(line):
+                break
+    return package, imports
+
+
+def read_imports(file_path: str) -> List[str]:
+    """读取文件的import语句（不含import/static关键字，通配符导入以.*结尾）"""
+    return read_header(file_path)[1]
+
+
+def imports_reference(imports: Iterable[str], types: Set[str], packages: Set[str]) -> bool:
+    """
+    import是否引用了给定的类型
+
+    单类型导入与类型或其成员（内部类、静态导入）匹配，通配符导入与类型所在的包或类型本身匹配。
+    """
+    for imported in imports:
+        if imported.endswith('.*'):
+            target = imported[:-2]
+            if target in packages or target in types:
+                return True
+            continue
+        name = imported
+        while name:
+            if name in types:
+                return True
+            name = name.rpartition('.')[0]
+    return False
+
+
+def _mentions_names(file_path: str, pattern) -> bool:
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        return pattern.search(f.read()) is not None
+
+
+def find_dependents(file_paths: Iterable[str], types: Set[str]) -> List[str]:
+    """
+    找出引用了types中任一类型的文件，无法读取的文件忽略
+
+    import引用了变更类型的文件，以及与变更类型同包且出现其简单类名（整词）的文件都算作依赖。
+    """
+    packages = {full_path.rpartition('.')[0] for full_path in types}
+    # 各包中变更类型的简单类名，合成一个整词匹配的模式
+    names_by_package = {}
+    for full_path in types:
+        package, _, name = full_path.rpartition('.')
+        names_by_package.setdefault(package, set()).add(name)
+    patterns = {package: re.compile(r'\b(?:' + '|'.join(map(re.escape, sorted(names))) + r')\b')
+                for package, names in names_by_package.items()}
+
+    dependents = []
+    for file_path in file_paths:
+        try:
+            package, imports = read_header(file_path)
+            if imports_reference(imports, types, packages) or \
+                    (package in patterns and _mentions_names(file_path, patterns[package])):
+                dependents.append(file_path)
+        except OSError:
+            continue
+    return dependents
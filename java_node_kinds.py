@@ -0,0 +1,213 @@
+"""Java语法节点类型id表
+
+tree-sitter中每个节点类型对应一个整数id（node.kind_id，即语法中的TSSymbol），
+同名的别名符号会映射到同一个公开id。压缩器按id查表判断节点类别，
+不必在每个节点上取出node.type字符串再做集合的哈希查找。
+
+id与类型名的对应关系优先从已加载的Language读取；旧版py-tree-sitter的Language
+不提供node_kind_for_id时，从本仓库src/parser.c中的ts_symbol_names表生成。
+加载的语言库可能由其他版本的语法编译，因此先解析一段探测源码，核对每个节点的
+kind_id与type是否与表一致；不一致时改为按类型名向Language查询id（id_for_node_kind），
+仍不一致则报错，而不是静默地按错误的id分类节点。
+src/node-types.json只列出类型名、不含id，因此不作为id来源。
+"""
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# TSSymbol为uint16，ERROR节点的kind_id为65535，查找表按全部取值分配，无需边界检查
+KIND_ID_LIMIT = 1 << 16
+
+PARSER_SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'parser.c')
+
+_SYMBOL_ENUM_ENTRY = re.compile(r'^\s*(\w+) = (\d+),', re.MULTILINE)
+_SYMBOL_NAME_ENTRY = re.compile(r'^\s*\[(\w+)\] = "((?:\\.|[^"\\])*)",', re.MULTILINE)
+_C_ESCAPE = re.compile(r'\\(.)')
+_C_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '0': '\0'}
+
+
+class NodeKinds:
+    """节点类型id与类型名的双向映射，以及按类型名集合生成的id查找表"""
+
+    def __init__(self, names: List[str]):
+        """
+        Args:
+            names: 按id排列的类型名，names[kind_id]为对应节点的type
+        """
+        self.names = names
+        self._ids = {}
+        for kind_id, name in enumerate(names):
+            self._ids.setdefault(name, []).append(kind_id)
+        self._flags = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def ids(self, type_name: str) -> Tuple[int, ...]:
+        """类型名对应的所有id（含同名别名），未知类型返回空元组"""
+        return tuple(self._ids.get(type_name, ()))
+
+    def flags(self, type_names: Iterable[str]) -> bytes:
+        """
+        生成按kind_id索引的查找表：flags[node.kind_id]非0表示节点类型属于type_names
+
+        结果按集合缓存，各压缩器实例共享同一份表。
+        """
+        key = frozenset(type_names)
+        table = self._flags.get(key)
+        if table is None:
+            flags = bytearray(KIND_ID_LIMIT)
+            for name in key:
+                for kind_id in self._ids.get(name, ()):
+                    flags[kind_id] = 1
+            table = self._flags[key] = bytes(flags)
+        return table
+
+    @classmethod
+    def from_parser_source(cls, path: str = PARSER_SOURCE_PATH) -> 'NodeKinds':
+        """从生成的parser.c中的符号枚举和ts_symbol_names表构建"""
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+
+        enum_start = source.index('enum ts_symbol_identifiers')
+        enum_end = source.index('};', enum_start)
+        symbol_ids = {name: int(value) for name, value
+                      in _SYMBOL_ENUM_ENTRY.findall(source, enum_start, enum_end)}
+        symbol_ids['ts_builtin_sym_end'] = 0
+
+        table_start = source.index('ts_symbol_names[]')
+        table_end = source.index('};', table_start)
+        names = [''] * (max(symbol_ids.values()) + 1)
+        for symbol, name in _SYMBOL_NAME_ENTRY.findall(source, table_start, table_end):
+            names[symbol_ids[symbol]] = _C_ESCAPE.sub(lambda m: _C_ESCAPES.get(m.group(1), m.group(1)), name)
+        return cls(names)
+
+
+# 探测源码：覆盖常见的声明、语句、表达式和字面量，用于核对id表与语言库是否一致
+PROBE_SOURCE = b"""package p.q;
+import static java.util.Map.*;
+@interface Marker { int value() default 1; }
+/** doc */
+public final class Probe<T extends Comparable<T>> extends Base implements Runnable {
+    private static final int[] VALUES = {1, 0x2, 3L, 'c'};
+    enum Kind { A, B; }
+    record Pair(String left, double right) {}
+    @Override
+    public synchronized void run() throws Exception {
+        // line comment
+        var list = new java.util.ArrayList<String>();
+        for (int i = 0; i < 10; i++) { if (i % 2 == 0) continue; else break; }
+        for (String s : list) { list.add(s + "x"); }
+        while (true) { do { i--; } while (i > 0); }
+        try (var in = open()) { assert in != null : "msg"; } catch (IOException | RuntimeException e) { throw e; } finally { }
+        int n = switch (kind) { case A -> 1; default -> { yield 2; } };
+        switch (n) { case 1: return; default: break; }
+        Runnable r = () -> this.run();
+        Object o = (Object) super.toString();
+        boolean b = o instanceof String str && !false ? null == o : 1.5f > 2;
+        int[][] grid = new int[2][];
+        label: synchronized (this) { String.class.getName(); }
+        Function<T, T> f = T::valueOf;
+    }
+}
+"""
+
+
+def _probe_mismatches(names: List[str], language) -> List[Tuple[int, str]]:
+    """解析探测源码，返回kind_id与names表不一致的节点 (kind_id, type)"""
+    from tree_sitter import Parser
+
+    parser = Parser()
+    parser.set_language(language)
+    tree = parser.parse(PROBE_SOURCE)
+
+    mismatches = []
+    stack = [tree.root_node]
+    while stack:
+        node = stack.pop()
+        stack.extend(node.children)
+        if node.type == 'ERROR':
+            continue
+        kind_id = node.kind_id
+        if kind_id >= len(names) or names[kind_id] != node.type:
+            mismatches.append((kind_id, node.type))
+    return mismatches
+
+
+def _names_from_language(language, type_names: Iterable[str]) -> Optional[List[str]]:
+    """按类型名向Language查询id（具名与匿名各查一次）生成names表，Language不支持时返回None"""
+    if not hasattr(language, 'id_for_node_kind'):
+        return None
+    ids = {}
+    for name in type_names:
+        for named in (True, False):
+            kind_id = language.id_for_node_kind(name, named)
+            if kind_id:
+                ids.setdefault(kind_id, name)
+    if not ids:
+        return None
+    names = [''] * (max(ids) + 1)
+    for kind_id, name in ids.items():
+        names[kind_id] = name
+    return names
+
+
+_node_kinds_cache: Dict[Tuple[str, ...], NodeKinds] = {}
+_parser_source_kinds: Optional[NodeKinds] = None
+# 已核对过的旧版Language（按TSLanguage指针）对应的表
+_checked_languages: Dict[int, NodeKinds] = {}
+
+
+def _cached_kinds(names: List[str]) -> NodeKinds:
+    key = tuple(names)
+    kinds = _node_kinds_cache.get(key)
+    if kinds is None:
+        kinds = _node_kinds_cache[key] = NodeKinds(names)
+    return kinds
+
+
+def _parser_source_node_kinds() -> NodeKinds:
+    global _parser_source_kinds
+    if _parser_source_kinds is None:
+        _parser_source_kinds = NodeKinds.from_parser_source()
+    return _parser_source_kinds
+
+
+def _checked_node_kinds(language) -> NodeKinds:
+    """用探测解析核对src/parser.c生成的表，不一致时按类型名重建，仍不一致则抛出ValueError"""
+    kinds = _parser_source_node_kinds()
+    if not _probe_mismatches(kinds.names, language):
+        return kinds
+
+    names = _names_from_language(language, set(kinds.names) - {''})
+    if names is not None:
+        mismatches = _probe_mismatches(names, language)
+        if not mismatches:
+            return _cached_kinds(names)
+    else:
+        mismatches = _probe_mismatches(kinds.names, language)
+    examples = ', '.join(f"{kind_id}:{type_name}" for kind_id, type_name in mismatches[:5])
+    raise ValueError(f"加载的Java语言库与 {PARSER_SOURCE_PATH} 的节点类型id不一致（{examples}），"
+                     f"请用本仓库的语法重新编译语言库，或升级py-tree-sitter")
+
+
+def node_kinds_for(language=None) -> NodeKinds:
+    """
+    获取语言对应的NodeKinds，按类型名列表缓存，每个文件新建Language也不会重复生成查找表
+
+    language为None时使用本仓库src/parser.c生成的表；language不支持按id查询类型名时，
+    该表先经探测解析核对，语言库的语法版本不同时按类型名重建或抛出ValueError。
+    """
+    if language is None:
+        return _parser_source_node_kinds()
+    if hasattr(language, 'node_kind_for_id'):
+        return _cached_kinds([language.node_kind_for_id(kind_id) for kind_id in range(language.node_kind_count)])
+
+    # 同一语言库多次加载得到同一个TSLanguage指针，按指针缓存核对结果
+    language_id = getattr(language, 'language_id', None)
+    kinds = _checked_languages.get(language_id) if language_id is not None else None
+    if kinds is None:
+        kinds = _checked_node_kinds(language)
+        if language_id is not None:
+            _checked_languages[language_id] = kinds
+    return kinds
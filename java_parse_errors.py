@@ -0,0 +1,158 @@
+"""语法错误文件的解析报告
+
+tree-sitter遇到语法错误时不会失败，而是在树中插入ERROR节点（跳过的无法识别的片段）
+和MISSING节点（为恢复解析而补上的缺失记号），提取器照常产出部分结果。
+本模块在同一棵树上收集这些节点的位置与数量，写成机器可读的报告，不需要再解析一遍：
+
+- 每个节点的has_error表示其子树中是否含错误，根节点为False时整个文件无需遍历；
+- 遍历时只进入has_error为True的子树，ERROR节点本身不再向下展开。
+
+报告为JSON，按文件路径排序，同样的输入得到同样的报告。
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from java_source import Source
+
+DEFAULT_REPORT_NAME = "parse_errors.json"
+
+# 报告中每个ERROR节点保留的源码片段长度（字节）
+SNIPPET_BYTES = 80
+
+# 单个文件最多记录的节点数，其余只计数
+MAX_NODES_PER_FILE = 200
+
+
+def _snippet(node, source: Optional[Source]) -> str:
+    if source is None or isinstance(source, str):
+        text = node.text or b''
+    else:
+        text = source[node.start_byte:min(node.end_byte, node.start_byte + SNIPPET_BYTES)]
+    return bytes(text[:SNIPPET_BYTES]).decode('utf-8', errors='replace')
+
+
+def collect_parse_errors(root_node, source: Optional[Source] = None) -> List[Dict[str, Any]]:
+    """
+    收集树中的ERROR与MISSING节点
+
+    Args:
+        root_node: 解析得到的根节点
+        source: 源码（字节/mmap），用于截取ERROR节点的片段
+
+    Returns:
+        按出现顺序排列的节点记录，行列号从1开始；无语法错误时返回空列表
+    """
+    if not root_node.has_error:
+        return []
+
+    errors = []
+    stack = [root_node]
+    while stack:
+        node = stack.pop()
+        if node.is_missing:
+            errors.append(_error_record('MISSING', node, node.type, ''))
+        elif node.type == 'ERROR':
+            parent = node.parent
+            errors.append(_error_record('ERROR', node, parent.type if parent else '', _snippet(node, source)))
+        elif node.has_error:
+            # 逆序入栈，弹出顺序与源码顺序一致
+            stack.extend(reversed(node.children))
+    return errors
+
+
+def _error_record(kind: str, node, context: str, snippet: str) -> Dict[str, Any]:
+    start_row, start_column = node.start_point
+    end_row, end_column = node.end_point
+    return {
+        "kind": kind,
+        # MISSING节点为缺失的记号类型，ERROR节点为所在的父节点类型
+        "context": context,
+        "line": start_row + 1,
+        "column": start_column + 1,
+        "end_line": end_row + 1,
+        "end_column": end_column + 1,
+        "snippet": snippet,
+    }
+
+
+class ParseErrorReport:
+    """汇总各文件的语法错误与处理失败的文件"""
+
+    def __init__(self, max_nodes_per_file: int = MAX_NODES_PER_FILE):
+        self.max_nodes_per_file = max_nodes_per_file
+        self.files = {}
+        self.failures = {}
+        self.clean_files = 0
+
+    def add_file(self, file_path: str, errors: List[Dict[str, Any]]) -> None:
+        if not errors:
+            self.clean_files += 1
+            return
+        self.files[file_path] = {
+            "errors": sum(1 for error in errors if error["kind"] == 'ERROR'),
+            "missing": sum(1 for error in errors if error["kind"] == 'MISSING'),
+            "first_line": errors[0]["line"],
+            "nodes": errors[:self.max_nodes_per_file],
+        }
+
+    def add_failure(self, file_path: str, error: BaseException) -> None:
+        """记录解析或提取过程中抛出异常的文件"""
+        self.failures[file_path] = f"{type(error).__name__}: {error}"
+
+    @property
+    def error_count(self) -> int:
+        return sum(entry["errors"] for entry in self.files.values())
+
+    @property
+    def missing_count(self) -> int:
+        return sum(entry["missing"] for entry in self.files.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "clean_files": self.clean_files,
+            "files_with_errors": len(self.files),
+            "error_nodes": self.error_count,
+            "missing_nodes": self.missing_count,
+            "failed_files": len(self.failures),
+            "files": dict(sorted(self.files.items())),
+            "failures": dict(sorted(self.failures.items())),
+        }
+
+    def write(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+    def summary_lines(self) -> List[str]:
+        """summary.txt中的错误统计"""
+        lines = [f"含语法错误的文件数: {len(self.files)} 个 "
+                 f"(ERROR节点 {self.error_count}, MISSING节点 {self.missing_count})"]
+        if self.failures:
+            lines.append(f"处理失败的文件数: {len(self.failures)} 个")
+        return lines
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='查看java-analysis.py生成的语法错误报告')
+    parser.add_argument('report', help=f'报告路径（默认文件名 {DEFAULT_REPORT_NAME}）')
+    parser.add_argument('--top', type=int, default=20, help='列出错误最多的前N个文件')
+
+    args = parser.parse_args()
+
+    report = load_report(args.report)
+    print(f"无错误 {report['clean_files']} 个文件, 含语法错误 {report['files_with_errors']} 个, "
+          f"处理失败 {report['failed_files']} 个")
+    ranked = sorted(report["files"].items(), key=lambda item: (-(item[1]["errors"] + item[1]["missing"]), item[0]))
+    for file_path, entry in ranked[:args.top]:
+        print(f"{entry['errors']:>5} ERROR {entry['missing']:>5} MISSING  {file_path}:{entry['first_line']}")
+    for file_path, message in report["failures"].items():
+        print(f"失败  {file_path}: {message}")
@@ -0,0 +1,275 @@
+"""Java源文件读取工具
+
+供java-analysis.py与各ast-compressor脚本共享：以只读mmap方式映射源文件，
+直接把映射缓冲区交给tree-sitter解析，避免 read() -> str -> bytes 的多次拷贝。
+超大的生成代码可改用StreamSource，通过read回调按块从文件句柄流式解析，
+节点文本统一经node_text()按字节偏移读取。
+count_lines()/count_newlines()只统计换行符，供只需要行数的调用方使用；
+compute_file_metrics()单遍词法扫描得到代码/注释/空行统计，供需要这些统计的压缩器使用。
+"""
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+# 分块扫描缓冲区时每块的大小
+SCAN_CHUNK_SIZE = 1024 * 1024
+
+# 流式解析时read回调每次返回的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 单遍扫描用的词法模式：换行、行注释、块注释、文本块/字符串/字符字面量
+# 字面量需要整体匹配，才不会把字符串里的 "//" 或 "/**" 误判为注释
+_SCAN_PATTERN = re.compile(
+    rb'(?P<nl>\n)'
+    rb'|(?P<line_comment>//[^\n]*)'
+    rb'|(?P<block_comment>/\*.*?(?:\*/|\Z))'
+    rb'|(?P<literal>"""(?:\\.|[^\\])*?"""|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\')',
+    re.DOTALL
+)
+
+_NON_WHITESPACE = re.compile(rb'\S')
+
+
+class StreamSource:
+    """
+    基于文件句柄的源码访问对象
+
+    不在内存中保留源码副本：解析时通过read_chunk回调按块读取，
+    提取时通过切片按字节偏移从文件中读取节点文本。
+    """
+
+    def __init__(self, fileobj: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE):
+        """
+        Args:
+            fileobj: 以二进制模式打开、支持seek的文件句柄
+            chunk_size: read回调每次返回的字节数
+        """
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        fileobj.seek(0, os.SEEK_END)
+        self.size = fileobj.tell()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, key: slice) -> bytes:
+        """按字节偏移读取片段，仅支持步长为1的切片"""
+        if not isinstance(key, slice):
+            raise TypeError("StreamSource只支持切片访问")
+        start, stop, step = key.indices(self.size)
+        if step != 1:
+            raise ValueError("StreamSource不支持步长切片")
+        if stop <= start:
+            return b''
+        self.fileobj.seek(start)
+        return self.fileobj.read(stop - start)
+
+    def read_chunk(self, byte_offset: int, point: Optional[Tuple[int, int]] = None) -> bytes:
+        """tree-sitter的read回调：返回从byte_offset开始的一块数据，文件末尾返回b''"""
+        self.fileobj.seek(byte_offset)
+        return self.fileobj.read(self.chunk_size)
+
+
+Source = Union[str, bytes, bytearray, mmap.mmap, StreamSource]
+
+
+@contextmanager
+def open_java_source(file_path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """
+    以只读内存映射方式打开Java源文件
+
+    返回的缓冲区支持buffer协议，可直接传给parser.parse()。
+    tree-sitter节点的text依赖该缓冲区，因此所有提取工作都应在with块内完成。
+    空文件无法mmap，此时返回b''。
+
+    Args:
+        file_path: Java源文件路径
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+@contextmanager
+def open_java_stream(file_path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[StreamSource]:
+    """
+    以流式方式打开Java源文件，返回StreamSource
+
+    与open_java_source相同，节点文本依赖打开的文件句柄，提取工作应在with块内完成。
+    """
+    with open(file_path, 'rb') as f:
+        yield StreamSource(f, chunk_size)
+
+
+def to_parser_input(source: Source):
+    """
+    将源码转换为parser.parse()可接受的输入
+
+    字节缓冲区原样返回不做拷贝；StreamSource返回read回调，由解析器按块拉取。
+    """
+    if isinstance(source, str):
+        return source.encode('utf-8')
+    if isinstance(source, StreamSource):
+        return source.read_chunk
+    return source
+
+
+def node_text(node, source: Optional[Source] = None) -> str:
+    """
+    按字节偏移从源码中取出节点文本
+
+    回调解析得到的树不保留源码，node.text不可用，因此提取器统一经由本函数取文本。
+    source为None或str（字节偏移与字符下标不对应）时退回node.text。
+    """
+    if source is None or isinstance(source, str):
+        return node.text.decode('utf-8')
+    return source[node.start_byte:node.end_byte].decode('utf-8')
+
+
+def count_newlines(source: Source) -> int:
+    """统计换行符数量，对mmap分块计数，不生成整个文件的副本"""
+    if isinstance(source, str):
+        return source.count('\n')
+    if not isinstance(source, (mmap.mmap, StreamSource)):
+        return source.count(b'\n')
+
+    total = 0
+    for start in range(0, len(source), SCAN_CHUNK_SIZE):
+        total += source[start:start + SCAN_CHUNK_SIZE].count(b'\n')
+    return total
+
+
+def count_lines(source: Source) -> int:
+    """计算文件行数，与splitlines()的结果一致（末尾换行不额外计一行）"""
+    if not source:
+        return 0
+    newline = '\n' if isinstance(source, str) else b'\n'
+    lines = count_newlines(source)
+    if source[-1:] != newline:
+        lines += 1
+    return lines
+
+
+class FileMetrics:
+    """
+    单个源文件的统计信息，由compute_file_metrics一次扫描得到
+
+    行按source.split('\\n')的口径划分（total_lines = 换行数 + 1），
+    line_count与splitlines()口径一致，供分析脚本统计代码行数。
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.total_lines = 1
+        self.code_lines = 0
+        self.comment_lines = 0
+        self.blank_lines = 0
+        self.ends_with_newline = False
+
+    @property
+    def line_count(self) -> int:
+        """与splitlines()一致的行数：末尾换行后的空行不计入"""
+        if self.size == 0:
+            return 0
+        return self.total_lines - 1 if self.ends_with_newline else self.total_lines
+
+    def to_dict(self):
+        return {
+            "total_lines": self.total_lines,
+            "code_lines": self.code_lines,
+            "comment_lines": self.comment_lines,
+            "blank_lines": self.blank_lines
+        }
+
+
+def compute_file_metrics(source: Source) -> FileMetrics:
+    """
+    单遍扫描源码，得到总行数以及代码行/注释行/空行数
+
+    bytes与mmap直接扫描不做拷贝；StreamSource临时映射其底层文件；
+    str会先编码为UTF-8，以保证偏移与tree-sitter的字节偏移一致。
+    """
+    if isinstance(source, str):
+        return _scan_file_metrics(source.encode('utf-8'))
+    if isinstance(source, StreamSource) and len(source):
+        mapped = mmap.mmap(source.fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return _scan_file_metrics(mapped)
+        finally:
+            mapped.close()
+    if isinstance(source, StreamSource):
+        return _scan_file_metrics(b'')
+    return _scan_file_metrics(source)
+
+
+def _scan_file_metrics(buffer) -> FileMetrics:
+    """compute_file_metrics的实现，buffer须支持re模块的buffer协议"""
+    metrics = FileMetrics(len(buffer))
+
+    has_code = False
+    has_comment = False
+
+    def end_line():
+        nonlocal has_code, has_comment
+        if has_code:
+            metrics.code_lines += 1
+        elif has_comment:
+            metrics.comment_lines += 1
+        else:
+            metrics.blank_lines += 1
+        metrics.total_lines += 1
+        has_code = False
+        has_comment = False
+
+    def end_lines_within(start, end, is_comment):
+        # 跨行的块注释和文本块：内部每个换行都结束一行，被跨越的行按注释行/代码行计
+        nonlocal has_code, has_comment
+        newline = buffer.find(b'\n', start, end)
+        while newline != -1:
+            end_line()
+            if is_comment:
+                has_comment = True
+            else:
+                has_code = True
+            newline = buffer.find(b'\n', newline + 1, end)
+
+    position = 0
+    for match in _SCAN_PATTERN.finditer(buffer):
+        start = match.start()
+        if not has_code and start > position and _NON_WHITESPACE.search(buffer, position, start):
+            has_code = True
+
+        kind = match.lastgroup
+        if kind == 'nl':
+            end_line()
+        elif kind == 'line_comment':
+            has_comment = True
+        elif kind == 'block_comment':
+            has_comment = True
+            end_lines_within(start, match.end(), True)
+        else:
+            has_code = True
+            end_lines_within(start, match.end(), False)
+        position = match.end()
+
+    if not has_code and _NON_WHITESPACE.search(buffer, position):
+        has_code = True
+    # 最后一行（可能为空）按split口径同样计入
+    if has_code:
+        metrics.code_lines += 1
+    elif has_comment:
+        metrics.comment_lines += 1
+    else:
+        metrics.blank_lines += 1
+
+    metrics.ends_with_newline = buffer[-1:] == b'\n'
+    return metrics
@@ -0,0 +1,364 @@
+"""java-analysis.py提取结果的SQLite存储
+
+Markdown表格按2MB拆分后只能逐个文件grep，按类型或名称查找很慢。
+StructureDatabase在扫描过程中按文件追加类、方法、字段和局部变量，
+行先缓存在内存中，攒够BATCH_SIZE行后在一个事务内用executemany批量插入；
+数据库使用WAL日志，索引在写入完成后统一建立，避免每次插入都维护索引。
+load_classes按插入顺序读回java_records中的记录对象，可直接交给generate_markdown_files重新生成Markdown。
+
+用法:
+    python java_structure_db.py java_structure.db --type DocumentBuilder
+    python java_structure_db.py java_structure.db --name parseXml
+    python java_structure_db.py java_structure.db --file src/main/java/Foo.java
+"""
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Tuple
+
+from java_records import ClassInfo, MethodInfo, FieldInfo, LocalVar
+
+DEFAULT_DB_NAME = "java_structure.db"
+
+# 每个事务插入的行数（所有表合计）
+BATCH_SIZE = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    line_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    name TEXT NOT NULL,
+    package TEXT NOT NULL,
+    full_path TEXT NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS methods (
+    id INTEGER PRIMARY KEY,
+    class_id INTEGER NOT NULL REFERENCES classes(id),
+    name TEXT NOT NULL,
+    return_type TEXT,
+    line INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fields (
+    id INTEGER PRIMARY KEY,
+    class_id INTEGER NOT NULL REFERENCES classes(id),
+    name TEXT NOT NULL,
+    type TEXT,
+    type_full_path TEXT,
+    line INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS locals (
+    id INTEGER PRIMARY KEY,
+    method_id INTEGER NOT NULL REFERENCES methods(id),
+    name TEXT NOT NULL,
+    type TEXT,
+    type_full_path TEXT,
+    line INTEGER NOT NULL
+);
+"""
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_classes_file ON classes(file_id);
+CREATE INDEX IF NOT EXISTS idx_classes_name ON classes(name);
+CREATE INDEX IF NOT EXISTS idx_classes_full_path ON classes(full_path);
+CREATE INDEX IF NOT EXISTS idx_methods_class ON methods(class_id);
+CREATE INDEX IF NOT EXISTS idx_methods_name ON methods(name);
+CREATE INDEX IF NOT EXISTS idx_methods_return_type ON methods(return_type);
+CREATE INDEX IF NOT EXISTS idx_fields_class ON fields(class_id);
+CREATE INDEX IF NOT EXISTS idx_fields_name ON fields(name);
+CREATE INDEX IF NOT EXISTS idx_fields_type ON fields(type);
+CREATE INDEX IF NOT EXISTS idx_fields_type_full_path ON fields(type_full_path);
+CREATE INDEX IF NOT EXISTS idx_locals_method ON locals(method_id);
+CREATE INDEX IF NOT EXISTS idx_locals_name ON locals(name);
+CREATE INDEX IF NOT EXISTS idx_locals_type ON locals(type);
+CREATE INDEX IF NOT EXISTS idx_locals_type_full_path ON locals(type_full_path);
+"""
+
+_TABLES = ('files', 'classes', 'methods', 'fields', 'locals')
+
+_INSERTS = {
+    'files': "INSERT INTO files (id, path, line_count) VALUES (?, ?, ?)",
+    'classes': "INSERT INTO classes (id, file_id, name, package, full_path, line) VALUES (?, ?, ?, ?, ?, ?)",
+    'methods': "INSERT INTO methods (id, class_id, name, return_type, line) VALUES (?, ?, ?, ?, ?)",
+    'fields': "INSERT INTO fields (id, class_id, name, type, type_full_path, line) VALUES (?, ?, ?, ?, ?, ?)",
+    'locals': "INSERT INTO locals (id, method_id, name, type, type_full_path, line) VALUES (?, ?, ?, ?, ?, ?)",
+}
+
+
+# 按文件删除时从子表到父表的顺序
+_FILE_CLASSES = "SELECT c.id FROM classes c JOIN files f ON f.id = c.file_id WHERE f.path = ?"
+_DELETES = (
+    f"DELETE FROM locals WHERE method_id IN (SELECT id FROM methods WHERE class_id IN ({_FILE_CLASSES}))",
+    f"DELETE FROM methods WHERE class_id IN ({_FILE_CLASSES})",
+    f"DELETE FROM fields WHERE class_id IN ({_FILE_CLASSES})",
+    f"DELETE FROM classes WHERE id IN ({_FILE_CLASSES})",
+    "DELETE FROM files WHERE path = ?",
+)
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """打开数据库并设置批量写入使用的PRAGMA"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+class StructureDatabase:
+    """
+    按文件追加提取结果的SQLite写入器
+
+    id在Python中顺序分配，父子表的行可以一起用executemany插入，无需逐行取lastrowid。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_NAME, overwrite: bool = True,
+                 batch_size: int = BATCH_SIZE):
+        """
+        Args:
+            db_path: 数据库文件路径
+            overwrite: 是否删除已有的数据库重新生成
+            batch_size: 每个事务插入的行数
+        """
+        if overwrite:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.conn = connect(db_path)
+        self.conn.executescript(_SCHEMA)
+        self._next_ids = {table: self._max_id(table) + 1 for table in _TABLES}
+        self._rows = {table: [] for table in _TABLES}
+        self._pending = 0
+        self._file_ids = {}
+
+    def _max_id(self, table: str) -> int:
+        return self.conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+    def _new_id(self, table: str) -> int:
+        row_id = self._next_ids[table]
+        self._next_ids[table] = row_id + 1
+        return row_id
+
+    def _add_row(self, table: str, row: Tuple) -> None:
+        self._rows[table].append(row)
+        self._pending += 1
+
+    def add_file(self, file_path: str, classes: Iterable[ClassInfo], line_count: int = 0) -> None:
+        """
+        追加一个源文件的提取结果
+
+        同一文件可分多次追加（如按全限定名排序后逐个类写入），文件行只在第一次写入，line_count以第一次为准。
+        """
+        file_id = self._file_ids.get(file_path)
+        if file_id is None:
+            file_id = self._file_ids[file_path] = self._new_id('files')
+            self._add_row('files', (file_id, file_path, line_count))
+        for class_info in classes:
+            class_id = self._new_id('classes')
+            self._add_row('classes', (class_id, file_id, class_info.name, class_info.package or '',
+                                      class_info.full_path, class_info.line))
+            for method in class_info.methods:
+                method_id = self._new_id('methods')
+                self._add_row('methods', (method_id, class_id, method.name, method.return_type, method.line))
+                for var in method.local_variables:
+                    self._add_row('locals', (self._new_id('locals'), method_id, var.name, var.type,
+                                             var.type_full_path, var.line))
+            for field in class_info.fields:
+                self._add_row('fields', (self._new_id('fields'), class_id, field.name, field.type,
+                                         field.type_full_path, field.line))
+
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def file_paths(self) -> List[str]:
+        """数据库中已有的源文件路径"""
+        self.flush()
+        return [path for path, in self.conn.execute("SELECT path FROM files ORDER BY id")]
+
+    def classes_in_files(self, file_paths: Iterable[str]) -> List[Tuple[str, str]]:
+        """给定源文件中的类，返回 (全路径, 包名) 列表"""
+        self.flush()
+        return [row for path in file_paths for row in self.conn.execute(
+            "SELECT c.full_path, c.package FROM classes c JOIN files f ON f.id = c.file_id "
+            "WHERE f.path = ? ORDER BY c.id", (path,))]
+
+    def remove_files(self, file_paths: Iterable[str]) -> None:
+        """删除源文件及其类、方法、字段和局部变量，用于增量更新前清除旧的提取结果"""
+        self.flush()
+        params = [(path,) for path in file_paths]
+        for path, in params:
+            self._file_ids.pop(path, None)
+        with self.conn:
+            for sql in _DELETES:
+                self.conn.executemany(sql, params)
+
+    def flush(self) -> None:
+        """在一个事务内写入缓存的行，按父表到子表的顺序插入"""
+        if not self._pending:
+            return
+        with self.conn:
+            for table in _TABLES:
+                rows = self._rows[table]
+                if rows:
+                    self.conn.executemany(_INSERTS[table], rows)
+                    rows.clear()
+        self._pending = 0
+
+    def close(self) -> None:
+        """写入剩余的行并建立索引"""
+        if self.conn is None:
+            return
+        self.flush()
+        self.conn.executescript(_INDEXES)
+        self.conn.execute("ANALYZE")
+        self.conn.close()
+        self.conn = None
+
+    def __enter__(self) -> 'StructureDatabase':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def load_classes(db_path: str) -> Tuple[List[ClassInfo], int, int]:
+    """
+    按写入顺序读回全部类，用于从数据库重新生成Markdown
+
+    Returns:
+        (类列表, 总行数, 文件数)
+    """
+    conn = connect(db_path)
+    try:
+        total_lines, total_files = conn.execute(
+            "SELECT COALESCE(SUM(line_count), 0), COUNT(*) FROM files").fetchone()
+
+        classes = {}
+        for class_id, name, package, line, file_path in conn.execute(
+                "SELECT c.id, c.name, c.package, c.line, f.path FROM classes c "
+                "JOIN files f ON f.id = c.file_id ORDER BY c.id"):
+            classes[class_id] = ClassInfo(name, package, line, file_path)
+
+        methods = {}
+        for method_id, class_id, name, return_type, line in conn.execute(
+                "SELECT id, class_id, name, return_type, line FROM methods ORDER BY id"):
+            method = MethodInfo(name, return_type, line)
+            classes[class_id].methods.append(method)
+            methods[method_id] = method
+
+        for method_id, name, var_type, type_full_path, line in conn.execute(
+                "SELECT method_id, name, type, type_full_path, line FROM locals ORDER BY id"):
+            methods[method_id].local_variables.append(LocalVar(name, var_type, type_full_path, line))
+
+        for class_id, name, var_type, type_full_path, line in conn.execute(
+                "SELECT class_id, name, type, type_full_path, line FROM fields ORDER BY id"):
+            classes[class_id].fields.append(FieldInfo(name, var_type, type_full_path, line))
+    finally:
+        conn.close()
+
+    return list(classes.values()), total_lines, total_files
+
+
+_TYPE_USAGE_QUERY = """
+SELECT '类字段', c.full_path, NULL, fd.name, fd.type_full_path, f.path, fd.line
+FROM fields fd JOIN classes c ON c.id = fd.class_id JOIN files f ON f.id = c.file_id
+WHERE fd.type = :type OR fd.type_full_path = :type
+UNION ALL
+SELECT '局部变量', c.full_path, m.name, l.name, l.type_full_path, f.path, l.line
+FROM locals l JOIN methods m ON m.id = l.method_id JOIN classes c ON c.id = m.class_id
+JOIN files f ON f.id = c.file_id
+WHERE l.type = :type OR l.type_full_path = :type
+UNION ALL
+SELECT '返回值', c.full_path, m.name, NULL, m.return_type, f.path, m.line
+FROM methods m JOIN classes c ON c.id = m.class_id JOIN files f ON f.id = c.file_id
+WHERE m.return_type = :type
+"""
+
+_NAME_QUERY = """
+SELECT '类', c.full_path, NULL, c.name, NULL, f.path, c.line
+FROM classes c JOIN files f ON f.id = c.file_id WHERE c.name = :name OR c.full_path = :name
+UNION ALL
+SELECT '方法', c.full_path, m.name, m.name, m.return_type, f.path, m.line
+FROM methods m JOIN classes c ON c.id = m.class_id JOIN files f ON f.id = c.file_id WHERE m.name = :name
+UNION ALL
+SELECT '类字段', c.full_path, NULL, fd.name, fd.type_full_path, f.path, fd.line
+FROM fields fd JOIN classes c ON c.id = fd.class_id JOIN files f ON f.id = c.file_id WHERE fd.name = :name
+UNION ALL
+SELECT '局部变量', c.full_path, m.name, l.name, l.type_full_path, f.path, l.line
+FROM locals l JOIN methods m ON m.id = l.method_id JOIN classes c ON c.id = m.class_id
+JOIN files f ON f.id = c.file_id WHERE l.name = :name
+"""
+
+_FILE_QUERY = """
+SELECT '类', c.full_path, NULL, c.name, NULL, f.path, c.line
+FROM classes c JOIN files f ON f.id = c.file_id WHERE f.path = :path
+UNION ALL
+SELECT '方法', c.full_path, m.name, m.name, m.return_type, f.path, m.line
+FROM methods m JOIN classes c ON c.id = m.class_id JOIN files f ON f.id = c.file_id WHERE f.path = :path
+UNION ALL
+SELECT '类字段', c.full_path, NULL, fd.name, fd.type_full_path, f.path, fd.line
+FROM fields fd JOIN classes c ON c.id = fd.class_id JOIN files f ON f.id = c.file_id WHERE f.path = :path
+"""
+
+QUERY_COLUMNS = ('kind', 'class', 'method', 'name', 'type', 'file', 'line')
+
+
+def _query(conn: sqlite3.Connection, sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [dict(zip(QUERY_COLUMNS, row)) for row in conn.execute(sql, params)]
+
+
+def find_type_usages(conn: sqlite3.Connection, type_name: str) -> List[Dict[str, Any]]:
+    """查找以该类型（简单名或全路径）声明的字段、局部变量和返回值"""
+    return _query(conn, _TYPE_USAGE_QUERY, {"type": type_name})
+
+
+def find_by_name(conn: sqlite3.Connection, name: str) -> List[Dict[str, Any]]:
+    """按名称查找类、方法、字段和局部变量"""
+    return _query(conn, _NAME_QUERY, {"name": name})
+
+
+def find_in_file(conn: sqlite3.Connection, file_path: str) -> List[Dict[str, Any]]:
+    """列出源文件中的类、方法和字段"""
+    return _query(conn, _FILE_QUERY, {"path": file_path})
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='查询java-analysis.py生成的结构数据库')
+    parser.add_argument('db', help='数据库文件路径')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--type', '-t', help='按类型（简单名或全路径）查找字段、局部变量和返回值')
+    group.add_argument('--name', '-n', help='按名称查找类、方法、字段和局部变量')
+    group.add_argument('--file', '-f', help='列出源文件中的类、方法和字段')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"错误: 数据库 {args.db} 不存在")
+        exit(1)
+
+    conn = connect(args.db)
+    start_time = time.perf_counter()
+    if args.type:
+        results = find_type_usages(conn, args.type)
+    elif args.name:
+        results = find_by_name(conn, args.name)
+    else:
+        results = find_in_file(conn, args.file)
+    elapsed = time.perf_counter() - start_time
+    conn.close()
+
+    print("| 类别 | 类 | 方法 | 名称 | 类型 | 位置 |")
+    print("|---|---|---|---|---|---|")
+    for row in results:
+        print(f"| {row['kind']} | {row['class']} | {row['method'] or ''} | {row['name'] or ''} | "
+              f"{row['type'] or ''} | {row['file']}:{row['line']} |")
+    print(f"\n共 {len(results)} 条结果，查询耗时 {elapsed * 1000:.1f} 毫秒")
@@ -0,0 +1,206 @@
+"""java-analysis.py提取结果的列式导出
+
+分析用的notebook需要表格数据，从Markdown反向解析既慢又会丢失信息（如类与方法的对应关系）。
+StructureExporter与StructureDatabase接口相同，扫描过程中按文件追加提取结果，
+classes / methods / fields / locals 四张表各写一个文件，行按列缓存，
+攒满ROW_GROUP_SIZE行就作为一个行组（Parquet）或记录批（Arrow IPC）写出，
+内存中最多只保留每张表一个行组的数据，可扩展到数百万行。
+
+Parquet与Arrow格式需要安装pyarrow；未安装时使用标准库csv写出同样的列，每个行组追加一次。
+"""
+import csv
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from java_records import ClassInfo
+
+FORMATS = ('parquet', 'arrow', 'csv')
+
+FORMAT_SUFFIXES = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv'}
+
+# 每个行组（记录批）的行数
+ROW_GROUP_SIZE = 64 * 1024
+
+# 各表的列名及对应的Arrow类型名（见_arrow_schema）
+TABLE_COLUMNS = {
+    'classes': (('class_id', 'int64'), ('full_path', 'string'), ('name', 'string'),
+                ('package', 'string'), ('file_path', 'string'), ('line', 'int32')),
+    'methods': (('method_id', 'int64'), ('class_id', 'int64'), ('class_full_path', 'string'),
+                ('name', 'string'), ('return_type', 'string'), ('line', 'int32')),
+    'fields': (('class_id', 'int64'), ('class_full_path', 'string'), ('name', 'string'),
+               ('type', 'string'), ('type_full_path', 'string'), ('line', 'int32')),
+    'locals': (('method_id', 'int64'), ('class_full_path', 'string'), ('method_name', 'string'),
+               ('name', 'string'), ('type', 'string'), ('type_full_path', 'string'), ('line', 'int32')),
+}
+
+
+def has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_format(export_format: Optional[str] = None) -> str:
+    """未指定格式时，已安装pyarrow则使用parquet，否则使用csv"""
+    if export_format is None:
+        return 'parquet' if has_pyarrow() else 'csv'
+    if export_format not in FORMATS:
+        raise ValueError(f"未知的导出格式: {export_format}，可选: {', '.join(FORMATS)}")
+    if export_format != 'csv' and not has_pyarrow():
+        raise RuntimeError(f"{export_format}格式需要安装pyarrow: pip install pyarrow，或使用csv格式")
+    return export_format
+
+
+def _arrow_schema(table: str):
+    import pyarrow as pa
+
+    types = {'int64': pa.int64(), 'int32': pa.int32(), 'string': pa.string()}
+    return pa.schema([(name, types[type_name]) for name, type_name in TABLE_COLUMNS[table]])
+
+
+class _CsvTableWriter:
+    def __init__(self, path: str, table: str):
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in TABLE_COLUMNS[table]])
+
+    def write(self, columns: List[List[Any]]) -> None:
+        self._writer.writerows(zip(*columns))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ArrowTableWriter:
+    """Parquet按行组、Arrow IPC按记录批写出"""
+
+    def __init__(self, path: str, table: str, export_format: str):
+        import pyarrow as pa
+
+        self._pa = pa
+        self._schema = _arrow_schema(table)
+        if export_format == 'parquet':
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self._schema, compression='zstd')
+            self._write = lambda batch: self._writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            self._writer = pa.ipc.new_file(path, self._schema)
+            self._write = self._writer.write_batch
+
+    def write(self, columns: List[List[Any]]) -> None:
+        self._write(self._pa.record_batch(columns, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class StructureExporter:
+    """
+    按文件追加提取结果，分表分行组写出
+
+    与StructureDatabase一样，类和方法的id按写入顺序分配，方法、字段、局部变量通过id关联，
+    同时冗余类全路径和方法名，单表即可直接分析。
+    """
+
+    def __init__(self, output_dir: str, export_format: Optional[str] = None,
+                 row_group_size: int = ROW_GROUP_SIZE):
+        """
+        Args:
+            output_dir: 输出目录，每张表写一个文件
+            export_format: 'parquet'、'arrow'或'csv'，默认按是否安装pyarrow选择
+            row_group_size: 每个行组的行数
+        """
+        self.output_dir = output_dir
+        self.format = resolve_format(export_format)
+        self.row_group_size = row_group_size
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.paths = {table: os.path.join(output_dir, table + FORMAT_SUFFIXES[self.format])
+                      for table in TABLE_COLUMNS}
+        self.row_counts = {table: 0 for table in TABLE_COLUMNS}
+        self._writers = {}
+        self._columns = {table: [[] for _ in columns] for table, columns in TABLE_COLUMNS.items()}
+        self._next_class_id = 1
+        self._next_method_id = 1
+
+    def _writer(self, table: str):
+        writer = self._writers.get(table)
+        if writer is None:
+            if self.format == 'csv':
+                writer = _CsvTableWriter(self.paths[table], table)
+            else:
+                writer = _ArrowTableWriter(self.paths[table], table, self.format)
+            self._writers[table] = writer
+        return writer
+
+    def _append(self, table: str, *row) -> None:
+        columns = self._columns[table]
+        for column, value in zip(columns, row):
+            column.append(value)
+        if len(columns[0]) >= self.row_group_size:
+            self._flush_table(table)
+
+    def _flush_table(self, table: str) -> None:
+        columns = self._columns[table]
+        if not columns[0]:
+            return
+        self._writer(table).write(columns)
+        self.row_counts[table] += len(columns[0])
+        self._columns[table] = [[] for _ in columns]
+
+    def add_file(self, file_path: str, classes: Iterable[ClassInfo], line_count: int = 0) -> None:
+        """追加一个源文件的提取结果"""
+        for class_info in classes:
+            class_id = self._next_class_id
+            self._next_class_id += 1
+            full_path = class_info.full_path
+            self._append('classes', class_id, full_path, class_info.name, class_info.package or '',
+                         file_path, class_info.line)
+            for method in class_info.methods:
+                method_id = self._next_method_id
+                self._next_method_id += 1
+                self._append('methods', method_id, class_id, full_path, method.name,
+                             method.return_type, method.line)
+                for var in method.local_variables:
+                    self._append('locals', method_id, full_path, method.name, var.name, var.type,
+                                 var.type_full_path, var.line)
+            for field in class_info.fields:
+                self._append('fields', class_id, full_path, field.name, field.type,
+                             field.type_full_path, field.line)
+
+    def close(self) -> None:
+        """写出剩余的行并关闭文件，没有数据的表也写出只含表头/schema的文件"""
+        for table in TABLE_COLUMNS:
+            self._flush_table(table)
+            self._writer(table).close()
+        self._writers = {}
+
+    def __enter__(self) -> 'StructureExporter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def read_table(path: str) -> Dict[str, List[Any]]:
+    """读取导出的单张表，返回 列名 -> 值列表，CSV中的数值列按TABLE_COLUMNS转换回整数"""
+    if path.endswith('.csv'):
+        table = os.path.splitext(os.path.basename(path))[0]
+        int_columns = {name for name, type_name in TABLE_COLUMNS.get(table, ()) if type_name.startswith('int')}
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            columns = {name: [] for name in header}
+            for row in reader:
+                for name, value in zip(header, row):
+                    columns[name].append(int(value) if name in int_columns else value)
+        return columns
+
+    import pyarrow as pa
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_table(path).to_pydict()
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all().to_pydict()
@@ -0,0 +1,127 @@
+"""输出文件的内容哈希清单
+
+java-analysis.py和ast_pipeline.py在输出目录中写入manifest.json，记录每个输出文件的SHA-256与大小。
+下游构建步骤比较前后两次的清单即可跳过未变化的分片/JSON，
+两次运行的结果也可以只比较清单而不必逐个比较文件。
+
+用法:
+    python output_manifest.py build <输出目录>        重新计算目录的清单
+    python output_manifest.py diff <旧清单> <新清单>   列出新增、删除和变化的文件
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List
+
+MANIFEST_NAME = "manifest.json"
+HASH_ALGORITHM = "sha256"
+
+# 计算文件哈希时每次读入的字节数
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_entry(digest: str, size: int) -> Dict[str, object]:
+    return {HASH_ALGORITHM: digest, "size": size}
+
+
+def _relative_name(path: str, root: str) -> str:
+    # 清单中统一使用/分隔的相对路径，不同系统上生成的清单可直接比较
+    return os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def scan_directory(root: str, exclude: Iterable[str] = (MANIFEST_NAME,)) -> Dict[str, Dict[str, object]]:
+    """
+    计算目录下所有文件的哈希
+
+    Args:
+        root: 输出目录
+        exclude: 不列入清单的文件名（如清单本身、含运行时间的summary.txt）
+    """
+    exclude = set(exclude)
+    entries = {}
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name in exclude:
+                continue
+            path = os.path.join(dir_path, file_name)
+            entries[_relative_name(path, root)] = manifest_entry(file_digest(path), os.path.getsize(path))
+    return entries
+
+
+def write_manifest(path: str, entries: Dict[str, Dict[str, object]]) -> None:
+    """按路径排序写出清单，同样的内容总是得到同样的清单文件"""
+    manifest = {"algorithm": HASH_ALGORITHM, "files": dict(sorted(entries.items()))}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def write_directory_manifest(root: str, exclude: Iterable[str] = (),
+                             name: str = MANIFEST_NAME) -> Dict[str, Dict[str, object]]:
+    """为整个输出目录生成清单，写入 root/name"""
+    entries = scan_directory(root, set(exclude) | {name})
+    write_manifest(os.path.join(root, name), entries)
+    return entries
+
+
+def load_manifest(path: str) -> Dict[str, Dict[str, object]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("algorithm") != HASH_ALGORITHM:
+        raise ValueError(f"不支持的哈希算法: {manifest.get('algorithm')}")
+    return manifest["files"]
+
+
+def diff_manifests(old: Dict[str, Dict[str, object]],
+                   new: Dict[str, Dict[str, object]]) -> Dict[str, List[str]]:
+    """比较两份清单，返回新增、删除和内容变化的文件"""
+    return {
+        "added": sorted(set(new) - set(old)),
+        "removed": sorted(set(old) - set(new)),
+        "changed": sorted(name for name in set(old) & set(new)
+                          if old[name][HASH_ALGORITHM] != new[name][HASH_ALGORITHM]),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='生成或比较输出文件的内容哈希清单')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='计算输出目录的清单')
+    build_parser.add_argument('directory', help='输出目录')
+    build_parser.add_argument('--exclude', nargs='*', default=['summary.txt'], help='不列入清单的文件名')
+
+    diff_parser = subparsers.add_parser('diff', help='比较两份清单')
+    diff_parser.add_argument('old', help='旧清单路径')
+    diff_parser.add_argument('new', help='新清单路径')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        entries = write_directory_manifest(args.directory, args.exclude)
+        print(f"清单已保存到: {os.path.join(args.directory, MANIFEST_NAME)} ({len(entries)} 个文件)")
+    else:
+        diff = diff_manifests(load_manifest(args.old), load_manifest(args.new))
+        for label, key in (('新增', 'added'), ('删除', 'removed'), ('变化', 'changed')):
+            for name in diff[key]:
+                print(f"{label}\t{name}")
+        total = sum(len(names) for names in diff.values())
+        print(f"共 {total} 个文件不同" if total else "两份清单一致")
+        sys.exit(1 if total else 0)
@@ -0,0 +1,59 @@
+"""ast-compressor5.py中注释与声明关联的单元测试
+
+用法: python -m unittest test_ast_compressor5
+需要tree-sitter及编译好的Java语言库（build/languages.so等），找不到时跳过。
+"""
+import importlib.util
+import os
+from unittest import SkipTest, TestCase
+
+_spec = importlib.util.spec_from_file_location(
+    'ast_compressor5', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ast-compressor5.py'))
+ast_compressor5 = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ast_compressor5)
+
+SOURCE = b"""package p;
+
+/** \xe8\xae\xa2\xe5\x8d\x95\xe6\x9c\x8d\xe5\x8a\xa1 */
+public class OrderService {
+    /** \xe5\xa4\x84\xe7\x90\x86\xe8\xae\xa2\xe5\x8d\x95 */
+    public void process() {
+        int total = 0;
+        // TODO: inside process body
+        total++;
+    }
+
+    // NOTE: describes the field below
+    private int count;
+
+    public void flush() {
+        count = 0;
+    }
+    // TODO: trailing comment in class body
+}
+"""
+
+
+class TestCommentAttachment(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            ast_compressor5.load_java_language()
+        except Exception as e:
+            raise SkipTest(f"无法加载Java语言库: {e}")
+
+    def attached(self):
+        result = ast_compressor5.compress_java_ast(SOURCE, use_key_mapping=False)
+        return {comment['text'][:20]: comment.get('attached_to') for comment in result['key_comments']}
+
+    def test_comment_in_method_body_belongs_to_method(self):
+        self.assertEqual(self.attached()['// TODO: inside proc'], 'method process')
+
+    def test_doc_comment_belongs_to_following_declaration(self):
+        attached = self.attached()
+        self.assertEqual(attached['/** 订单服务 */'], 'class OrderService')
+        self.assertEqual(attached['/** 处理订单 */'], 'method process')
+        self.assertEqual(attached['// NOTE: describes t'], 'field count')
+
+    def test_trailing_comment_belongs_to_enclosing_class(self):
+        self.assertEqual(self.attached()['// TODO: trailing co'], 'class OrderService')
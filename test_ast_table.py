@@ -0,0 +1,79 @@
+"""ast_table节点表文件格式的单元测试
+
+用法: python -m unittest test_ast_table
+"""
+import os
+import tempfile
+from array import array
+from unittest import TestCase, skipIf
+
+from ast_table import COLUMNS, NodeTable, load_node_table
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def sample_table():
+    """两个文件：program -> class_declaration -> identifier；program -> identifier"""
+    kinds = ['program', 'class_declaration', 'identifier']
+    rows = [
+        # kind, parent, start_byte, end_byte, first_child, next_sibling
+        (0, -1, 0, 20, 1, -1),
+        (1, 0, 0, 20, 2, -1),
+        (2, 1, 6, 7, -1, -1),
+        (0, -1, 0, 5, 4, -1),
+        (2, 3, 0, 5, -1, -1),
+    ]
+    columns = {name: array(typecode, [row[i] for row in rows]) for i, (name, typecode) in enumerate(COLUMNS)}
+    return NodeTable(kinds, columns, array('q', [0, 3, 5]), ['A.java', 'pkg/中文.java'])
+
+
+class TestNodeTableFile(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'project_ast.jast')
+        self.original = sample_table()
+        self.original.save(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        table = load_node_table(self.path)
+        try:
+            self.assertEqual(table.kinds, self.original.kinds)
+            self.assertEqual(table.file_paths, self.original.file_paths)
+            self.assertEqual(list(table.file_starts), [0, 3, 5])
+            for name, _ in COLUMNS:
+                self.assertEqual(list(getattr(table, name)), list(getattr(self.original, name)), name)
+            self.assertEqual(list(table.children(0)), [1])
+            self.assertEqual(table.node_type(4), 'identifier')
+        finally:
+            table.close()
+
+    def test_close_releases_columns(self):
+        table = load_node_table(self.path)
+        table.close()
+        with self.assertRaises(ValueError):
+            table.kind[0]
+        # 重复close无副作用
+        table.close()
+
+    def test_rejects_other_formats(self):
+        other = os.path.join(self.directory.name, 'project.jarc')
+        with open(other, 'wb') as f:
+            f.write(b'JARC' + b'\0' * 64)
+        with self.assertRaises(ValueError):
+            load_node_table(other)
+
+    @skipIf(numpy is None, "需要NumPy")
+    def test_close_with_live_numpy_arrays(self):
+        table = load_node_table(self.path)
+        columns = table.to_numpy()
+        table.close()
+        # 映射推迟到数组释放后回收，数组在此之前仍然可用
+        self.assertEqual(columns['parent'].tolist(), [-1, 0, 1, -1, 3])
+        self.assertEqual(columns['file_starts'].tolist(), [0, 3, 5])
+        del columns
@@ -0,0 +1,156 @@
+"""java_file_filter的单元测试
+
+用法: python -m unittest test_java_file_filter
+"""
+import os
+import tempfile
+from unittest import TestCase
+
+from java_file_filter import JavaFileFilter, PathRule, is_generated_header, match_rules, parse_rules
+
+JPA_ENTITY = b"""package com.example;
+
+import jakarta.persistence.*;
+
+@Entity
+public class Order {
+    @Id @GeneratedValue(strategy = GenerationType.IDENTITY)
+    private Long id;
+}
+"""
+
+
+class TestGeneratedDetection(TestCase):
+    def test_jpa_generated_value_is_not_generated(self):
+        self.assertFalse(is_generated_header(JPA_ENTITY))
+
+    def test_qualified_annotation(self):
+        header = b'@javax.annotation.processing.Generated(value = "dagger.internal.codegen.ComponentProcessor")\n'
+        self.assertTrue(is_generated_header(header + b'public final class DaggerApp {}\n'))
+        self.assertTrue(is_generated_header(b'@javax.annotation.Generated("grpc")\nclass Stub {}\n'))
+        self.assertTrue(is_generated_header(b'@jakarta.annotation.Generated("x")\nclass A {}\n'))
+
+    def test_simple_annotation_requires_import(self):
+        imported = b'import javax.annotation.processing.Generated;\n\n@Generated("MapStruct")\nclass M {}\n'
+        self.assertTrue(is_generated_header(imported))
+        # Hibernate的@Generated标注生成列，不是生成代码
+        hibernate = b'import org.hibernate.annotations.Generated;\nclass E { @Generated long version; }\n'
+        self.assertFalse(is_generated_header(hibernate))
+        self.assertFalse(is_generated_header(b'@org.hibernate.annotations.Generated\nlong version;\n'))
+
+    def test_generator_banners(self):
+        self.assertTrue(is_generated_header(
+            b'// Generated by the protocol buffer compiler.  DO NOT EDIT!\n// source: a.proto\n'))
+        self.assertTrue(is_generated_header(b'// Generated from Java.g4 by ANTLR 4.13.1\npackage p;\n'))
+        self.assertFalse(is_generated_header(b'/* Legacy module, DO NOT EDIT without review. */\nclass A {}\n'))
+        self.assertFalse(is_generated_header(b'// Do not edit the constants below\nclass A {}\n'))
+
+    def test_filter_keeps_entity(self):
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, 'Order.java'), 'wb') as f:
+                f.write(JPA_ENTITY)
+            with open(os.path.join(root, 'Stub.java'), 'wb') as f:
+                f.write(b'@javax.annotation.Generated("grpc")\nclass Stub {}\n')
+            file_filter = JavaFileFilter()
+            files = [os.path.basename(path) for path in file_filter.iter_files(root)]
+        self.assertEqual(files, ['Order.java'])
+        self.assertEqual(file_filter.skipped['generated'], 1)
+
+
+class TestPathRules(TestCase):
+    def matches(self, pattern, path, is_dir=False, base=''):
+        return PathRule(pattern, base).matches(path, is_dir)
+
+    def test_unanchored_pattern_matches_any_level(self):
+        self.assertTrue(self.matches('*.java', 'A.java'))
+        self.assertTrue(self.matches('*.java', 'src/main/A.java'))
+        self.assertFalse(self.matches('*.java', 'A.javax'))
+
+    def test_slash_anchors_pattern(self):
+        self.assertTrue(self.matches('/build', 'build', True))
+        self.assertFalse(self.matches('/build', 'module/build', True))
+        self.assertTrue(self.matches('src/gen', 'src/gen', True))
+        self.assertFalse(self.matches('src/gen', 'a/src/gen', True))
+
+    def test_star_does_not_cross_directories(self):
+        self.assertTrue(self.matches('src/*.java', 'src/A.java'))
+        self.assertFalse(self.matches('src/*.java', 'src/a/A.java'))
+        self.assertTrue(self.matches('src/?.java', 'src/A.java'))
+        self.assertFalse(self.matches('src/?.java', 'src/AB.java'))
+
+    def test_double_star(self):
+        self.assertTrue(self.matches('src/main/java/**', 'src/main/java/a/b/A.java'))
+        self.assertTrue(self.matches('**/gen/*.java', 'gen/A.java'))
+        self.assertTrue(self.matches('**/gen/*.java', 'a/b/gen/A.java'))
+        self.assertTrue(self.matches('a/**/Z.java', 'a/Z.java'))
+        self.assertTrue(self.matches('a/**/Z.java', 'a/x/y/Z.java'))
+
+    def test_directory_only(self):
+        self.assertTrue(self.matches('target/', 'a/target', True))
+        self.assertFalse(self.matches('target/', 'a/target', False))
+
+    def test_character_class_and_escape(self):
+        self.assertTrue(self.matches('[AB].java', 'B.java'))
+        self.assertFalse(self.matches('[!AB].java', 'B.java'))
+        self.assertTrue(self.matches('[!AB].java', 'C.java'))
+        self.assertTrue(self.matches(r'\#odd.java', '#odd.java'))
+        self.assertTrue(self.matches('a+b.java', 'a+b.java'))
+        self.assertFalse(self.matches('a+b.java', 'aab.java'))
+
+    def test_base_directory(self):
+        self.assertTrue(self.matches('*.tmp.java', 'sub/x/A.tmp.java', base='sub'))
+        self.assertFalse(self.matches('*.tmp.java', 'other/A.tmp.java', base='sub'))
+        self.assertTrue(self.matches('/gen', 'sub/gen', True, base='sub'))
+        self.assertFalse(self.matches('/gen', 'sub/x/gen', True, base='sub'))
+
+    def test_last_match_wins(self):
+        rules = parse_rules(['# comment', '', '*.tmp.java', '!keep.tmp.java', 'trailing.java   '])
+        self.assertEqual(len(rules), 3)
+        self.assertTrue(match_rules(rules, 'a/x.tmp.java', False))
+        self.assertFalse(match_rules(rules, 'a/keep.tmp.java', False))
+        self.assertTrue(match_rules(rules, 'trailing.java', False))
+        self.assertFalse(match_rules(rules, 'A.java', False))
+
+
+class TestBuildOutputDirs(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        files = ['pom.xml', 'target/gen/A.java', 'build/B.java',
+                 'src/main/java/com/acme/build/C.java', 'src/main/java/com/acme/target/D.java',
+                 'tools/build/E.java', 'module/build.gradle', 'module/build/F.java']
+        for relative_path in files:
+            path = os.path.join(self.root, *relative_path.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'class X {}\n')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def relative(self, paths):
+        return sorted(os.path.relpath(path, self.root).replace(os.sep, '/') for path in paths)
+
+    def test_build_dirs_need_build_file_and_no_source_root(self):
+        file_filter = JavaFileFilter()
+        kept = self.relative(file_filter.iter_files(self.root))
+        self.assertEqual(kept, ['src/main/java/com/acme/build/C.java', 'src/main/java/com/acme/target/D.java',
+                                'tools/build/E.java'])
+        self.assertEqual(sorted(file_filter.skipped_dirs), ['build', 'module/build', 'target'])
+
+    def test_summary_lists_skipped_dirs(self):
+        file_filter = JavaFileFilter()
+        list(file_filter.iter_files(self.root))
+        lines = file_filter.summary_lines()
+        self.assertIn('- target/', lines)
+        self.assertIn('- module/build/', lines)
+
+    def test_iter_paths_matches_iter_files(self):
+        paths = [os.path.join(self.root, 'build', 'B.java'),
+                 os.path.join(self.root, 'src', 'main', 'java', 'com', 'acme', 'build', 'C.java')]
+        kept = self.relative(JavaFileFilter().iter_paths(self.root, paths))
+        self.assertEqual(kept, ['src/main/java/com/acme/build/C.java'])
+
+    def test_no_default_excludes(self):
+        kept = self.relative(JavaFileFilter(default_excludes=False).iter_files(self.root))
+        self.assertEqual(len(kept), 6)